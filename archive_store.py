@@ -0,0 +1,271 @@
+# archive_store.py
+"""Segmented storage for the session archive.
+
+The active archive file rotates once it reaches `logging.rotation_size_mb`.
+Closed segments move into a sibling directory and are gzip-compressed by a
+background thread. An index.json there records each segment's first and last
+timestamp, so range queries open only the segments that can match.
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+from queue import Queue
+from threading import Lock, Thread
+from typing import Dict, Iterator, List, Optional
+
+from config import get_config
+from constants import ARCHIVE_PATH, LOG_ROTATION_SIZE_MB
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: rotation is only coordinated within one process
+    fcntl = None
+
+TIMESTAMP_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_timestamp(line: str) -> Optional[str]:
+    """Return the first 'YYYY-MM-DD HH:MM:SS' timestamp in an archive line, if any."""
+    match = TIMESTAMP_PATTERN.search(line)
+    return f"{match.group(1)} {match.group(2)}" if match else None
+
+
+class SegmentedArchive:
+    """Append-only archive that rotates into indexed, compressed segments."""
+
+    def __init__(self, path: str = None, segment_dir: str = None, rotation_size_mb: float = None):
+        self.path = path or get_config("database", "archive_path", ARCHIVE_PATH)
+        base, ext = os.path.splitext(self.path)
+        self.extension = ext or ".txt"
+        self.segment_dir = segment_dir or f"{base}_segments"
+        self.index_path = os.path.join(self.segment_dir, "index.json")
+        self.lock_path = os.path.join(self.segment_dir, ".lock")
+        size_mb = rotation_size_mb or get_config("logging", "rotation_size_mb", LOG_ROTATION_SIZE_MB)
+        self.rotation_bytes = int(size_mb * 1024 * 1024)
+
+        self.lock = Lock()
+        self.compress_queue = Queue()
+        self.compress_thread = None
+
+        os.makedirs(self.segment_dir, exist_ok=True)
+        # Pick up segments a previous process rotated but never got to compress. Every process
+        # sharing the archive does this; _compress_segment's claim makes sure only one compresses each.
+        for segment in self.read_index()["segments"]:
+            if not segment["compressed"]:
+                self._schedule_compression(segment["file"])
+
+    def _locked(self):
+        """Cross-process lock around the active file and index (flock where available)."""
+        return FileLock(self.lock_path, self.lock)
+
+    def read_index(self) -> Dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"segments": []}
+
+    def _write_index(self, index: Dict):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def append(self, lines: List[str]):
+        """Append lines to the active file, rotating it once it passes the size limit."""
+        with self._locked():
+            with open(self.path, "a") as archive_file:
+                archive_file.write("".join(lines))
+                size = archive_file.tell()
+            if size >= self.rotation_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        start, end = self._time_range(self.path)
+        index = self.read_index()
+        sequence = max((segment["sequence"] for segment in index["segments"]), default=0) + 1
+        name = f"segment-{sequence:06d}{self.extension}"
+
+        os.replace(self.path, os.path.join(self.segment_dir, name))
+        index["segments"].append({
+            "sequence": sequence,
+            "file": name,
+            "start": start,
+            "end": end,
+            "compressed": False
+        })
+        self._write_index(index)
+        self._schedule_compression(name)
+
+    @staticmethod
+    def _time_range(path: str):
+        """Timestamps of the first and last stamped lines, reading only the file's head and tail."""
+        start = end = None
+        with open(path, "rb") as f:
+            for raw in f:
+                start = parse_timestamp(raw.decode(errors="replace"))
+                if start:
+                    break
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 64 * 1024))
+            for raw in reversed(f.read().splitlines()):
+                end = parse_timestamp(raw.decode(errors="replace"))
+                if end:
+                    break
+        return start, end
+
+    def _schedule_compression(self, name: str):
+        if self.compress_thread is None:
+            self.compress_thread = Thread(target=self._compress_loop, name="archive-compressor", daemon=True)
+            self.compress_thread.start()
+        self.compress_queue.put(name)
+
+    def _compress_loop(self):
+        while True:
+            name = self.compress_queue.get()
+            try:
+                self._compress_segment(name)
+            except OSError as e:
+                logger.error("Failed to compress archive segment %s: %s", name, e)
+            finally:
+                self.compress_queue.task_done()
+
+    @staticmethod
+    def _find_segment(index: Dict, name: str) -> Optional[Dict]:
+        return next((segment for segment in index["segments"] if segment["file"] == name), None)
+
+    @staticmethod
+    def _claimed_elsewhere(segment: Dict) -> bool:
+        """True if another live process is compressing this segment."""
+        owner = segment.get("compressing")
+        if not owner or owner == os.getpid():
+            return False
+        try:
+            os.kill(owner, 0)
+        except ProcessLookupError:
+            return False  # the claimant died mid-compression; the segment is up for grabs
+        except PermissionError:
+            pass
+        return True
+
+    def _compress_segment(self, name: str):
+        """Compress one rotated segment, coordinating with other processes through the index.
+
+        The segment is claimed in the index under the archive lock, gzipped to a
+        per-process temporary file outside it, then published with os.replace
+        after re-checking the claim. Readers keep using the plain file until the
+        index points at the .gz.
+        """
+        source = os.path.join(self.segment_dir, name)
+        with self._locked():
+            index = self.read_index()
+            segment = self._find_segment(index, name)
+            if segment is None or segment["compressed"] or self._claimed_elsewhere(segment):
+                return
+            if not os.path.exists(source):
+                return
+            segment["compressing"] = os.getpid()
+            self._write_index(index)
+
+        tmp_path = f"{source}.gz.tmp.{os.getpid()}"
+        try:
+            with open(source, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        except OSError:
+            self._release_claim(name, tmp_path)
+            raise
+
+        with self._locked():
+            index = self.read_index()
+            segment = self._find_segment(index, name)
+            if segment is None or segment["compressed"] or segment.get("compressing") != os.getpid():
+                # Our claim went stale and someone else finished the job.
+                os.remove(tmp_path)
+                return
+            os.replace(tmp_path, source + ".gz")
+            segment["file"] = name + ".gz"
+            segment["compressed"] = True
+            del segment["compressing"]
+            self._write_index(index)
+            os.remove(source)
+
+    def _release_claim(self, name: str, tmp_path: str):
+        with self._locked():
+            index = self.read_index()
+            segment = self._find_segment(index, name)
+            if segment is not None and segment.get("compressing") == os.getpid():
+                del segment["compressing"]
+                self._write_index(index)
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def wait_for_compression(self):
+        """Block until every rotated segment has been compressed."""
+        self.compress_queue.join()
+
+    def segments_for(self, start: str = None, end: str = None) -> List[str]:
+        """Paths of the closed segments whose time range overlaps [start, end], oldest first."""
+        paths = []
+        for segment in self.read_index()["segments"]:
+            if start and segment["end"] and segment["end"] < start:
+                continue
+            if end and segment["start"] and segment["start"] > end:
+                continue
+            paths.append(os.path.join(self.segment_dir, segment["file"]))
+        return paths
+
+    def query(self, start: str = None, end: str = None) -> Iterator[str]:
+        """Yield archive lines stamped within [start, end], opening only overlapping segments.
+
+        Timestamps use the archive's 'YYYY-MM-DD HH:MM:SS' form; lines without one
+        are only returned by unbounded queries.
+        """
+        paths = self.segments_for(start, end)
+        if os.path.exists(self.path):
+            paths.append(self.path)
+
+        for path in paths:
+            if not os.path.exists(path) and os.path.exists(path + ".gz"):
+                path += ".gz"  # compressed after we read the index
+            opener = gzip.open if path.endswith(".gz") else open
+            try:
+                with opener(path, "rt") as f:
+                    for line in f:
+                        if start or end:
+                            stamp = parse_timestamp(line)
+                            if stamp is None or (start and stamp < start) or (end and stamp > end):
+                                continue
+                        yield line
+            except FileNotFoundError:
+                continue
+
+
+class FileLock:
+    """Hold an in-process lock plus, on POSIX, an flock shared by every process using the archive."""
+
+    def __init__(self, path: str, thread_lock: Lock):
+        self.path = path
+        self.thread_lock = thread_lock
+        self.handle = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            self.handle = open(self.path, "a")
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+        self.thread_lock.release()
@@ -2,6 +2,49 @@
 import datetime
 import socket
 import time
+from collections import deque
+
+from constants import RATE_LIMITED_REPLY
+from framing import FramedConnection
+
+
+def pipelined_chat(conn, messages, window):
+    """Send `messages` keeping up to `window` unacknowledged, coalescing each refill into one write.
+
+    The server answers frames in order, so every reply acknowledges the oldest
+    message in flight. Returns (round-trip times in milliseconds of the messages
+    the server processed, number of messages it shed with RATE_LIMITED_REPLY).
+    """
+    messages = iter(messages)
+    in_flight = deque()
+    round_trip_times = []
+    shed = 0
+    exhausted = False
+
+    while True:
+        burst = []
+        while not exhausted and len(in_flight) + len(burst) < window:
+            try:
+                burst.append(next(messages))
+            except StopIteration:
+                exhausted = True
+        if burst:
+            sent_at = time.perf_counter()
+            conn.send_many(burst)
+            in_flight.extend([sent_at] * len(burst))
+        if not in_flight:
+            return round_trip_times, shed
+
+        replies = conn.recv_batch()
+        if not replies:
+            raise ConnectionError("Server closed the connection with messages in flight")
+        received_at = time.perf_counter()
+        for reply in replies:
+            sent_at = in_flight.popleft()
+            if reply == RATE_LIMITED_REPLY:
+                shed += 1
+            else:
+                round_trip_times.append((received_at - sent_at) * 1000)
 
 class Client:
     def __init__(self, name, host="127.0.0.1", port=8000):
@@ -12,6 +55,8 @@ class Client:
         self.session_start = datetime.datetime.now()
         self.session_end = None
         self.rating = None
+        self.round_trip_times = []
+        self.shed_messages = 0
 
     def show_details(self):
         print("\n--- Client Session Info ---")
@@ -22,6 +67,7 @@ class Client:
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
                 sock.connect((self.host, self.port))
+                conn = FramedConnection(sock)
                 self.server_name = f"{self.host}:{self.port}"
                 self.show_details()
                 print("Connected to server:", self.server_name)
@@ -29,26 +75,45 @@ class Client:
                 # Send and receive some messages
                 for i in range(5):
                     msg = f"{self.name} message {i+1}"
-                    sock.sendall(msg.encode())
-                    reply = sock.recv(1024).decode()
+                    conn.send(msg)
+                    reply = conn.recv()
                     print("Server replied:", reply)
                     time.sleep(1)
 
                 # Send rating
-                self.send_rating(sock)
+                self.send_rating(conn)
+
+        except Exception as e:
+            print(f"Error during communication: {e}")
+        finally:
+            self.session_end = datetime.datetime.now()
+
+    def run_pipelined(self, num_messages=100, window=8, rating=5):
+        """Non-interactive session: pipeline `num_messages` chats, then rate without prompting."""
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.connect((self.host, self.port))
+                conn = FramedConnection(sock)
+                self.server_name = f"{self.host}:{self.port}"
+
+                messages = (f"{self.name} message {i+1}" for i in range(num_messages))
+                self.round_trip_times, self.shed_messages = pipelined_chat(conn, messages, window)
 
+                self.rating = rating
+                conn.send(f"RATING:{rating}")
         except Exception as e:
             print(f"Error during communication: {e}")
         finally:
             self.session_end = datetime.datetime.now()
+        return self.round_trip_times
 
-    def send_rating(self, sock):
+    def send_rating(self, conn):
         while True:
             try:
                 rating = int(input("Rate the server from 1 to 5: "))
                 if 1 <= rating <= 5:
                     self.rating = rating
-                    sock.sendall(f"RATING:{rating}".encode())
+                    conn.send(f"RATING:{rating}")
                     break
                 else:
                     print("Enter rating from 1 to 5.")
@@ -63,5 +128,9 @@ class Client:
             "server_name": self.server_name,
             "start_time": str(self.session_start),
             "end_time": str(self.session_end),
-            "rating": self.rating
+            "rating": self.rating,
+            "messages_acknowledged": len(self.round_trip_times),
+            "messages_shed": self.shed_messages,
+            "avg_rtt_ms": (sum(self.round_trip_times) / len(self.round_trip_times)) if self.round_trip_times else None,
+            "max_rtt_ms": max(self.round_trip_times, default=None)
         }
\ No newline at end of file
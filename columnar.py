@@ -0,0 +1,330 @@
+# columnar.py
+"""Compact columnar binary files for generated datasets.
+
+Layout: an 8-byte magic, a 4-byte little-endian header length, a JSON
+header, then one 8-byte-aligned section per column. The header lists each
+column's kind and the byte offset and length of its sections:
+
+* ``int32`` / ``int64`` / ``float64``: a fixed-width little-endian array.
+* ``category``: the distinct values in the header and one uint8 or uint16 code
+  per row, for repetitive strings such as ``priority`` or ``initial_message``.
+* ``string``: uint64 end offsets (one per row) into a UTF-8 blob, for mostly
+  unique strings such as names and emails.
+
+`ColumnarReader` memory-maps the file and casts each section in place, so
+opening a file costs only the header parse and any row can be read in O(1).
+`ColumnarWriter` spools every column to a temporary file as rows arrive, so
+writing needs memory only for the rows of the current chunk and the category
+dictionaries.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+MAGIC = b"CHATCOL1"
+HEADER_LENGTH = struct.Struct("<I")
+ALIGNMENT = 8
+COLUMNAR_SUFFIX = ".ccol"
+
+NUMERIC_TYPECODES = {"int32": "i", "int64": "q", "float64": "d"}
+KINDS = tuple(NUMERIC_TYPECODES) + ("category", "string")
+MAX_CATEGORIES = 1 << 16
+SPOOL_CHUNK = 1 << 20
+
+
+def is_columnar(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+class _ColumnSpool:
+    """Per-column temporary file that rows are appended to in chunks."""
+
+    def __init__(self, name: str, kind: str, directory: str):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown column kind {kind!r} for {name}")
+        self.name = name
+        self.kind = kind
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.dictionary = {}
+        if kind == "string":
+            self.blob = tempfile.TemporaryFile(dir=directory)
+            self.blob_size = 0
+
+    def append(self, values: Sequence[Any]):
+        if self.kind in NUMERIC_TYPECODES:
+            self.file.write(_little_endian(array(NUMERIC_TYPECODES[self.kind], values)).tobytes())
+        elif self.kind == "category":
+            codes = array("H")
+            for value in values:
+                code = self.dictionary.get(value)
+                if code is None:
+                    code = self.dictionary[value] = len(self.dictionary)
+                    if code >= MAX_CATEGORIES:
+                        raise ValueError(f"Column {self.name} has more than {MAX_CATEGORIES} distinct values; "
+                                         f"store it as 'string'")
+                codes.append(code)
+            self.file.write(_little_endian(codes).tobytes())
+        else:
+            ends = array("Q")
+            for value in values:
+                data = str(value).encode("utf-8")
+                self.blob.write(data)
+                self.blob_size += len(data)
+                ends.append(self.blob_size)
+            self.file.write(_little_endian(ends).tobytes())
+
+    def sections(self) -> List[Tuple[str, Any, int]]:
+        """(section name, source file, code width) in the order they are written out."""
+        if self.kind == "category":
+            return [("codes", self.file, 1 if len(self.dictionary) <= 256 else 2)]
+        if self.kind == "string":
+            return [("ends", self.file, 0), ("data", self.blob, 0)]
+        return [("data", self.file, 0)]
+
+    def close(self):
+        self.file.close()
+        if self.kind == "string":
+            self.blob.close()
+
+
+class ColumnarWriter:
+    """Write rows of `schema` ([(name, kind), ...]) to a columnar file at `path`.
+
+    Use as a context manager, or call `close()` to assemble the file. The
+    file is published by an atomic rename, so readers see the previous file
+    or the complete new one; if the `with` block raises, or `abort()` is
+    called, the spooled rows are discarded and `path` is left untouched.
+    """
+
+    def __init__(self, path: str, schema: Sequence[Tuple[str, str]]):
+        self.path = path
+        self.schema = list(schema)
+        self.rows = 0
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="columnar_", dir=os.path.dirname(os.path.abspath(path)))
+        self._spools = [_ColumnSpool(name, kind, self._tmpdir.name) for name, kind in self.schema]
+
+    def write_rows(self, rows: Iterable[Sequence[Any]]):
+        """Append rows given as sequences in schema order."""
+        rows = list(rows)
+        if not rows:
+            return
+        for spool, values in zip(self._spools, zip(*rows)):
+            spool.append(values)
+        self.rows += len(rows)
+
+    def close(self):
+        try:
+            self._assemble()
+        finally:
+            self._discard_spools()
+
+    def abort(self):
+        """Drop every row written so far without touching `path`."""
+        self._discard_spools()
+
+    def _discard_spools(self):
+        for spool in self._spools:
+            spool.close()
+        self._spools = []
+        self._tmpdir.cleanup()
+
+    def _assemble(self):
+        columns = []
+        offset = 0
+        for spool in self._spools:
+            column = {"name": spool.name, "kind": spool.kind}
+            if spool.kind == "category":
+                column["dictionary"] = list(spool.dictionary)
+            for section, source, width in spool.sections():
+                source.flush()
+                size = source.seek(0, os.SEEK_END)
+                if width == 1:
+                    size //= 2  # spooled as uint16, written out as uint8
+                column[section] = [offset, size]
+                if width:
+                    column["code_width"] = width
+                offset += -(-size // ALIGNMENT) * ALIGNMENT
+            columns.append(column)
+
+        def encode_header(start):
+            shifted = [dict(column, **{section: [column[section][0] + start, column[section][1]]
+                                       for section in ("codes", "ends", "data") if section in column})
+                       for column in columns]
+            return json.dumps({"rows": self.rows, "columns": shifted}).encode("utf-8")
+
+        # Offsets are absolute, so the header's length depends on where the data starts: iterate to a fixpoint.
+        start = 0
+        while True:
+            header = encode_header(start)
+            needed = len(MAGIC) + HEADER_LENGTH.size + len(header)
+            needed += -needed % ALIGNMENT
+            if needed <= start:
+                break
+            start = needed
+        header += b" " * (start - len(MAGIC) - HEADER_LENGTH.size - len(header))
+
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        try:
+            self._write_file(tmp_path, header)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _write_file(self, tmp_path, header):
+        with open(tmp_path, "wb") as out:
+            out.write(MAGIC)
+            out.write(HEADER_LENGTH.pack(len(header)))
+            out.write(header)
+            for spool in self._spools:
+                for section, source, width in spool.sections():
+                    out.write(b"\0" * (-out.tell() % ALIGNMENT))
+                    source.seek(0)
+                    if width == 1:
+                        while True:
+                            chunk = source.read(SPOOL_CHUNK)
+                            if not chunk:
+                                break
+                            codes = _little_endian(array("H", chunk))  # back to native order
+                            out.write(array("B", codes).tobytes())
+                    else:
+                        shutil.copyfileobj(source, out, SPOOL_CHUNK)
+            out.write(b"\0" * (-out.tell() % ALIGNMENT))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class _CategoryColumn:
+    def __init__(self, codes, dictionary):
+        self.codes = codes
+        self.dictionary = dictionary
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.dictionary[self.codes[index]]
+
+
+class _StringColumn:
+    def __init__(self, ends, data):
+        self.ends = ends
+        self.data = data
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.ends)
+        if not 0 <= index < len(self.ends):
+            raise IndexError(index)
+        start = self.ends[index - 1] if index > 0 else 0
+        return bytes(self.data[start:self.ends[index]]).decode("utf-8")
+
+
+class ColumnarReader:
+    """Memory-mapped, read-only access to a columnar file.
+
+    `column(name)` returns an indexable view (numeric columns are memoryviews
+    over the mapping), `row(i)` a dict for one row; both are O(1). Slices of
+    a numeric column must be released before `close()`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._views = []
+        self._mmap = None
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            buffer = memoryview(self._mmap)
+            self._views.append(buffer)
+            if bytes(buffer[:len(MAGIC)]) != MAGIC:
+                raise ValueError(f"{path} is not a columnar file")
+            (length,) = HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+            start = len(MAGIC) + HEADER_LENGTH.size
+            header = json.loads(bytes(buffer[start:start + length]))
+            self.rows = header["rows"]
+            self.names = [column["name"] for column in header["columns"]]
+            self._columns = {column["name"]: self._open_column(buffer, column) for column in header["columns"]}
+        except Exception:
+            self.close()
+            raise
+
+    def _section(self, buffer, span, typecode):
+        offset, size = span
+        view = buffer[offset:offset + size]
+        if typecode == "B":
+            self._views.append(view)
+            return view
+        if sys.byteorder != "little":
+            return _little_endian(array(typecode, view))  # big-endian host: decode a copy
+        view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def _open_column(self, buffer, column):
+        kind = column["kind"]
+        if kind in NUMERIC_TYPECODES:
+            return self._section(buffer, column["data"], NUMERIC_TYPECODES[kind])
+        if kind == "category":
+            codes = self._section(buffer, column["codes"], "B" if column["code_width"] == 1 else "H")
+            return _CategoryColumn(codes, column["dictionary"])
+        return _StringColumn(self._section(buffer, column["ends"], "Q"), self._section(buffer, column["data"], "B"))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str):
+        return self._columns[name]
+
+    def row(self, index: int) -> Dict[str, Any]:
+        if not 0 <= index < self.rows:
+            raise IndexError(index)
+        return {name: self._columns[name][index] for name in self.names}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.row(index) for index in range(self.rows))
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._columns = {}
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -17,7 +17,9 @@ class Config:
                 "max_clients_per_server": MAX_CLIENTS_PER_SERVER,
                 "server_names": SERVER_NAMES,
                 "port": DEFAULT_PORT,
-                "host": HOST
+                "host": HOST,
+                "message_rate_limit": MESSAGE_RATE_LIMIT,
+                "message_burst": MESSAGE_BURST
             },
             "client": {
                 "max_clients": MAX_CLIENTS,
@@ -33,12 +35,17 @@ class Config:
                 "clients": SIMULATION_CLIENTS,
                 "duration_minutes": SIMULATION_DURATION_MINUTES,
                 "ramp_up_seconds": LOAD_TEST_RAMP_UP_SECONDS,
-                "steady_state_seconds": LOAD_TEST_STEADY_STATE_SECONDS
+                "steady_state_seconds": LOAD_TEST_STEADY_STATE_SECONDS,
+                "result_batch_size": RESULT_BATCH_SIZE
             },
             "database": {
                 "path": DATABASE_PATH,
                 "session_data_path": SESSION_DATA_PATH,
-                "archive_path": ARCHIVE_PATH
+                "archive_path": ARCHIVE_PATH,
+                "write_behind": DB_WRITE_BEHIND,
+                "batch_size": DB_BATCH_SIZE,
+                "flush_interval_ms": DB_FLUSH_INTERVAL_MS,
+                "durability": DB_DURABILITY
             },
             "threading": {
                 "max_threads": MAX_THREADS,
@@ -49,6 +56,7 @@ class Config:
                 "buffer_size": BUFFER_SIZE,
                 "flush_interval_seconds": FLUSH_INTERVAL_SECONDS,
                 "max_queue_size": MAX_QUEUE_SIZE,
+                "overflow_policy": LOG_OVERFLOW_POLICY,
                 "rotation_size_mb": LOG_ROTATION_SIZE_MB
             },
             "performance": {
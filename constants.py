@@ -6,6 +6,11 @@ SERVER_NAMES = ["Server_A", "Server_B", "Server_C"]
 DEFAULT_PORT = 8080
 HOST = "localhost"
 
+# Per-connection message flood limit: off (0) unless a rate is configured
+MESSAGE_RATE_LIMIT = 0
+MESSAGE_BURST = 2000
+RATE_LIMITED_REPLY = "ERROR: rate limit exceeded"
+
 # Client Settings
 MAX_CLIENTS = 1000
 CLIENT_WAITING_TIME_MINUTES = 5
@@ -21,12 +26,21 @@ SIMULATION_CLIENTS = 1000
 SIMULATION_DURATION_MINUTES = 15
 LOAD_TEST_RAMP_UP_SECONDS = 5
 LOAD_TEST_STEADY_STATE_SECONDS = 10
+RESULT_BATCH_SIZE = 50  # client results per batch streamed back by a pooled client worker
 
 # Paths
 DATABASE_PATH = "data/server_metrics.db"
 SESSION_DATA_PATH = "data/session_data.json"
 ARCHIVE_PATH = "archive.txt"
 
+# Database write-behind
+DB_WRITE_BEHIND = True
+DB_BATCH_SIZE = 500
+DB_FLUSH_INTERVAL_MS = 200
+DB_DURABILITY = "normal"
+DB_DURABILITY_MODES = ("off", "normal", "full")
+DB_COMMIT_RETRIES = 5
+
 # Threading / Forking
 MAX_THREADS = 50
 THREAD_POOL_SIZE = 10
@@ -36,7 +50,12 @@ FORK_PROCESS_LIMIT = 10
 BUFFER_SIZE = 10
 FLUSH_INTERVAL_SECONDS = 2
 MAX_QUEUE_SIZE = 100
+LOG_OVERFLOW_BLOCK = "block"  # wait up to the put timeout for room, then drop
+LOG_OVERFLOW_DROP = "drop"    # drop at once when the queue is full
+LOG_OVERFLOW_POLICIES = (LOG_OVERFLOW_BLOCK, LOG_OVERFLOW_DROP)
+LOG_OVERFLOW_POLICY = LOG_OVERFLOW_BLOCK
 LOG_ROTATION_SIZE_MB = 5
+UI_LOG_MAX_LINES = 1000
 
 # Performance Thresholds
 METRICS_UPDATE_INTERVAL_SECONDS = 10
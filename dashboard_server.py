@@ -4,6 +4,8 @@ import json
 import webbrowser
 from threading import Timer
 
+from database import get_database
+
 app = Flask(__name__, template_folder="templates")
 
 @app.route("/")
@@ -57,6 +59,17 @@ def get_metrics():
         })
 
 
+@app.route("/server_stats")
+def get_server_stats():
+    """Per-server counters for today, this month and all time."""
+    try:
+        db = get_database()
+        return jsonify({server_name: db.get_server_summary(server_name) for server_name in db.get_server_names()})
+    except Exception as e:
+        print(f"[ERROR] Failed to read server stats: {e}")
+        return jsonify({})
+
+
 def open_browser():
     webbrowser.open("http://127.0.0.1:5000")
 
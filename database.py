@@ -1,21 +1,369 @@
+import atexit
+import multiprocessing.util
+import os
 import sqlite3
 import threading
-import json
+import time
+import weakref
 from datetime import datetime
+from queue import Queue, Empty
 from config import Config
+from constants import (DB_WRITE_BEHIND, DB_BATCH_SIZE, DB_FLUSH_INTERVAL_MS, DB_DURABILITY,
+                       DB_DURABILITY_MODES, DB_COMMIT_RETRIES)
+from logger import global_logger
+
+# PRAGMA synchronous level for each durability mode
+SYNCHRONOUS_LEVELS = {"off": "OFF", "normal": "NORMAL", "full": "FULL"}
+
+INSERT_SERVER_METRICS = '''
+    INSERT INTO server_metrics (
+        server_name, daily_count, monthly_count, total_clients,
+        lost_clients, rating_sum, rating_count, current_client
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_SESSION = '''
+    INSERT INTO sessions (
+        client_name, server_name, start_time, end_time, rating, status
+    )
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+UPDATE_SESSION = '''
+    UPDATE sessions
+    SET end_time = ?, rating = ?, status = ?
+    WHERE id = ?
+'''
+
+INSERT_PERFORMANCE_METRICS = '''
+    INSERT INTO performance_metrics (
+        simulation_type, total_clients, successful_sessions,
+        lost_clients, avg_response_time, throughput, disk_io_operations
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+# Session rollups: (table, strftime bucket format). A session is counted once, in the
+# bucket of its end time, when it reaches a final status; deleting raw sessions in
+# cleanup_old_data leaves the rollups untouched.
+ROLLUPS = (
+    ("session_rollup_hourly", "%Y-%m-%d %H:00"),
+    ("session_rollup_daily", "%Y-%m-%d"),
+    ("session_rollup_monthly", "%Y-%m"),
+)
+ROLLUP_PERIODS = {"hour": 0, "day": 1, "month": 2}
+ROLLUP_ALL_TIME = "all"  # sums one server's monthly buckets
+FINAL_STATUSES = "('COMPLETED', 'LOST')"
+
+
+def _rollup_statements(table, bucket_format):
+    bucket = f"strftime('{bucket_format}', COALESCE(NEW.end_time, NEW.start_time))"
+    upsert = f'''
+            INSERT INTO {table} (server_name, bucket, clients_served, lost_clients, rating_sum, rating_count)
+            VALUES (
+                NEW.server_name, {bucket},
+                NEW.status = 'COMPLETED', NEW.status = 'LOST',
+                COALESCE(NEW.rating, 0), NEW.rating IS NOT NULL
+            )
+            ON CONFLICT (server_name, bucket) DO UPDATE SET
+                clients_served = clients_served + excluded.clients_served,
+                lost_clients = lost_clients + excluded.lost_clients,
+                rating_sum = rating_sum + excluded.rating_sum,
+                rating_count = rating_count + excluded.rating_count;
+    '''
+    return [
+        f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                server_name TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                clients_served INTEGER DEFAULT 0,
+                lost_clients INTEGER DEFAULT 0,
+                rating_sum INTEGER DEFAULT 0,
+                rating_count INTEGER DEFAULT 0,
+                PRIMARY KEY (server_name, bucket)
+            ) WITHOUT ROWID
+        ''',
+        f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_on_insert AFTER INSERT ON sessions
+            WHEN NEW.status IN {FINAL_STATUSES}
+            BEGIN {upsert} END
+        ''',
+        f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_on_update AFTER UPDATE OF status ON sessions
+            WHEN OLD.status NOT IN {FINAL_STATUSES} AND NEW.status IN {FINAL_STATUSES}
+            BEGIN {upsert} END
+        ''',
+        # Backfill from sessions recorded before the rollup existed
+        f'''
+            INSERT OR IGNORE INTO {table} (server_name, bucket, clients_served, lost_clients, rating_sum, rating_count)
+            SELECT server_name, strftime('{bucket_format}', COALESCE(end_time, start_time)),
+                   SUM(status = 'COMPLETED'), SUM(status = 'LOST'),
+                   SUM(COALESCE(rating, 0)), SUM(rating IS NOT NULL)
+            FROM sessions
+            WHERE status IN {FINAL_STATUSES}
+            GROUP BY 1, 2
+        ''',
+    ]
+
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+MIGRATIONS = [
+    [
+        "CREATE INDEX IF NOT EXISTS idx_server_metrics_server_time ON server_metrics (server_name, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_server_metrics_timestamp ON server_metrics (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_server_start ON sessions (server_name, start_time)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_start_time ON sessions (start_time)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions (status)",
+        "CREATE INDEX IF NOT EXISTS idx_performance_metrics_timestamp ON performance_metrics (timestamp)",
+    ] + [statement for table, bucket_format in ROLLUPS for statement in _rollup_statements(table, bucket_format)],
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+class _ThreadConnection:
+    """Holds one thread's connection; freed with the thread's locals when the thread exits."""
+
+    __slots__ = ("conn", "pid", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.pid = os.getpid()
+
+
+def _release_connection(conn, pid, connections, connections_lock):
+    """Close a connection whose thread has exited (a forked child just forgets the parent's)."""
+    with connections_lock:
+        connections.discard(conn)
+    if os.getpid() == pid:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
 
 
 class DatabaseManager:
-    def __init__(self, db_path=None):
+    """SQLite access with per-thread connections and optional write-behind batching.
+
+    With `write_behind` enabled, inserts and updates are queued and a background
+    thread commits them with executemany() in one transaction every
+    `flush_interval_ms` or `batch_size` rows, so callers never wait on a commit.
+    Reads flush first, and pending writes are flushed on close() and at exit.
+    A batch that fails on a locked or unwritable database stays queued and is
+    retried; a batch holding a bad row is replayed row by row so only that row
+    is dropped. `durability` sets PRAGMA synchronous (off/normal/full) for
+    every connection, trading crash safety of the last commits for speed.
+    Session rows are always inserted synchronously so SQLite assigns their
+    ids; several managers and processes can share one database safely.
+    """
+
+    _STOP = object()
+
+    def __init__(self, db_path=None, write_behind=None, batch_size=None, flush_interval_ms=None, durability=None):
         self.config = Config()
-        self.db_path = db_path or self.config.get("database", "path")
+        # Connections open lazily per thread, so pin the path before anything can chdir.
+        self.db_path = os.path.abspath(db_path or self.config.get("database", "path"))
+        self.write_behind = (write_behind if write_behind is not None
+                             else self.config.get("database", "write_behind", DB_WRITE_BEHIND))
+        self.batch_size = batch_size or self.config.get("database", "batch_size", DB_BATCH_SIZE)
+        self.flush_interval = (flush_interval_ms or
+                               self.config.get("database", "flush_interval_ms", DB_FLUSH_INTERVAL_MS)) / 1000
+        self.durability = durability or self.config.get("database", "durability", DB_DURABILITY)
+        if self.durability not in DB_DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode '{self.durability}', expected one of {DB_DURABILITY_MODES}")
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Writers within this process are serialised; WAL lets readers proceed without the lock.
         self.lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = set()
+        self._connections_lock = threading.Lock()
         self.create_tables()
 
+        self.pid = os.getpid()
+        self.closed = False
+        self.write_thread = None
+        if self.write_behind:
+            self.write_queue = Queue()
+            self.write_stats_lock = threading.Lock()
+            self.write_stats = {"queued": 0, "written": 0, "batches": 0, "write_errors": 0,
+                                "failed_rows": 0}
+            self.write_thread = threading.Thread(target=self._run_writer, name="db-writer", daemon=True)
+            self.write_thread.start()
+            # multiprocessing children skip atexit, so also register a multiprocessing finalizer.
+            atexit.register(self.close)
+            multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+
+    def _get_connection(self):
+        """Return this thread's persistent connection, opening it on first use.
+
+        The connection is closed again when the thread exits, so short-lived
+        threads don't leave connections open for the life of the manager.
+        """
+        holder = getattr(self._local, "holder", None)
+        if holder is None or holder.pid != os.getpid():
+            # sqlite3 keeps a per-connection cache of prepared statements, so reusing
+            # the connection also reuses the compiled INSERT/UPDATE statements below.
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={SYNCHRONOUS_LEVELS[self.durability]}")
+            holder = self._local.holder = _ThreadConnection(conn)
+            with self._connections_lock:
+                self._connections.add(conn)
+            # Thread-local values are dropped when their thread exits, which runs this finalizer.
+            weakref.finalize(holder, _release_connection, conn, holder.pid, self._connections,
+                             self._connections_lock)
+        return holder.conn
+
+    def _execute(self, sql, params):
+        """Run one write, queueing it instead when write-behind is enabled."""
+        if self.write_behind and not self.closed:
+            self.write_queue.put((sql, params))
+            with self.write_stats_lock:
+                self.write_stats["queued"] += 1
+            return None
+        return self._execute_now(sql, params)
+
+    def _execute_now(self, sql, params):
+        """Run and commit one write immediately; returns the new row's id."""
+        with self.lock:
+            conn = self._get_connection()
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.lastrowid
+
+    def _run_writer(self):
+        batch = []
+        waiters = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.write_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except Empty:
+                item = None
+
+            if item is self._STOP:
+                for attempt in range(DB_COMMIT_RETRIES):
+                    if self._commit_batch(batch):
+                        break
+                    time.sleep(self.flush_interval)
+                return
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None:
+                batch.append(item)
+
+            if waiters or len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                # A batch that could not be committed stays queued and is retried next tick.
+                if self._commit_batch(batch):
+                    batch = []
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _commit_batch(self, batch):
+        """Commit `batch` in one transaction; returns False if it should be retried."""
+        if not batch:
+            return True
+        # Group rows by statement for executemany(). Session rows are inserted synchronously,
+        # so every queued update already has the row it targets.
+        groups = {}
+        for sql, params in batch:
+            groups.setdefault(sql, []).append(params)
+        ordered = list(groups.items())
+        try:
+            with self.lock:
+                conn = self._get_connection()
+                with conn:
+                    for sql, rows in ordered:
+                        conn.executemany(sql, rows)
+        except sqlite3.OperationalError as e:
+            # Locked or unwritable database: keep the batch and try again later.
+            with self.write_stats_lock:
+                self.write_stats["write_errors"] += 1
+            global_logger.log_error(f"Failed to commit {len(batch)} queued database writes, will retry: {e}")
+            return False
+        except sqlite3.Error:
+            # A bad row fails the whole executemany(); commit row by row so only it is lost.
+            self._commit_rows(ordered)
+        with self.write_stats_lock:
+            self.write_stats["written"] += len(batch)
+            self.write_stats["batches"] += 1
+        return True
+
+    def _commit_rows(self, ordered):
+        with self.lock:
+            conn = self._get_connection()
+            for sql, rows in ordered:
+                for params in rows:
+                    try:
+                        with conn:
+                            conn.execute(sql, params)
+                    except sqlite3.Error as e:
+                        with self.write_stats_lock:
+                            self.write_stats["failed_rows"] += 1
+                        global_logger.log_error(f"Dropped queued database write {params!r}: {e}")
+
+    def flush(self, timeout=30):
+        """Block until every write queued so far has been committed; returns False on timeout."""
+        if not self.write_behind or self.closed or self.pid != os.getpid():
+            return True
+        if not self.write_thread.is_alive():
+            # The writer died; commit whatever it left behind from this thread instead.
+            batch = []
+            while True:
+                try:
+                    item = self.write_queue.get_nowait()
+                except Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is not self._STOP:
+                    batch.append(item)
+            return self._commit_batch(batch)
+        done = threading.Event()
+        self.write_queue.put(done)
+        return done.wait(timeout)
+
+    def get_write_stats(self):
+        if not self.write_behind:
+            return {}
+        with self.write_stats_lock:
+            stats = dict(self.write_stats)
+        stats["queue_depth"] = self.write_queue.qsize()
+        return stats
+
+    def close(self):
+        """Flush pending writes, stop the writer thread and close every pooled connection.
+
+        Call it only once other threads have stopped using the manager: writers
+        are waited for through self.lock, but reads don't take it and would find
+        their connection closed under them.
+        """
+        if self.closed or self.pid != os.getpid():
+            return
+        self.closed = True
+        if self.write_thread is not None:
+            self.write_queue.put(self._STOP)
+            self.write_thread.join(timeout=10)
+        with self.lock, self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
     def create_tables(self):
         """Create required tables in the database."""
         with self.lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
 
             # Table to store server metrics
@@ -63,7 +411,26 @@ class DatabaseManager:
             ''')
 
             conn.commit()
-            conn.close()
+            self._migrate(conn)
+
+    @staticmethod
+    def _migrate(conn):
+        """Bring the schema up to SCHEMA_VERSION, one migration per transaction."""
+        while True:
+            # IMMEDIATE takes the write lock first, so concurrent processes migrate once.
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                conn.rollback()
+                return
+            try:
+                for statement in MIGRATIONS[version]:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
 
     def add_server(self, server_name, status='active'):
         """Add initial server metrics"""
@@ -81,91 +448,136 @@ class DatabaseManager:
     def insert_server_metrics(self, server_name, daily_count, monthly_count,
                               total_clients, lost_clients, rating_sum, rating_count, current_client):
         """Insert server metrics"""
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO server_metrics (
-                    server_name, daily_count, monthly_count, total_clients,
-                    lost_clients, rating_sum, rating_count, current_client
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (server_name, daily_count, monthly_count, total_clients,
-                  lost_clients, rating_sum, rating_count, current_client))
-            conn.commit()
-            conn.close()
+        self._execute(INSERT_SERVER_METRICS, (server_name, daily_count, monthly_count, total_clients,
+                                              lost_clients, rating_sum, rating_count, current_client))
 
     def insert_session(self, client_name, server_name, start_time, end_time=None, rating=None, status='ACTIVE'):
-        """Insert session details"""
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO sessions (
-                    client_name, server_name, start_time, end_time, rating, status
-                )
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (client_name, server_name, start_time, end_time, rating, status))
-            session_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            return session_id
+        """Insert session details and return the session id.
+
+        Not queued by write-behind: an id handed out in-process would collide with
+        other managers writing the same database, so SQLite assigns it here. The
+        later update_session() call is still queued.
+        """
+        return self._execute_now(INSERT_SESSION, (client_name, server_name, start_time, end_time, rating, status))
+
+    def record_session(self, client_name, server_name, status='COMPLETED', rating=None, start_time=None,
+                       end_time=None):
+        """Record a session that has already ended (COMPLETED or LOST) in one write.
+
+        Unlike insert_session this is queued under write-behind: nothing needs the
+        row's id, which SQLite assigns when the batch is committed. The rollup
+        triggers count the session in its end time's hour, day and month.
+        """
+        end_time = end_time or datetime.now().isoformat()
+        self._execute(INSERT_SESSION, (client_name, server_name, start_time or end_time, end_time, rating, status))
 
     def update_session(self, session_id, end_time, rating, status='COMPLETED'):
         """Update session record"""
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE sessions
-                SET end_time = ?, rating = ?, status = ?
-                WHERE id = ?
-            ''', (end_time, rating, status, session_id))
-            conn.commit()
-            conn.close()
+        self._execute(UPDATE_SESSION, (end_time, rating, status, session_id))
 
     def insert_performance_metrics(self, simulation_type, total_clients, successful_sessions,
                                    lost_clients, avg_response_time, throughput, disk_io_ops):
         """Insert performance test results"""
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO performance_metrics (
-                    simulation_type, total_clients, successful_sessions,
-                    lost_clients, avg_response_time, throughput, disk_io_operations
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (simulation_type, total_clients, successful_sessions,
-                  lost_clients, avg_response_time, throughput, disk_io_ops))
-            conn.commit()
-            conn.close()
+        self._execute(INSERT_PERFORMANCE_METRICS, (simulation_type, total_clients, successful_sessions,
+                                                   lost_clients, avg_response_time, throughput, disk_io_ops))
 
     def get_all_sessions(self):
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM sessions')
-            sessions = cursor.fetchall()
-            conn.close()
-            return sessions
+        # Reads use this thread's own connection and never wait on self.lock.
+        self.flush()
+        cursor = self._get_connection().execute('SELECT * FROM sessions')
+        return cursor.fetchall()
+
+    def get_server_rollup(self, server_name, period="day", when=None):
+        """Return clients served, lost and rating totals for one server and period.
+
+        `period` is "hour", "day", "month" or "all"; `when` (a datetime) defaults
+        to now. A bucket is a primary-key lookup on the rollup tables and "all" a
+        range over the server's monthly rows, never a scan of sessions.
+        """
+        self.flush()
+        conn = self._get_connection()
+        if period == ROLLUP_ALL_TIME:
+            bucket = ROLLUP_ALL_TIME
+            row = conn.execute('''
+                SELECT COALESCE(SUM(clients_served), 0), COALESCE(SUM(lost_clients), 0),
+                       COALESCE(SUM(rating_sum), 0), COALESCE(SUM(rating_count), 0)
+                FROM session_rollup_monthly
+                WHERE server_name = ?
+            ''', (server_name,)).fetchone()
+        elif period in ROLLUP_PERIODS:
+            table, bucket_format = ROLLUPS[ROLLUP_PERIODS[period]]
+            bucket = (when or datetime.now()).strftime(bucket_format)
+            row = conn.execute(f'''
+                SELECT clients_served, lost_clients, rating_sum, rating_count
+                FROM {table}
+                WHERE server_name = ? AND bucket = ?
+            ''', (server_name, bucket)).fetchone() or (0, 0, 0, 0)
+        else:
+            raise ValueError(f"Unknown rollup period '{period}', "
+                             f"expected one of {tuple(ROLLUP_PERIODS) + (ROLLUP_ALL_TIME,)}")
+
+        clients_served, lost_clients, rating_sum, rating_count = row
+        return {
+            "server_name": server_name,
+            "period": period,
+            "bucket": bucket,
+            "clients_served": clients_served,
+            "lost_clients": lost_clients,
+            "rating_sum": rating_sum,
+            "rating_count": rating_count,
+            "average_rating": round(rating_sum / rating_count, 2) if rating_count else 0
+        }
+
+    def get_server_summary(self, server_name, when=None):
+        """Today's, this month's and all-time figures for one server, as shown by ServerUI."""
+        day = self.get_server_rollup(server_name, "day", when)
+        month = self.get_server_rollup(server_name, "month", when)
+        total = self.get_server_rollup(server_name, ROLLUP_ALL_TIME)
+        return {
+            "daily_clients": day["clients_served"] + day["lost_clients"],
+            "monthly_clients": month["clients_served"] + month["lost_clients"],
+            "avg_rating": total["average_rating"],
+            "total_clients": total["clients_served"] + total["lost_clients"],
+            "lost_clients": total["lost_clients"]
+        }
+
+    def get_server_names(self):
+        """Every server that has a finished session in the rollups."""
+        self.flush()
+        rows = self._get_connection().execute(
+            "SELECT DISTINCT server_name FROM session_rollup_monthly ORDER BY server_name").fetchall()
+        return [row[0] for row in rows]
 
     def cleanup_old_data(self, days=30):
-        """Delete old data from database"""
+        """Delete old data from database (rollup tables keep their totals)"""
+        self.flush()
+        cutoff = f"-{int(days)} days"
         with self.lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
-            cursor.execute(f'''
+            # Each range delete is served by the timestamp/start_time indexes.
+            cursor.execute('''
                 DELETE FROM server_metrics
-                WHERE timestamp < datetime('now', '-{days} days')
-            ''')
-            cursor.execute(f'''
+                WHERE timestamp < datetime('now', ?)
+            ''', (cutoff,))
+            cursor.execute('''
                 DELETE FROM sessions
-                WHERE start_time < datetime('now', '-{days} days')
-            ''')
-            cursor.execute(f'''
+                WHERE start_time < datetime('now', ?)
+            ''', (cutoff,))
+            cursor.execute('''
                 DELETE FROM performance_metrics
-                WHERE timestamp < datetime('now', '-{days} days')
-            ''')
+                WHERE timestamp < datetime('now', ?)
+            ''', (cutoff,))
             conn.commit()
-            conn.close()
\ No newline at end of file
+
+
+_database = None
+_database_lock = threading.Lock()
+
+def get_database():
+    """Return this process's shared DatabaseManager, opening a fresh one after fork."""
+    global _database
+    with _database_lock:
+        if _database is None or _database.pid != os.getpid():
+            _database = DatabaseManager()
+        return _database
@@ -0,0 +1,109 @@
+# framing.py
+"""Length-prefixed message framing shared by every chat server and client.
+
+Each message travels as a 4-byte big-endian payload length followed by the
+UTF-8 payload, so several messages can be coalesced into one write and a
+message split across reads is reassembled instead of being misparsed.
+"""
+
+import struct
+from collections import deque
+from typing import Iterable, List, Optional, Union
+
+HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 1024 * 1024
+RECV_SIZE = 64 * 1024
+
+
+class FrameError(ValueError):
+    """Raised when a peer sends a frame the codec refuses to buffer."""
+
+
+def _to_bytes(message: Union[str, bytes]) -> bytes:
+    return message.encode() if isinstance(message, str) else bytes(message)
+
+
+def encode_frame(message: Union[str, bytes]) -> bytes:
+    """Encode one message as a length-prefixed frame."""
+    payload = _to_bytes(message)
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError(f"Frame of {len(payload)} bytes exceeds limit of {MAX_FRAME_SIZE}")
+    return HEADER.pack(len(payload)) + payload
+
+
+def encode_frames(messages: Iterable[Union[str, bytes]]) -> bytes:
+    """Coalesce several messages into one buffer suitable for a single sendall()."""
+    return b"".join(encode_frame(message) for message in messages)
+
+
+class FrameDecoder:
+    """Incremental parser: feed raw bytes in, get complete payloads out."""
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Buffer `data` and return every frame it completes, in order."""
+        self._buffer += data
+        frames = []
+        offset = 0
+        available = len(self._buffer)
+
+        while available - offset >= HEADER.size:
+            (length,) = HEADER.unpack_from(self._buffer, offset)
+            if length > self.max_frame_size:
+                raise FrameError(f"Frame of {length} bytes exceeds limit of {self.max_frame_size}")
+            end = offset + HEADER.size + length
+            if end > available:
+                break
+            frames.append(bytes(self._buffer[offset + HEADER.size:end]))
+            offset = end
+
+        if offset:
+            del self._buffer[:offset]
+        return frames
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._buffer)
+
+
+class FramedConnection:
+    """Blocking socket wrapper that sends and receives whole messages."""
+
+    def __init__(self, sock, max_frame_size: int = MAX_FRAME_SIZE):
+        self.sock = sock
+        self.decoder = FrameDecoder(max_frame_size)
+        self._ready = deque()
+
+    def send(self, message: Union[str, bytes]):
+        self.sock.sendall(encode_frame(message))
+
+    def send_many(self, messages: Iterable[Union[str, bytes]]):
+        """Send several messages with one sendall() call."""
+        self.sock.sendall(encode_frames(messages))
+
+    def recv_batch(self) -> List[str]:
+        """Return every message that is ready, reading until at least one arrives; [] on EOF."""
+        while not self._ready:
+            data = self.sock.recv(RECV_SIZE)
+            if not data:
+                return []
+            self._ready.extend(self.decoder.feed(data))
+
+        batch = [frame.decode() for frame in self._ready]
+        self._ready.clear()
+        return batch
+
+    def recv(self) -> Optional[str]:
+        """Return the next message, or None once the peer closes the connection."""
+        while not self._ready:
+            data = self.sock.recv(RECV_SIZE)
+            if not data:
+                return None
+            self._ready.extend(self.decoder.feed(data))
+        return self._ready.popleft().decode()
+
+    def close(self):
+        self.sock.close()
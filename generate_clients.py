@@ -1,13 +1,45 @@
+import argparse
 import csv
+import itertools
+import os
 import random
 import string
+from contextlib import ExitStack
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 
 from config import Config
+from columnar import ColumnarWriter, ColumnarReader, COLUMNAR_SUFFIX
+
+CLIENT_FIELDS = [
+    'client_id', 'client_name', 'first_name', 'last_name', 'email', 'preferred_server', 'session_duration',
+    'message_count', 'initial_message', 'response_pattern', 'rating_tendency', 'arrival_offset', 'priority',
+    'client_type', 'expected_wait_tolerance', 'chat_complexity', 'technical_level', 'satisfaction_threshold',
+    'retry_attempts', 'preferred_response_time', 'session_goal'
+]
+CLIENT_CHUNK_SIZE = 50000  # rows held in memory at once when streaming clients to disk
+
+# Column kinds for the columnar format: repeated strings are dictionary-encoded, names and emails are not.
+CLIENT_SCHEMA = [
+    ('client_id', 'int32'), ('client_name', 'string'), ('first_name', 'category'), ('last_name', 'category'),
+    ('email', 'string'), ('preferred_server', 'category'), ('session_duration', 'int32'),
+    ('message_count', 'int32'), ('initial_message', 'category'), ('response_pattern', 'category'),
+    ('rating_tendency', 'category'), ('arrival_offset', 'int32'), ('priority', 'category'),
+    ('client_type', 'category'), ('expected_wait_tolerance', 'int32'), ('chat_complexity', 'category'),
+    ('technical_level', 'category'), ('satisfaction_threshold', 'int32'), ('retry_attempts', 'int32'),
+    ('preferred_response_time', 'int32'), ('session_goal', 'category')
+]
+CHAT_SCHEMA = [
+    ('timestamp', 'int64'), ('sender', 'category'), ('message', 'category'), ('message_type', 'category'),
+    ('client_id', 'int32'), ('client_name', 'string')
+]
+FORMATS = ("csv", "columnar", "both")
 
 class ClientDataGenerator:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        # Every draw goes through this generator, so a seed reproduces a whole dataset.
+        self.rng = random.Random(seed)
+
         self.first_names = [
             "Alice", "Bob", "Charlie", "Diana", "Eve", "Frank", "Grace", "Henry",
             "Ivy", "Jack", "Karen", "Leo", "Mia", "Noah", "Olivia", "Peter",
@@ -78,65 +110,84 @@ class ClientDataGenerator:
             "Thanks for the quick response!"
         ]
     
+    def generate_client_chunks(self, num_clients: int, chunk_size: int = CLIENT_CHUNK_SIZE,
+                               start_id: int = 1) -> Iterator[List[tuple]]:
+        """Yield client rows (tuples in CLIENT_FIELDS order), at most `chunk_size` at a time.
+
+        Each column of a chunk is drawn with one batched `random.choices` call
+        instead of a call per field per client. The same seed and chunk_size
+        always give the same rows.
+        """
+        rng = self.rng
+        for chunk_start in range(start_id, start_id + num_clients, chunk_size):
+            n = min(chunk_size, start_id + num_clients - chunk_start)
+            ids = range(chunk_start, chunk_start + n)
+
+            def uniform_ints(low, high):
+                return rng.choices(range(low, high + 1), k=n)
+
+            first_names = rng.choices(self.first_names, k=n)
+            last_names = rng.choices(self.last_names, k=n)
+            domains = rng.choices(self.domains, k=n)
+            yield list(zip(
+                ids,
+                [f"{first}_{last}_{i:04d}" for first, last, i in zip(first_names, last_names, ids)],
+                first_names,
+                last_names,
+                [f"{first.lower()}.{last.lower()}{i}@{domain}"
+                 for first, last, i, domain in zip(first_names, last_names, ids, domains)],
+                rng.choices(["Server_A", "Server_B", "Server_C", "Any"], k=n),
+                uniform_ints(60, 1800),   # session_duration: 1-30 minutes
+                uniform_ints(5, 50),      # message_count
+                rng.choices(self.message_templates, k=n),
+                rng.choices(["quick", "medium", "slow", "random"], k=n),
+                rng.choices(["positive", "neutral", "negative", "random"], k=n),
+                uniform_ints(0, 86400),   # arrival_offset: spread over 24 hours
+                rng.choices(["low", "medium", "high"], k=n),
+                rng.choices(["new", "returning", "premium"], k=n),
+                uniform_ints(30, 600),    # expected_wait_tolerance, seconds
+                rng.choices(["simple", "medium", "complex"], k=n),
+                rng.choices(["beginner", "intermediate", "advanced"], k=n),
+                uniform_ints(2, 5),       # satisfaction_threshold
+                uniform_ints(1, 3),       # retry_attempts
+                uniform_ints(5, 60),      # preferred_response_time, seconds
+                rng.choices(["support", "information", "complaint", "purchase", "technical"], k=n)
+            ))
+
     def generate_client_data(self, num_clients: int = 1000) -> List[Dict[str, Any]]:
         """Generate client data for load testing"""
-        clients = []
-        
-        for i in range(num_clients):
-            # Generate basic info
-            first_name = random.choice(self.first_names)
-            last_name = random.choice(self.last_names)
-            client_name = f"{first_name}_{last_name}_{i+1:04d}"
-            
-            # Generate email
-            domain = random.choice(self.domains)
-            email = f"{first_name.lower()}.{last_name.lower()}{i+1}@{domain}"
-            
-            # Generate session preferences
-            preferred_server = random.choice(["Server_A", "Server_B", "Server_C", "Any"])
-            session_duration = random.randint(60, 1800)  # 1-30 minutes
-            message_count = random.randint(5, 50)
-            
-            # Generate chat behavior
-            initial_message = random.choice(self.message_templates)
-            response_pattern = random.choice(["quick", "medium", "slow", "random"])
-            
-            # Generate rating tendency
-            rating_tendency = random.choice(["positive", "neutral", "negative", "random"])
-            
-            # Generate arrival time (spread over 24 hours)
-            arrival_offset = random.randint(0, 86400)  # seconds in a day
-            
-            client_data = {
-                'client_id': i + 1,
-                'client_name': client_name,
-                'first_name': first_name,
-                'last_name': last_name,
-                'email': email,
-                'preferred_server': preferred_server,
-                'session_duration': session_duration,
-                'message_count': message_count,
-                'initial_message': initial_message,
-                'response_pattern': response_pattern,
-                'rating_tendency': rating_tendency,
-                'arrival_offset': arrival_offset,
-                'priority': random.choice(["low", "medium", "high"]),
-                'client_type': random.choice(["new", "returning", "premium"]),
-                'expected_wait_tolerance': random.randint(30, 600),  # seconds
-                'chat_complexity': random.choice(["simple", "medium", "complex"]),
-                'technical_level': random.choice(["beginner", "intermediate", "advanced"]),
-                'satisfaction_threshold': random.randint(2, 5),
-                'retry_attempts': random.randint(1, 3),
-                'preferred_response_time': random.randint(5, 60),  # seconds
-                'session_goal': random.choice([
-                    "support", "information", "complaint", "purchase", "technical"
-                ])
-            }
-            
-            clients.append(client_data)
-        
-        return clients
-    
+        return [dict(zip(CLIENT_FIELDS, row))
+                for chunk in self.generate_client_chunks(num_clients)
+                for row in chunk]
+
+    def stream_clients(self, num_clients: int, csv_filename: Optional[str] = None,
+                       columnar_filename: Optional[str] = None, chunk_size: int = CLIENT_CHUNK_SIZE) -> int:
+        """Write `num_clients` clients chunk by chunk to a CSV and/or a columnar file
+
+        Both files get the same rows, and memory stays bounded by `chunk_size` rows.
+        """
+        with ExitStack() as stack:
+            writers = []
+            if csv_filename:
+                csvfile = stack.enter_context(open(csv_filename, 'w', newline='', encoding='utf-8'))
+                csv_writer = csv.writer(csvfile)
+                csv_writer.writerow(CLIENT_FIELDS)
+                writers.append(csv_writer.writerows)
+            if columnar_filename:
+                writers.append(stack.enter_context(ColumnarWriter(columnar_filename, CLIENT_SCHEMA)).write_rows)
+            for chunk in self.generate_client_chunks(num_clients, chunk_size):
+                for write in writers:
+                    write(chunk)
+
+        for filename in filter(None, (csv_filename, columnar_filename)):
+            print(f"Saved {num_clients} clients to {filename}")
+        return num_clients
+
+    def stream_clients_to_csv(self, num_clients: int, filename: str = "clients.csv",
+                              chunk_size: int = CLIENT_CHUNK_SIZE) -> int:
+        """Write `num_clients` clients chunk by chunk, so memory stays bounded by `chunk_size` rows"""
+        return self.stream_clients(num_clients, csv_filename=filename, chunk_size=chunk_size)
+
     def generate_chat_simulation_data(self, client_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate chat simulation data for a specific client"""
         chat_data = []
@@ -152,17 +203,18 @@ class ClientDataGenerator:
         # Generate conversation flow
         message_count = client_data['message_count']
         response_pattern = client_data['response_pattern']
+        elapsed = 0
         
         for i in range(1, message_count):
             # Determine response time based on pattern
             if response_pattern == "quick":
-                response_time = random.randint(1, 10)
+                response_time = self.rng.randint(1, 10)
             elif response_pattern == "medium":
-                response_time = random.randint(10, 30)
+                response_time = self.rng.randint(10, 30)
             elif response_pattern == "slow":
-                response_time = random.randint(30, 120)
+                response_time = self.rng.randint(30, 120)
             else:  # random
-                response_time = random.randint(1, 60)
+                response_time = self.rng.randint(1, 60)
             
             # Determine sender (simulate server responses)
             if i % 2 == 0:
@@ -170,10 +222,11 @@ class ClientDataGenerator:
                 message = f"Server response {i//2}"
             else:
                 sender = 'client'
-                message = random.choice(self.chat_responses)
+                message = self.rng.choice(self.chat_responses)
             
+            elapsed += response_time
             chat_data.append({
-                'timestamp': sum(item['timestamp'] for item in chat_data[-3:]) + response_time,
+                'timestamp': elapsed,
                 'sender': sender,
                 'message': message,
                 'message_type': 'response'
@@ -182,7 +235,7 @@ class ClientDataGenerator:
         # Generate final rating
         rating = self._generate_rating(client_data['rating_tendency'])
         chat_data.append({
-            'timestamp': chat_data[-1]['timestamp'] + random.randint(5, 30),
+            'timestamp': chat_data[-1]['timestamp'] + self.rng.randint(5, 30),
             'sender': 'client',
             'message': f"Rating: {rating}",
             'message_type': 'rating'
@@ -193,13 +246,13 @@ class ClientDataGenerator:
     def _generate_rating(self, tendency: str) -> int:
         """Generate rating based on tendency"""
         if tendency == "positive":
-            return random.choice([4, 5, 5, 5])
+            return self.rng.choice([4, 5, 5, 5])
         elif tendency == "negative":
-            return random.choice([1, 2, 2, 3])
+            return self.rng.choice([1, 2, 2, 3])
         elif tendency == "neutral":
-            return random.choice([3, 3, 4])
+            return self.rng.choice([3, 3, 4])
         else:  # random
-            return random.randint(1, 5)
+            return self.rng.randint(1, 5)
     
     def save_to_csv(self, clients: List[Dict[str, Any]], filename: str = "clients.csv"):
         """Save client data to CSV file"""
@@ -216,6 +269,12 @@ class ClientDataGenerator:
         
         print(f"Saved {len(clients)} clients to {filename}")
     
+    def save_to_columnar(self, rows: List[Dict[str, Any]], schema, filename: str):
+        """Save rows to a columnar binary file (see columnar.py)"""
+        with ColumnarWriter(filename, schema) as writer:
+            writer.write_rows([tuple(row[name] for name, _ in schema) for row in rows])
+        print(f"Saved {len(rows)} rows to {filename}")
+    
     def generate_load_test_scenarios(self, num_scenarios: int = 10) -> List[Dict[str, Any]]:
         """Generate different load test scenarios"""
         scenarios = []
@@ -225,15 +284,15 @@ class ClientDataGenerator:
                 'scenario_id': i + 1,
                 'name': f"LoadTest_Scenario_{i+1}",
                 'description': f"Load test scenario {i+1}",
-                'client_count': random.randint(50, 500),
-                'duration': random.randint(300, 3600),  # 5-60 minutes
-                'arrival_rate': random.choice([1, 2, 5, 10, 20]),  # clients per second
-                'server_count': random.randint(1, 5),
-                'concurrent_limit': random.randint(10, 100),
-                'target_response_time': random.randint(1, 10),  # seconds
-                'expected_throughput': random.randint(10, 100),  # messages per second
-                'stress_level': random.choice(["low", "medium", "high", "extreme"]),
-                'test_type': random.choice(["load", "stress", "endurance", "spike"])
+                'client_count': self.rng.randint(50, 500),
+                'duration': self.rng.randint(300, 3600),  # 5-60 minutes
+                'arrival_rate': self.rng.choice([1, 2, 5, 10, 20]),  # clients per second
+                'server_count': self.rng.randint(1, 5),
+                'concurrent_limit': self.rng.randint(10, 100),
+                'target_response_time': self.rng.randint(1, 10),  # seconds
+                'expected_throughput': self.rng.randint(10, 100),  # messages per second
+                'stress_level': self.rng.choice(["low", "medium", "high", "extreme"]),
+                'test_type': self.rng.choice(["load", "stress", "endurance", "spike"])
             }
             scenarios.append(scenario)
         
@@ -293,12 +352,31 @@ class ClientDataGenerator:
 
 def main():
     """Main function to generate test data"""
-    generator = ClientDataGenerator()
+    parser = argparse.ArgumentParser(description="Generate client, scenario and chat data for load testing")
+    parser.add_argument("--clients", type=int, default=1000, help="number of clients to generate")
+    parser.add_argument("--chunk-size", type=int, default=CLIENT_CHUNK_SIZE,
+                        help="clients generated and written per chunk (bounds memory use)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a reproducible dataset")
+    parser.add_argument("--output", default="clients.csv")
+    parser.add_argument("--chat-clients", type=int, default=10,
+                        help="clients (from the start of the file) to script chat data for")
+    parser.add_argument("--clients-only", action="store_true",
+                        help="skip scenarios, profiles and chat data")
+    parser.add_argument("--format", choices=FORMATS, default="csv",
+                        help=f"client and chat data as CSV, columnar binary ({COLUMNAR_SUFFIX}), or both")
+    args = parser.parse_args()
+
+    generator = ClientDataGenerator(args.seed)
+    write_csv = args.format in ("csv", "both")
+    write_columnar = args.format in ("columnar", "both")
+    columnar_output = os.path.splitext(args.output)[0] + COLUMNAR_SUFFIX
     
     # Generate client data
     print("Generating client data...")
-    clients = generator.generate_client_data(1000)
-    generator.save_to_csv(clients, "clients.csv")
+    generator.stream_clients(args.clients, args.output if write_csv else None,
+                             columnar_output if write_columnar else None, args.chunk_size)
+    if args.clients_only:
+        return
     
     # Generate load test scenarios
     print("Generating load test scenarios...")
@@ -310,23 +388,33 @@ def main():
     profiles = generator.create_performance_profiles()
     generator.save_to_csv(profiles, "performance_profiles.csv")
     
-    # Generate sample chat data for first 10 clients
+    # Generate sample chat data for the first clients, read back from the file just written
     print("Generating sample chat data...")
+    if write_csv:
+        with open(args.output, newline='', encoding='utf-8') as csvfile:
+            chat_clients = [dict(row, client_id=int(row['client_id']), message_count=int(row['message_count']))
+                            for row in itertools.islice(csv.DictReader(csvfile), args.chat_clients)]
+    else:
+        with ColumnarReader(columnar_output) as reader:
+            chat_clients = [reader.row(i) for i in range(min(args.chat_clients, len(reader)))]
     chat_data_all = []
-    for i, client in enumerate(clients[:10]):
+    for client in chat_clients:
         chat_data = generator.generate_chat_simulation_data(client)
         for chat_entry in chat_data:
             chat_entry['client_id'] = client['client_id']
             chat_entry['client_name'] = client['client_name']
             chat_data_all.append(chat_entry)
     
-    generator.save_to_csv(chat_data_all, "sample_chat_data.csv")
+    if write_csv:
+        generator.save_to_csv(chat_data_all, "sample_chat_data.csv")
+    if write_columnar:
+        generator.save_to_columnar(chat_data_all, CHAT_SCHEMA, "sample_chat_data" + COLUMNAR_SUFFIX)
     
     print("\nData generation complete!")
-    print(f"Generated {len(clients)} clients")
+    print(f"Generated {args.clients} clients")
     print(f"Generated {len(scenarios)} load test scenarios")
     print(f"Generated {len(profiles)} performance profiles")
     print(f"Generated {len(chat_data_all)} sample chat messages")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
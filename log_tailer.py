@@ -0,0 +1,193 @@
+# log_tailer.py
+"""Follow a growing log file and deliver new lines in parsed batches.
+
+On Linux the tailer sleeps on inotify events for the file's directory, so an
+idle log costs no wakeups. Elsewhere, or if inotify is unavailable, it polls
+with an interval that backs off while the file is quiet. Either way it follows
+rotation: when the path is replaced or truncated, the rest of the old file is
+read and the new one is opened from its start.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import time
+from typing import Callable, Iterator, List
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+MIN_POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 2.0
+
+
+class _Inotify:
+    """Minimal ctypes binding: one watch on a directory, filtered to one file name."""
+
+    def __init__(self, directory: str, name: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+        self.name = os.fsencode(name)
+
+    def wait(self, timeout: float) -> bool:
+        """Block until an event for the watched file arrives; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            if self._drain():
+                return True
+
+    def _drain(self) -> bool:
+        matched = False
+        try:
+            while True:
+                data = os.read(self.fd, 64 * 1024)
+                offset = 0
+                while offset + EVENT_HEADER.size <= len(data):
+                    _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                    start = offset + EVENT_HEADER.size
+                    if data[start:start + length].rstrip(b"\0") == self.name:
+                        matched = True
+                    offset = start + length
+        except BlockingIOError:
+            pass
+        return matched
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogTailer:
+    """Iterate over batches of parsed entries appended to `path`.
+
+    `parse` turns a line into an entry; lines it rejects with ValueError are
+    skipped. Iteration ends once `stop()` is called.
+    """
+
+    def __init__(self, path: str, parse: Callable[[str], object] = json.loads, from_start: bool = False,
+                 max_batch: int = 500, use_inotify: bool = True):
+        self.path = os.path.abspath(path)
+        self.parse = parse
+        self.max_batch = max_batch
+        self.running = True
+        self.file = None
+        self.partial = ""
+        self._open(seek_end=not from_start)
+
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = _Inotify(os.path.dirname(self.path), os.path.basename(self.path))
+            except (OSError, AttributeError):
+                self.inotify = None  # not Linux, or out of watches: poll instead
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.inotify is not None else "polling"
+
+    def _open(self, seek_end: bool = False):
+        try:
+            self.file = open(self.path, "r", encoding="utf-8", errors="replace")
+        except FileNotFoundError:
+            self.file = None
+            return
+        if seek_end:
+            self.file.seek(0, os.SEEK_END)
+
+    def _rotated(self) -> bool:
+        """True if the path now names a different (or truncated) file than the one open."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if self.file is None:
+            return True
+        current = os.fstat(self.file.fileno())
+        return st.st_ino != current.st_ino or st.st_size < self.file.tell()
+
+    def _drain(self) -> List[str]:
+        """Complete lines appended to the open file since the last read."""
+        if self.file is None:
+            return []
+        chunk = self.file.read()
+        if not chunk:
+            return []
+        lines = (self.partial + chunk).split("\n")
+        self.partial = lines.pop()  # incomplete trailing line, if any
+        return lines
+
+    def _read_lines(self) -> List[str]:
+        lines = self._drain()
+        if self._rotated():
+            # Lines may have landed in the old file between the read above and the
+            # rename; read it once more, and end its unterminated last line here.
+            lines.extend(self._drain())
+            if self.partial:
+                lines.append(self.partial)
+                self.partial = ""
+            if self.file is not None:
+                self.file.close()
+            self._open()
+            lines.extend(self._read_lines())
+        return lines
+
+    def read_batch(self) -> List[object]:
+        """Return every complete entry appended since the last call, without blocking."""
+        entries = []
+        for line in self._read_lines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(self.parse(line))
+            except ValueError:
+                continue
+        return entries
+
+    def __iter__(self) -> Iterator[List[object]]:
+        interval = MIN_POLL_INTERVAL
+        while self.running:
+            entries = self.read_batch()
+            for start in range(0, len(entries), self.max_batch):
+                yield entries[start:start + self.max_batch]
+
+            if self.inotify is not None:
+                # The timeout only bounds how long stop() takes to be noticed.
+                self.inotify.wait(MAX_POLL_INTERVAL)
+            else:
+                interval = MIN_POLL_INTERVAL if entries else min(interval * 2, MAX_POLL_INTERVAL)
+                time.sleep(interval)
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        self.stop()
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
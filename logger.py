@@ -1,12 +1,21 @@
 # logger.py
+import asyncio
+import atexit
+import json
 import logging
+import multiprocessing.util
 import os
+import time
 from datetime import datetime
-from threading import Lock
-from config import Config
+from queue import Queue, Empty, Full
+from threading import Condition, Lock, Thread
+from config import Config, get_config
+from constants import (ARCHIVE_PATH, BUFFER_SIZE, FLUSH_INTERVAL_SECONDS, MAX_QUEUE_SIZE, LOG_OVERFLOW_BLOCK,
+                       LOG_OVERFLOW_POLICIES, LOG_OVERFLOW_POLICY)
+from archive_store import SegmentedArchive
 
-# Global archive lock for thread-safe writes
-archive_lock = Lock()
+# Report dropped archive entries on the first drop and then every this many.
+DROP_REPORT_INTERVAL = 100
 
 class Logger:
     def __init__(self, name="chat_server", log_file=None):
@@ -51,13 +60,203 @@ class Logger:
 # Global logger
 global_logger = Logger("global_logger")
 
-def log_session(server_name, client_name, rating):
+
+def json_archive_path(path=None):
+    """Path of the JSON-lines archive kept alongside the text archive at `path`."""
+    path = path or get_config("database", "archive_path", ARCHIVE_PATH)
+    return os.path.splitext(path)[0] + ".jsonl"
+
+
+class ArchiveWriter:
+    """Background writer that batches archive lines into one append per flush.
+
+    Entries written with a `record` dict are also appended, one JSON object per
+    line, to a structured archive next to the text one (archive.jsonl) for
+    machine readers such as ServerUI.
+
+    Producers only enqueue into a bounded queue. When it is full, what happens
+    depends on `overflow_policy` (`logging.overflow_policy`): "block" waits up
+    to `put_timeout` seconds for room and drops the entry after that, so a slow
+    disk applies back-pressure without stalling servers indefinitely; "drop"
+    drops it at once. A producer on a thread running an asyncio event loop
+    never blocks, whatever the policy. Entries written after `close()` are
+    dropped too. Drops are counted in the stats and reported to the log.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path=None, buffer_size=None, flush_interval=None, max_queue_size=None, put_timeout=0.5,
+                 rotation_size_mb=None, overflow_policy=None):
+        self.path = path or get_config("database", "archive_path", ARCHIVE_PATH)
+        self.store = SegmentedArchive(self.path, rotation_size_mb=rotation_size_mb)
+        self.json_path = json_archive_path(self.path)
+        self.json_store = SegmentedArchive(self.json_path,
+                                           segment_dir=os.path.splitext(self.path)[0] + "_json_segments",
+                                           rotation_size_mb=rotation_size_mb)
+        self.buffer_size = buffer_size or get_config("logging", "buffer_size", BUFFER_SIZE)
+        self.flush_interval = flush_interval or get_config("logging", "flush_interval_seconds", FLUSH_INTERVAL_SECONDS)
+        self.put_timeout = put_timeout
+        self.overflow_policy = overflow_policy or get_config("logging", "overflow_policy", LOG_OVERFLOW_POLICY)
+        if self.overflow_policy not in LOG_OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{self.overflow_policy}', expected one of {LOG_OVERFLOW_POLICIES}")
+        self.queue = Queue(maxsize=max_queue_size or get_config("logging", "max_queue_size", MAX_QUEUE_SIZE))
+        self.pid = os.getpid()
+        self.closed = False
+        self.producers = 0  # write() calls in progress; close() waits for them before stopping the thread
+        self.producers_changed = Condition()
+
+        self.stats_lock = Lock()
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "flushes": 0,
+            "blocked_puts": 0,
+            "dropped": 0,
+            "max_queue_depth": 0,
+            "write_errors": 0
+        }
+
+        self.thread = Thread(target=self._run, name="archive-writer", daemon=True)
+        self.thread.start()
+        # multiprocessing children skip atexit, so also register a multiprocessing finalizer.
+        atexit.register(self.close)
+        multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+
+    def write(self, line, record=None):
+        """Queue one archive line (and optional JSON record); returns False if it was dropped."""
+        with self.producers_changed:
+            closed = self.closed
+            if not closed:
+                self.producers += 1
+        if closed:
+            self._dropped("the writer is closed")
+            return False
+        try:
+            return self._enqueue((line, record))
+        finally:
+            with self.producers_changed:
+                self.producers -= 1
+                self.producers_changed.notify_all()
+
+    def _enqueue(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except Full:
+            if self.overflow_policy != LOG_OVERFLOW_BLOCK or _in_event_loop():
+                self._dropped("the queue is full")
+                return False
+            with self.stats_lock:
+                self.stats["blocked_puts"] += 1
+            try:
+                self.queue.put(item, timeout=self.put_timeout)
+            except Full:
+                self._dropped(f"the queue stayed full for {self.put_timeout}s")
+                return False
+
+        with self.stats_lock:
+            self.stats["enqueued"] += 1
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queue.qsize())
+        return True
+
+    def _dropped(self, reason):
+        with self.stats_lock:
+            self.stats["dropped"] += 1
+            dropped = self.stats["dropped"]
+        if dropped == 1 or dropped % DROP_REPORT_INTERVAL == 0:
+            global_logger.log_warning(f"Dropped an archive entry because {reason} ({dropped} dropped so far)")
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except Empty:
+                item = None
+
+            if item is self._STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.buffer_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        records = [json.dumps(record) + "\n" for _, record in batch if record is not None]
+        try:
+            # SegmentedArchive serialises appends itself, across threads and processes.
+            self.store.append([line for line, _ in batch])
+            if records:
+                self.json_store.append(records)
+            with self.stats_lock:
+                self.stats["written"] += len(batch)
+                self.stats["flushes"] += 1
+        except Exception as e:
+            with self.stats_lock:
+                self.stats["write_errors"] += 1
+            global_logger.log_error(f"Failed to write {len(batch)} archive entries: {e}")
+
+    def close(self):
+        """Flush everything still queued and stop the writer thread."""
+        if self.pid != os.getpid():
+            return
+        with self.producers_changed:
+            if self.closed:
+                return
+            self.closed = True
+            # Writes already past the closed check finish (within put_timeout) before the stop marker.
+            self.producers_changed.wait_for(lambda: self.producers == 0)
+        self.queue.put(self._STOP)
+        self.thread.join(timeout=10)
+
+    def get_stats(self):
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self.queue.qsize()
+        return stats
+
+
+def _in_event_loop():
+    """Whether the calling thread is running an asyncio event loop, which must not block."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+_archive_writer = None
+_archive_writer_lock = Lock()
+
+def get_archive_writer():
+    """Return this process's archive writer, starting a fresh one after fork."""
+    global _archive_writer
+    with _archive_writer_lock:
+        if _archive_writer is None or _archive_writer.pid != os.getpid():
+            _archive_writer = ArchiveWriter()
+        return _archive_writer
+
+def get_archive_stats():
+    return get_archive_writer().get_stats()
+
+def log_session(server_name, client_name, rating, lost=False):
     try:
-        os.makedirs("logs", exist_ok=True)
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        session_entry = f"[{timestamp}] Server: {server_name}, Client: {client_name}, Rating: {rating}\n"
-        with archive_lock:
-            with open("archive.txt", "a") as archive_file:
-                archive_file.write(session_entry)
+        session_entry = f"[{timestamp}] Server: {server_name}, Client: {client_name}, Rating: {'LOST' if lost else rating}\n"
+        record = {
+            "timestamp": timestamp,
+            "server_name": server_name,
+            "client_name": client_name,
+            "rating": None if lost else rating,
+            "event_type": "SESSION_LOST" if lost else "SESSION_RATED",
+            "message": f"{client_name} {'was lost' if lost else f'rated {rating}'}"
+        }
+        get_archive_writer().write(session_entry, record)
     except Exception as e:
-        global_logger.error(f"Failed to log session: {e}")
\ No newline at end of file
+        global_logger.log_error(f"Failed to log session: {e}")
@@ -1,36 +1,38 @@
 import time
 import threading
-import psutil
 import json
+from collections import deque
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-from database import Database
+from database import DatabaseManager
 from logger import Logger
-from utils import ThreadSafeCounter, format_timestamp
+from system_sampler import SystemSampler
+from utils import EventCounters, LatencyHistogram, format_timestamp
 
 class MetricsCollector:
     """Collects and stores system and application metrics."""
     
-    def __init__(self, db: Database, logger: Logger, collection_interval: int = 5):
+    def __init__(self, db: DatabaseManager, logger: Logger, collection_interval: int = 5):
         self.db = db
         self.logger = logger
         self.collection_interval = collection_interval
         self.is_running = False
         self.collection_thread = None
         
-        # Metrics counters
-        self.connection_count = ThreadSafeCounter()
-        self.message_count = ThreadSafeCounter()
-        self.error_count = ThreadSafeCounter()
-        self.request_count = ThreadSafeCounter()
+        # Metrics counters: per-thread shards, so recording never contends on a lock
+        self.events = EventCounters('connections', 'messages', 'errors', 'requests')
+        self.connection_count = self.events['connections']
+        self.message_count = self.events['messages']
+        self.error_count = self.events['errors']
+        self.request_count = self.events['requests']
         
-        # Performance metrics
-        self.response_times = []
-        self.response_times_lock = threading.Lock()
+        # Performance metrics: fixed-memory histogram, O(1) per record
+        self.response_times = LatencyHistogram()
         
-        # System metrics cache
+        # System metrics: non-blocking /proc sampler and a ring buffer of recent collections
+        self.sampler = SystemSampler(interval=collection_interval)
         self.last_system_metrics = {}
-        self.metrics_cache = []
+        self.metrics_cache = deque(maxlen=100)
         self.cache_lock = threading.Lock()
     
     def start_collection(self):
@@ -64,37 +66,18 @@ class MetricsCollector:
     def _collect_system_metrics(self) -> Dict[str, Any]:
         """Collect system performance metrics."""
         try:
-            # CPU metrics
-            cpu_percent = psutil.cpu_percent(interval=1)
-            cpu_count = psutil.cpu_count()
+            # CPU, memory, disk and network, derived from counter deltas since the last sample
+            metrics = dict(self.sampler.sample())
             
-            # Memory metrics
-            memory = psutil.virtual_memory()
-            
-            # Disk metrics
-            disk = psutil.disk_usage('/')
-            
-            # Network metrics (if available)
-            network = psutil.net_io_counters()
-            
-            return {
-                'timestamp': time.time(),
-                'cpu_percent': cpu_percent,
-                'cpu_count': cpu_count,
-                'memory_total': memory.total,
-                'memory_used': memory.used,
-                'memory_percent': memory.percent,
-                'disk_total': disk.total,
-                'disk_used': disk.used,
-                'disk_percent': disk.percent,
-                'network_bytes_sent': network.bytes_sent,
-                'network_bytes_recv': network.bytes_recv,
-                'connections': self.connection_count.get_value(),
-                'messages_processed': self.message_count.get_value(),
-                'errors': self.error_count.get_value(),
-                'requests': self.request_count.get_value(),
+            events = self.events.snapshot()
+            metrics.update({
+                'connections': events['connections'],
+                'messages_processed': events['messages'],
+                'errors': events['errors'],
+                'requests': events['requests'],
                 'avg_response_time': self._calculate_avg_response_time()
-            }
+            })
+            return metrics
         except Exception as e:
             self.logger.error(f"Error collecting system metrics: {e}")
             return {'timestamp': time.time(), 'error': str(e)}
@@ -110,17 +93,15 @@ class MetricsCollector:
         """Update metrics cache for quick access."""
         with self.cache_lock:
             self.metrics_cache.append(metrics)
-            # Keep only last 100 entries
-            if len(self.metrics_cache) > 100:
-                self.metrics_cache.pop(0)
             self.last_system_metrics = metrics
     
     def _calculate_avg_response_time(self) -> float:
         """Calculate average response time."""
-        with self.response_times_lock:
-            if not self.response_times:
-                return 0.0
-            return sum(self.response_times) / len(self.response_times)
+        return self.response_times.mean()
+    
+    def record_event(self, connections: int = 0, messages: int = 0, errors: int = 0, requests: int = 0):
+        """Record several counter deltas in one call, e.g. a request that carried a message."""
+        self.events.record(connections=connections, messages=messages, errors=errors, requests=requests)
     
     def record_connection(self, increment: bool = True):
         """Record connection event."""
@@ -142,12 +123,8 @@ class MetricsCollector:
         self.request_count.increment()
     
     def record_response_time(self, response_time: float):
-        """Record response time."""
-        with self.response_times_lock:
-            self.response_times.append(response_time)
-            # Keep only last 1000 response times
-            if len(self.response_times) > 1000:
-                self.response_times.pop(0)
+        """Record response time in milliseconds."""
+        self.response_times.record(response_time)
     
     def get_current_metrics(self) -> Dict[str, Any]:
         """Get current system metrics."""
@@ -167,14 +144,16 @@ class MetricsCollector:
     def get_performance_summary(self) -> Dict[str, Any]:
         """Get performance summary."""
         current_metrics = self.get_current_metrics()
+        events = self.events.snapshot()
         
         return {
             'timestamp': format_timestamp(),
-            'active_connections': self.connection_count.get_value(),
-            'total_messages': self.message_count.get_value(),
-            'total_errors': self.error_count.get_value(),
-            'total_requests': self.request_count.get_value(),
+            'active_connections': events['connections'],
+            'total_messages': events['messages'],
+            'total_errors': events['errors'],
+            'total_requests': events['requests'],
             'avg_response_time_ms': self._calculate_avg_response_time(),
+            'response_time_percentiles_ms': self.response_times.summary(),
             'cpu_usage_percent': current_metrics.get('cpu_percent', 0),
             'memory_usage_percent': current_metrics.get('memory_percent', 0),
             'disk_usage_percent': current_metrics.get('disk_percent', 0),
@@ -183,13 +162,9 @@ class MetricsCollector:
     
     def reset_counters(self):
         """Reset all counters."""
-        self.connection_count.reset()
-        self.message_count.reset()
-        self.error_count.reset()
-        self.request_count.reset()
+        self.events.reset()
         
-        with self.response_times_lock:
-            self.response_times.clear()
+        self.response_times.reset()
         
         self.logger.info("Metrics counters reset")
     
@@ -199,6 +174,7 @@ class MetricsCollector:
             metrics_data = {
                 'export_timestamp': time.time(),
                 'summary': self.get_performance_summary(),
+                'response_time_histogram': self.response_times.to_dict(),
                 'history': self.get_metrics_history(hours)
             }
             
@@ -0,0 +1,178 @@
+# process_accounting.py
+"""Resource accounting for one process and every process it spawns.
+
+`ProcessTreeMonitor` samples a root PID and all of its descendants on a
+background thread: CPU time, RSS/USS, context switches, open file
+descriptors, threads (with per-thread CPU time) and I/O bytes. Processes that
+exit keep the counters of their last sample, so short-lived children still
+show up in the totals; anything they did between that sample and exiting is
+not seen, which `interval` bounds.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import psutil
+
+NO_ACCESS = (psutil.AccessDenied, psutil.ZombieProcess, AttributeError, NotImplementedError)
+
+
+def _optional(call, default=None):
+    """Run a psutil accessor that some platforms or permissions do not allow."""
+    try:
+        return call()
+    except NO_ACCESS:
+        return default
+
+
+def _read_process(proc: psutil.Process, top_threads: int) -> Dict[str, Any]:
+    with proc.oneshot():
+        cpu = proc.cpu_times()
+        memory = _optional(proc.memory_full_info) or proc.memory_info()
+        ctx = proc.num_ctx_switches()
+        io = _optional(proc.io_counters)
+        threads = _optional(proc.threads, [])
+        return {
+            "pid": proc.pid,
+            "ppid": _optional(proc.ppid),
+            "name": _optional(proc.name, ""),
+            "cpu_user": cpu.user,
+            "cpu_system": cpu.system,
+            "rss": memory.rss,
+            "uss": getattr(memory, "uss", None),
+            "ctx_voluntary": ctx.voluntary,
+            "ctx_involuntary": ctx.involuntary,
+            "num_fds": _optional(proc.num_fds),
+            "num_threads": proc.num_threads(),
+            "read_bytes": getattr(io, "read_bytes", None),
+            "write_bytes": getattr(io, "write_bytes", None),
+            "threads": [
+                {"id": t.id, "cpu_user": t.user_time, "cpu_system": t.system_time}
+                for t in sorted(threads, key=lambda t: t.user_time + t.system_time, reverse=True)[:top_threads]
+            ]
+        }
+
+
+class ProcessTreeMonitor:
+    """Account for the resources used by `pid` and all of its descendants.
+
+    Call `start()` right after launching the process and `stop()` once it has
+    finished; `stop()` takes a last sample and returns `report()`.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.5, top_threads: int = 5):
+        self.pid = pid
+        self.interval = interval
+        self.top_threads = top_threads
+        self.lock = threading.Lock()
+        self._tracked = {}   # (pid, create_time) -> psutil.Process still believed alive
+        self._last = {}      # (pid, create_time) -> most recent reading
+        self._exited = set()
+        self.samples = 0
+        self.peaks = {"processes": 0, "rss": 0, "uss": 0, "num_fds": 0, "num_threads": 0}
+        self.started_at = None
+        self.stopped_at = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        try:
+            root = psutil.Process(pid)
+            self._tracked[(pid, root.create_time())] = root
+        except psutil.NoSuchProcess:
+            pass
+
+    def _discover(self):
+        """Add descendants of every tracked process, so orphans of an exited parent are kept."""
+        for proc in list(self._tracked.values()):
+            try:
+                children = proc.children(recursive=True)
+            except psutil.NoSuchProcess:
+                continue
+            for child in children:
+                try:
+                    key = (child.pid, child.create_time())
+                except psutil.NoSuchProcess:
+                    continue
+                self._tracked.setdefault(key, child)
+
+    def sample(self):
+        """Read every live process in the tree once and update peaks."""
+        with self.lock:
+            self._discover()
+            live = []
+            for key, proc in list(self._tracked.items()):
+                try:
+                    reading = _read_process(proc, self.top_threads)
+                except psutil.NoSuchProcess:
+                    del self._tracked[key]
+                    self._exited.add(key)
+                    continue
+                self._last[key] = reading
+                live.append(reading)
+
+            self.samples += 1
+            current = {
+                "processes": len(live),
+                "rss": sum(r["rss"] for r in live),
+                "uss": sum(r["uss"] or 0 for r in live),
+                "num_fds": sum(r["num_fds"] or 0 for r in live),
+                "num_threads": sum(r["num_threads"] for r in live)
+            }
+            for name, value in current.items():
+                self.peaks[name] = max(self.peaks[name], value)
+
+    def start(self):
+        """Sample every `interval` seconds on a daemon thread."""
+        if self._thread is None:
+            self.started_at = time.time()
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name=f"process-tree-{self.pid}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self.sample()
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop sampling, take a final sample of whatever is still running and return the report."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.sample()
+        self.stopped_at = time.time()
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        with self.lock:
+            readings = [dict(r, exited=key in self._exited) for key, r in self._last.items()]
+            peaks = dict(self.peaks)
+            samples = self.samples
+
+        def total(name) -> Optional[float]:
+            values = [r[name] for r in readings if r[name] is not None]
+            return sum(values) if values else None
+
+        cpu_user, cpu_system = total("cpu_user") or 0.0, total("cpu_system") or 0.0
+        wall_time = (self.stopped_at or time.time()) - self.started_at if self.started_at else None
+        return {
+            "root_pid": self.pid,
+            "samples": samples,
+            "wall_time": wall_time,
+            "totals": {
+                "processes": len(readings),
+                "cpu_user": cpu_user,
+                "cpu_system": cpu_system,
+                "cpu_time": cpu_user + cpu_system,
+                "cpu_percent": round(100.0 * (cpu_user + cpu_system) / wall_time, 1) if wall_time else None,
+                "ctx_voluntary": total("ctx_voluntary") or 0,
+                "ctx_involuntary": total("ctx_involuntary") or 0,
+                "read_bytes": total("read_bytes"),
+                "write_bytes": total("write_bytes")
+            },
+            "peaks": peaks,
+            "processes": sorted(readings, key=lambda r: r["cpu_user"] + r["cpu_system"], reverse=True)
+        }
@@ -0,0 +1,136 @@
+# result_ring.py
+"""Fixed-size shared-memory records for collecting per-client results from child processes.
+
+Each client process owns one slot, chosen by the parent, and packs its result
+straight into shared memory: no locks, no pickling and no round trip to a
+manager process. The parent reads the slots once the children have exited.
+Round-trip times are reduced in the child to a count, sum and maximum so a
+record stays the same size however many messages a client sent.
+
+Workers that run many clients each can instead stream packed records back in
+batches through a `ResultBatcher`.
+"""
+
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+STATUS_EMPTY = 0
+STATUS_SERVED = 1
+STATUS_LOST = 2
+STATUS_NAMES = {STATUS_SERVED: "served", STATUS_LOST: "lost"}
+
+# status, rating, server_port, client_id, messages_sent, rtt_count, duration, timestamp, rtt_sum_ms, rtt_max_ms
+RECORD = struct.Struct("<BBHIIIdddd")
+
+
+def pack_record(status: int, client_id: int, server_port: int = 0, messages_sent: int = 0,
+                duration: float = 0.0, rating: int = 0, round_trip_times_ms=()) -> bytes:
+    """One client's result as a RECORD, with its round-trip times summarised."""
+    rtt_count, rtt_sum, rtt_max = 0, 0.0, 0.0
+    for rtt in round_trip_times_ms:
+        rtt_count += 1
+        rtt_sum += rtt
+        rtt_max = max(rtt_max, rtt)
+    return RECORD.pack(status, rating, server_port, client_id, messages_sent, rtt_count,
+                       duration, time.time(), rtt_sum, rtt_max)
+
+
+class ResultRing:
+    """`capacity` result slots in a shared memory block.
+
+    Create it in the parent before starting the children; forked children
+    inherit the mapping. Writers must each use their own slot.
+    """
+
+    def __init__(self, capacity: int, name: Optional[str] = None):
+        self.capacity = capacity
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(capacity, 1) * RECORD.size)
+            self.shm.buf[:capacity * RECORD.size] = bytes(capacity * RECORD.size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, slot: int, status: int, client_id: int, server_port: int = 0, messages_sent: int = 0,
+              duration: float = 0.0, rating: int = 0, round_trip_times_ms=()):
+        """Pack one client's result into `slot`, summarising its round-trip times."""
+        self.put(slot, pack_record(status, client_id, server_port, messages_sent, duration, rating,
+                                   round_trip_times_ms))
+
+    def put(self, slot: int, record: bytes):
+        """Store a record produced by `pack_record`, e.g. one streamed back by a ResultBatcher."""
+        offset = slot * RECORD.size
+        self.shm.buf[offset:offset + RECORD.size] = record
+
+    def read(self, slot: int) -> Optional[Dict[str, Any]]:
+        """The record in `slot`, or None if nobody wrote it."""
+        (status, rating, server_port, client_id, messages_sent, rtt_count,
+         duration, timestamp, rtt_sum, rtt_max) = RECORD.unpack_from(self.shm.buf, slot * RECORD.size)
+        if status == STATUS_EMPTY:
+            return None
+        return {
+            "client_id": client_id,
+            "status": STATUS_NAMES.get(status, "unknown"),
+            "server_port": server_port,
+            "messages_sent": messages_sent,
+            "duration": duration,
+            "timestamp": timestamp,
+            "rating": rating or None,
+            "rtt_count": rtt_count,
+            "rtt_sum_ms": rtt_sum,
+            "rtt_max_ms": rtt_max
+        }
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Every written record, in slot order."""
+        return [record for record in map(self.read, range(self.capacity)) if record is not None]
+
+    def close(self):
+        """Release this process's mapping; the owner also frees the block."""
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ResultBatcher:
+    """Drop-in for `ResultRing.write` in a worker that runs many clients on threads.
+
+    Records are packed as they arrive and sent to `queue` as lists of
+    (slot, record) once `batch_size` have accumulated; `flush()` sends the
+    remainder. The parent feeds each batch into its ResultRing with `put`.
+    """
+
+    def __init__(self, queue, batch_size: int = 50):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def write(self, slot: int, status: int, client_id: int, server_port: int = 0, messages_sent: int = 0,
+              duration: float = 0.0, rating: int = 0, round_trip_times_ms=()):
+        record = pack_record(status, client_id, server_port, messages_sent, duration, rating, round_trip_times_ms)
+        with self.lock:
+            self.pending.append((slot, record))
+            if len(self.pending) < self.batch_size:
+                return
+            batch, self.pending = self.pending, []
+        self.queue.put(batch)
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if batch:
+            self.queue.put(batch)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Compare session writes/sec for connect-per-call, pooled and write-behind DatabaseManager modes.
+
+Each session is inserted and then completed, as the servers do. Write-behind
+still inserts the session row synchronously (SQLite assigns the id) and only
+queues the update.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from threading import Thread
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+
+
+def legacy_session(db_path, row):
+    """The original access pattern: open, write, commit and close on every call."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO sessions (client_name, server_name, start_time, status)
+        VALUES (?, ?, ?, 'ACTIVE')
+    ''', row)
+    session_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE sessions SET end_time = ?, rating = ?, status = 'COMPLETED' WHERE id = ?",
+                 (row[2], 5, session_id))
+    conn.commit()
+    conn.close()
+
+
+def managed_session(db, row):
+    session_id = db.insert_session(*row)
+    db.update_session(session_id, row[2], 5)
+
+
+def run_inserts(insert, rows, threads):
+    per_thread = len(rows) // threads
+    workers = [
+        Thread(target=lambda chunk: [insert(row) for row in chunk],
+               args=(rows[i * per_thread:(i + 1) * per_thread],))
+        for i in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DatabaseManager session writes")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    now = datetime.now().isoformat()
+    rows = [(f"Client-{i}", "Server_A", now) for i in range(args.rows)]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy_path = os.path.join(tmpdir, "legacy.db")
+        DatabaseManager(legacy_path, write_behind=False).close()
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        legacy_rate = run_inserts(lambda row: legacy_session(legacy_path, row), rows, args.threads)
+
+        db = DatabaseManager(os.path.join(tmpdir, "pooled.db"), write_behind=False)
+        pooled_rate = run_inserts(lambda row: managed_session(db, row), rows, args.threads)
+        db.close()
+
+        db = DatabaseManager(os.path.join(tmpdir, "batched.db"), write_behind=True)
+        start = time.perf_counter()
+        enqueue_rate = run_inserts(lambda row: managed_session(db, row), rows, args.threads)
+        db.close()
+        batched_rate = args.rows / (time.perf_counter() - start)
+
+    print(f"Rows: {args.rows}  Threads: {args.threads}")
+    print(f"Connect-per-call: {legacy_rate:10.0f} sessions/sec")
+    print(f"Pooled (WAL):     {pooled_rate:10.0f} sessions/sec")
+    print(f"Write-behind:     {batched_rate:10.0f} sessions/sec committed "
+          f"({enqueue_rate:.0f}/sec seen by callers)")
+    print(f"Speedup:          {pooled_rate / legacy_rate:10.1f}x pooled, {batched_rate / legacy_rate:.1f}x write-behind")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Compare collecting per-client results through a Manager().list() proxy against a shared-memory ResultRing."""
+
+import argparse
+import os
+import random
+import sys
+import time
+from multiprocessing import Manager, Process
+
+import psutil
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_ring import ResultRing, STATUS_SERVED
+
+
+def client_result(client_id, rtts):
+    return client_id, 8000 + client_id % 3, rtts, [random.uniform(0.1, 5.0) for _ in range(rtts)]
+
+
+def manager_client(client_id, rtts, session_data_list):
+    client_id, port, count, round_trip_times = client_result(client_id, rtts)
+    session_data_list.append({
+        "client_id": client_id,
+        "status": "served",
+        "server_port": port,
+        "messages_sent": count,
+        "duration": 1.0,
+        "timestamp": time.time(),
+        "rating": 5,
+        "round_trip_times_ms": round_trip_times
+    })
+
+
+def ring_client(client_id, rtts, results):
+    client_id, port, count, round_trip_times = client_result(client_id, rtts)
+    results.write(client_id, STATUS_SERVED, client_id, port, count, 1.0, 5, round_trip_times)
+
+
+def run_clients(target, clients, rtts, sink):
+    processes = [Process(target=target, args=(i, rtts, sink)) for i in range(clients)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def measure(run):
+    """Wall time and CPU seconds spent by this (parent) process around `run()`."""
+    me = psutil.Process()
+    cpu_before = sum(me.cpu_times()[:2])
+    start = time.perf_counter()
+    extra = run()
+    return time.perf_counter() - start, sum(me.cpu_times()[:2]) - cpu_before, extra
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark result collection from forked client processes")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--rtts", type=int, default=200, help="round-trip samples per client")
+    args = parser.parse_args()
+
+    def with_manager():
+        manager = Manager()
+        server = psutil.Process(manager._process.pid)
+        session_data_list = manager.list()
+        run_clients(manager_client, args.clients, args.rtts, session_data_list)
+        records = list(session_data_list)
+        server_cpu = sum(server.cpu_times()[:2])
+        manager.shutdown()
+        assert len(records) == args.clients
+        return server_cpu
+
+    def with_ring():
+        with ResultRing(args.clients) as results:
+            run_clients(ring_client, args.clients, args.rtts, results)
+            assert len(results.records()) == args.clients
+        return 0.0
+
+    manager_wall, manager_cpu, server_cpu = measure(with_manager)
+    ring_wall, ring_cpu, _ = measure(with_ring)
+
+    print(f"Clients: {args.clients}  RTT samples per client: {args.rtts}")
+    print(f"Manager().list(): {manager_wall:8.2f}s wall  {manager_cpu:6.2f}s parent CPU  "
+          f"{server_cpu:6.2f}s manager-process CPU")
+    print(f"ResultRing:       {ring_wall:8.2f}s wall  {ring_cpu:6.2f}s parent CPU")
+    print(f"Speedup:          {manager_wall / ring_wall:8.1f}x wall")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+#!/usr/bin/env python3
+"""
 Cleanup script to reset the chat server environment.
 Removes log files, databases, and temporary data.
 """
@@ -44,7 +46,7 @@ def cleanup_session_data():
 
 def cleanup_archive():
     """Clean archive files"""
-    archive_files = ["archive.txt", "archive.log"]
+    archive_files = ["archive.txt", "archive.jsonl", "archive.log"]
     for archive_file in archive_files:
         if os.path.exists(archive_file):
             try:
@@ -53,6 +55,15 @@ def cleanup_archive():
             except Exception as e:
                 print(f"Error removing {archive_file}: {e}")
 
+    # Rotated, compressed segments and their index
+    for segment_dir in ("archive_segments", "archive_json_segments"):
+        if os.path.isdir(segment_dir):
+            try:
+                shutil.rmtree(segment_dir)
+                print(f"Removed archive segments: {segment_dir}")
+            except Exception as e:
+                print(f"Error removing {segment_dir}: {e}")
+
 def cleanup_temp_files():
     """Remove temporary files"""
     temp_patterns = ["*.tmp", "*.temp", "*.pid", "__pycache__"]
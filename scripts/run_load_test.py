@@ -13,13 +13,16 @@ from threading import Timer
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from performance_monitor import PerformanceMonitor
+from process_accounting import ProcessTreeMonitor
 from logger import Logger
+from simulation_open_loop import load_profiles, DEFAULT_PROFILE
 
 class LoadTester:
-    def __init__(self, num_clients=1000, num_servers=3, test_duration=300, open_dashboard=False):
+    def __init__(self, num_clients=1000, num_servers=3, test_duration=300, open_dashboard=False, profile=None):
         self.num_clients = num_clients
         self.num_servers = num_servers
         self.test_duration = test_duration
+        self.profile = profile
         self.open_dashboard = open_dashboard
         self.logger = Logger("load_test")
         self.performance_monitor = PerformanceMonitor()
@@ -49,18 +52,29 @@ class LoadTester:
         self.performance_monitor.start_monitoring()
 
         try:
+            num_clients, num_servers, duration = self.num_clients, self.num_servers, self.test_duration
+            if simulation_type == 'open_loop':
+                # The profile defines the open-loop run; --clients/--servers/--duration would override it.
+                profile = load_profiles()[self.profile or DEFAULT_PROFILE]
+                num_clients, num_servers, duration = (profile["client_count"], profile["server_count"],
+                                                      profile["session_duration"])
             cmd = [
                 sys.executable, simulation_script,
-                "--clients", str(self.num_clients),
-                "--servers", str(self.num_servers),
-                "--duration", str(self.test_duration)
+                "--clients", str(num_clients),
+                "--servers", str(num_servers),
+                "--duration", str(duration)
             ]
+            if simulation_type == 'open_loop':
+                cmd += ["--profile", self.profile or DEFAULT_PROFILE]
 
             process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            stdout, stderr = process.communicate(timeout=self.test_duration + 60)
+            tree_monitor = ProcessTreeMonitor(process.pid)
+            tree_monitor.start()
+            stdout, stderr = process.communicate(timeout=duration + 60)
             execution_time = time.time() - start_time
 
             metrics = self.performance_monitor.stop_monitoring()
+            process_accounting = tree_monitor.stop()
 
             print(stdout)
             if stderr.strip():
@@ -72,7 +86,8 @@ class LoadTester:
                 'return_code': process.returncode,
                 'stdout': stdout,
                 'stderr': stderr,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                'process_accounting': process_accounting
             }
 
             sim_output_file = f"{simulation_type}_simulation_results.json"
@@ -102,6 +117,7 @@ class LoadTester:
 
         except subprocess.TimeoutExpired:
             process.kill()
+            tree_monitor.stop()
             self.logger.log_error(f"{simulation_type} simulation timed out")
             return {'status': 'FAILED', 'error': 'TimeoutExpired'}
 
@@ -133,7 +149,9 @@ class LoadTester:
                 'avg_cpu_usage': result.get('performance_metrics', {}).get('avg_cpu_usage', 0),
                 'avg_memory_usage': result.get('performance_metrics', {}).get('avg_memory_usage', 0),
                 'disk_io_read': result.get('performance_metrics', {}).get('disk_io_read', 0),
-                'disk_io_write': result.get('performance_metrics', {}).get('disk_io_write', 0)
+                'disk_io_write': result.get('performance_metrics', {}).get('disk_io_write', 0),
+                'process_cpu_time': result.get('process_accounting', {}).get('totals', {}).get('cpu_time', 0),
+                'process_peak_rss': result.get('process_accounting', {}).get('peaks', {}).get('rss', 0)
             }
             for sim, result in self.results.items()
         }
@@ -169,6 +187,8 @@ class LoadTester:
                 print(f"  Avg Memory Usage: {stats['avg_memory_usage']:.1f}MB")
                 print(f"  Disk I/O Read: {stats['disk_io_read']:.1f}MB")
                 print(f"  Disk I/O Write: {stats['disk_io_write']:.1f}MB")
+                print(f"  Process Tree CPU Time: {stats['process_cpu_time']:.2f}s")
+                print(f"  Process Tree Peak RSS: {stats['process_peak_rss'] / (1024 * 1024):.1f}MB")
             else:
                 print(f"  ⚠ Simulation failed or did not serve any clients.")
 
@@ -180,8 +200,12 @@ def main():
     parser.add_argument("--clients", type=int, default=1000, help="Number of clients")
     parser.add_argument("--servers", type=int, default=3, help="Number of servers")
     parser.add_argument("--duration", type=int, default=300, help="Test duration in seconds")
-    parser.add_argument("--simulation", choices=["iterative", "threading", "forking", "all"], default="all",
-                        help="Simulation type to run")
+    parser.add_argument("--simulation",
+                        choices=["iterative", "threading", "forking", "open_loop", "replay", "all"],
+                        default="all", help="Simulation type to run")
+    parser.add_argument("--profile", default=None,
+                        help="performance_profiles.csv profile for the open_loop simulation; its client count, "
+                             "server count and duration replace --clients/--servers/--duration there")
     parser.add_argument("--open-dashboard", action="store_true", help="Open dashboard in browser after simulation")
 
     args = parser.parse_args()
@@ -189,7 +213,8 @@ def main():
     print(f"Starting load test with {args.clients} clients and {args.servers} servers")
     print(f"Test duration: {args.duration} seconds")
 
-    tester = LoadTester(args.clients, args.servers, args.duration, open_dashboard=args.open_dashboard)
+    tester = LoadTester(args.clients, args.servers, args.duration, open_dashboard=args.open_dashboard,
+                        profile=args.profile)
 
     if args.simulation == 'all':
         tester.run_all_simulations()
@@ -1,16 +1,64 @@
+import asyncio
+import multiprocessing
+import signal
 import socket
+import sqlite3
 import threading
 import time
 from datetime import datetime
 from queue import Queue, Empty
-from logger import Logger, log_session, archive_lock
-from config import Config
+from logger import Logger, log_session, get_archive_stats
+from database import get_database
+from config import Config, get_config
+from constants import THREAD_POOL_SIZE, MESSAGE_RATE_LIMIT, MESSAGE_BURST, RATE_LIMITED_REPLY
+from framing import FrameDecoder, encode_frames, RECV_SIZE
+from utils import TokenBucketLimiter
+
+ENGINE_THREADING = "threading"
+ENGINE_ASYNCIO = "asyncio"
+ENGINES = (ENGINE_THREADING, ENGINE_ASYNCIO)
+
+MAX_WAIT_SECONDS = 300
+
+# Counters and gauges each pre-forked worker publishes into its row of the shared array.
+SHARED_COUNTERS = (
+    "total_clients_today",
+    "total_clients_month",
+    "total_clients_approached",
+    "total_lost_clients",
+    "total_rating",
+    "rating_count",
+    "active_clients",
+    "shed_messages",
+    "waiting_clients",
+    "busy_workers",
+)
+
+# ArchiveWriter stats a pre-forked worker republishes every WORKER_PUBLISH_INTERVAL seconds.
+SHARED_ARCHIVE_STATS = (
+    "enqueued",
+    "written",
+    "flushes",
+    "blocked_puts",
+    "dropped",
+    "max_queue_depth",
+    "write_errors",
+    "queue_depth",
+)
+WORKER_PUBLISH_INTERVAL = 0.5
 
 class Server:
-    def __init__(self, name="Server", host="127.0.0.1", port=8000, max_concurrent_clients=5):
+    def __init__(self, name="Server", host="127.0.0.1", port=8000, max_concurrent_clients=5, engine=ENGINE_THREADING,
+                 pool_size=None, processes=1, message_rate_limit=None, message_burst=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown server engine '{engine}', expected one of {ENGINES}")
+        if processes > 1 and not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("Pre-fork mode needs SO_REUSEPORT, which this platform does not provide")
+
         self.name = name
         self.host = host
         self.port = port
+        self.engine = engine
         self.logger = Logger(self.name)
         self.running = True
 
@@ -20,29 +68,134 @@ class Server:
         self.total_lost_clients = 0
         self.total_rating = 0
         self.rating_count = 0
+        self.shed_messages = 0
 
         self.lock = threading.Lock()
         self.client_queue = Queue()
         self.max_concurrent_clients = max_concurrent_clients
         self.active_clients = 0
+        self.waiting_clients = 0
+
+        # Threading engine: a fixed pool of workers pulls admitted clients off client_queue.
+        # Never more workers than admission slots, so the pool size is the concurrency cap.
+        self.pool_size = min(pool_size or get_config("threading", "thread_pool_size", THREAD_POOL_SIZE),
+                             max_concurrent_clients)
+        self.busy_workers = 0
+        self.worker_busy_time = [0.0] * self.pool_size
+
+        # Per-connection token bucket: messages beyond the rate (after a burst allowance) are
+        # answered with RATE_LIMITED_REPLY instead of being processed. Off unless
+        # message_rate_limit or the server.message_rate_limit config key sets a rate.
+        rate = message_rate_limit if message_rate_limit is not None else \
+            get_config("server", "message_rate_limit", MESSAGE_RATE_LIMIT)
+        burst = message_burst if message_burst is not None else get_config("server", "message_burst", MESSAGE_BURST)
+        self.rate_limiter = TokenBucketLimiter(rate, max(burst, 1)) if rate else None
+
+        # Pre-fork mode: `processes` workers share the port via SO_REUSEPORT and publish
+        # their counters, per-thread busy time and archive stats into shared-memory arrays.
+        # max_concurrent_clients and pool_size apply to each worker, so the server as a whole
+        # admits up to processes * max_concurrent_clients clients at once.
+        self.processes = processes
+        self._worker_slot = None
+        self._stop_event = None
+        self._shared_counters = None
+        self._shared_busy_time = None
+        self._shared_archive_stats = None
+        if processes > 1:
+            self._mp = multiprocessing.get_context("fork")
+            self._stop_event = self._mp.Event()
+            self._shared_counters = self._mp.Array("q", processes * len(SHARED_COUNTERS), lock=False)
+            self._shared_busy_time = self._mp.Array("d", processes * self.pool_size, lock=False)
+            self._shared_archive_stats = self._mp.Array("q", processes * len(SHARED_ARCHIVE_STATS), lock=False)
 
     def start(self):
-        self.logger.log_info(f"Starting {self.name} on {self.host}:{self.port}")
+        self.logger.log_info(f"Starting {self.name} on {self.host}:{self.port} ({self.engine} engine)")
+        if self.processes > 1:
+            self._serve_prefork()
+            return
+        get_database()  # open and migrate before serving, never on the event loop
+        if self.engine == ENGINE_ASYNCIO:
+            asyncio.run(self._serve_asyncio())
+        else:
+            self._serve_threading()
+
+    def _count(self, **deltas):
+        """Add to counters under the lock and, in a pre-fork worker, publish them to shared memory."""
+        with self.lock:
+            for field, amount in deltas.items():
+                setattr(self, field, getattr(self, field) + amount)
+            self._publish_counters()
+
+    def reset_counters(self, *fields):
+        """Zero counters such as total_clients_today when a new day or month starts."""
+        with self.lock:
+            for field in fields:
+                setattr(self, field, 0)
+            self._publish_counters()
+
+    def _publish_counters(self):
+        """Copy the counters into this pre-fork worker's shared row; the caller holds the lock."""
+        if self._worker_slot is not None:
+            base = self._worker_slot * len(SHARED_COUNTERS)
+            for offset, field in enumerate(SHARED_COUNTERS):
+                self._shared_counters[base + offset] = getattr(self, field)
+
+    def _serve_prefork(self):
+        workers = []
+        for slot in range(self.processes):
+            proc = self._mp.Process(target=self._prefork_worker, args=(slot,),
+                                    name=f"{self.name}-proc-{slot}", daemon=True)
+            proc.start()
+            workers.append(proc)
+        self.logger.log_info(f"{self.name} pre-forked {self.processes} workers on port {self.port}")
+
+        # Turn SIGTERM into an orderly shutdown so workers release the port.
+        try:
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.shutdown())
+        except ValueError:
+            pass  # not the main thread; the caller owns signal handling
+
+        for proc in workers:
+            proc.join()
+
+    def _prefork_worker(self, slot):
+        self._worker_slot = slot
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        threading.Thread(target=self._publish_until_stopped, daemon=True).start()
+        get_database()  # each forked worker opens its own connections
+        if self.engine == ENGINE_ASYNCIO:
+            asyncio.run(self._serve_asyncio())
+        else:
+            self._serve_threading()
+
+    def _publish_until_stopped(self):
+        """Republish this worker's archive stats until the parent asks the workers to stop."""
+        base = self._worker_slot * len(SHARED_ARCHIVE_STATS)
+        while not self._stop_event.wait(WORKER_PUBLISH_INTERVAL):
+            stats = get_archive_stats()
+            for offset, field in enumerate(SHARED_ARCHIVE_STATS):
+                self._shared_archive_stats[base + offset] = stats[field]
+        self.running = False
+
+    def _serve_threading(self):
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
             server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self._worker_slot is not None:
+                server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             server_socket.bind((self.host, self.port))
             server_socket.listen(100)
             server_socket.settimeout(1.0)
             self.logger.log_info(f"{self.name} listening on {self.host}:{self.port}")
 
-            threading.Thread(target=self.queue_handler, daemon=True).start()
+            for worker_id in range(self.pool_size):
+                threading.Thread(target=self.queue_handler, args=(worker_id,),
+                                 name=f"{self.name}-worker-{worker_id}", daemon=True).start()
 
             while self.running:
                 try:
                     client_socket, addr = server_socket.accept()
                     self.logger.log_info(f"Client approached: {addr}")
-                    with self.lock:
-                        self.total_clients_approached += 1
+                    self._count(total_clients_approached=1, waiting_clients=1)
 
                     self.client_queue.put((client_socket, addr, time.time()))
 
@@ -51,86 +204,274 @@ class Server:
                 except Exception as e:
                     self.logger.log_error(f"Server error: {e}")
 
-    def queue_handler(self):
+    def queue_handler(self, worker_id):
+        """Worker loop: block on client_queue and serve one client at a time."""
         while self.running:
-            if self.active_clients < self.max_concurrent_clients:
-                try:
-                    client_socket, addr, timestamp = self.client_queue.get(timeout=1)
-                    wait_time = time.time() - timestamp
-                    if wait_time > 300:
-                        self.logger.log_warning(f"Client {addr} waited too long. Marked as lost.")
-                        with self.lock:
-                            self.total_lost_clients += 1
-                        client_socket.close()
-                        continue
-
-                    threading.Thread(target=self.handle_client, args=(client_socket, addr), daemon=True).start()
-                except Empty:
-                    continue
+            try:
+                client_socket, addr, timestamp = self.client_queue.get(timeout=1)
+            except Empty:
+                continue
+            self._count(waiting_clients=-1)
 
-    def handle_client(self, sock, addr):
-        with self.lock:
-            self.active_clients += 1
-        try:
-            with sock:
-                client_name = f"Client-{addr[1]}"
-                self.logger.log_info(f"{self.name} serving {client_name}")
+            wait_time = time.time() - timestamp
+            if wait_time > MAX_WAIT_SECONDS:
+                self.logger.log_warning(f"Client {addr} waited too long. Marked as lost.")
+                self._client_lost(addr)
+                client_socket.close()
+                continue
 
+            started = time.time()
+            self._count(busy_workers=1)
+            try:
+                self.handle_client(client_socket, addr)
+            finally:
                 with self.lock:
-                    self.total_clients_today += 1
-                    self.total_clients_month += 1
+                    self.worker_busy_time[worker_id] += time.time() - started
+                    if self._worker_slot is not None:
+                        self._shared_busy_time[self._worker_slot * self.pool_size + worker_id] = \
+                            self.worker_busy_time[worker_id]
+                self._count(busy_workers=-1)
+
+    def _client_lost(self, addr):
+        self._count(total_lost_clients=1)
+        self._record_session(f"Client-{addr[1]}", "LOST")
+
+    def _record_session(self, client_name, status, rating=None):
+        """Record a finished session; the database's rollups feed ServerUI and the dashboard.
+
+        On the asyncio engine the write runs in the loop's executor, so a commit
+        never stalls the other sessions on the event loop.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_session(client_name, status, rating)
+        else:
+            loop.run_in_executor(None, self._write_session, client_name, status, rating)
+
+    def _write_session(self, client_name, status, rating):
+        try:
+            get_database().record_session(client_name, self.name, status, rating)
+        except sqlite3.Error as e:
+            self.logger.log_error(f"Failed to record session of {client_name}: {e}")
 
+    def _begin_session(self, addr):
+        """Account for a newly admitted client and return its display name."""
+        client_name = f"Client-{addr[1]}"
+        self.logger.log_info(f"{self.name} serving {client_name}")
+        self._count(total_clients_today=1, total_clients_month=1)
+        return client_name
+
+    def _process_message(self, client_name, message, session_log):
+        """Apply one chat protocol message; returns the reply, or None once the session is rated."""
+        if message.startswith("RATING:"):
+            try:
+                rating = int(message.split(":")[1])
+                self._count(total_rating=rating, rating_count=1)
+
+                self.logger.log_info(f"{client_name} rated {rating}")
+                log_session(self.name, client_name, rating)
+                self._record_session(client_name, "COMPLETED", rating)
+                session_log.append("\u2B50" * rating)
+
+            except:
+                self.logger.log_warning(f"Invalid rating from {client_name}")
+            return None
+
+        self.logger.log_info(f"{client_name} says: {message}")
+        session_log.append(f"{client_name}: {message}")
+        return f"ECHO: {message}"
+
+    def _process_frames(self, client_name, frames, session_log, connection_key=None):
+        """Handle a batch of decoded frames; returns (coalesced replies, session_done).
+
+        Chat messages over the connection's rate limit get an error reply and are
+        not processed; ratings always go through so the session can end.
+        """
+        replies = []
+        shed = 0
+        done = False
+        for frame in frames:
+            message = frame.decode()
+            if (self.rate_limiter is not None and not message.startswith("RATING:")
+                    and not self.rate_limiter.allow_request(connection_key or client_name)):
+                shed += 1
+                replies.append(RATE_LIMITED_REPLY)
+                continue
+            reply = self._process_message(client_name, message, session_log)
+            if reply is None:
+                done = True
+                break
+            replies.append(reply)
+        if shed:
+            self._count(shed_messages=shed)
+        return encode_frames(replies), done
+
+    def handle_client(self, sock, addr):
+        self._count(active_clients=1)
+        try:
+            with sock:
+                client_name = self._begin_session(addr)
                 session_log = []
+                decoder = FrameDecoder()
 
                 while True:
-                    data = sock.recv(1024)
+                    data = sock.recv(RECV_SIZE)
                     if not data:
                         break
 
-                    message = data.decode()
+                    replies, done = self._process_frames(client_name, decoder.feed(data), session_log, addr)
+                    if replies:
+                        sock.sendall(replies)
+                    if done:
+                        break
+
+        except (ConnectionResetError, BrokenPipeError):
+            self.logger.log_error(f"Connection lost with {addr}")
+            self._client_lost(addr)
+        except Exception as e:
+            self.logger.log_error(f"Error with client {addr}: {e}")
+        finally:
+            self._count(active_clients=-1)
+            if self.rate_limiter is not None:
+                self.rate_limiter.forget(addr)
+            self.logger.log_info(f"Client disconnected: {addr}")
+
+    async def _serve_asyncio(self):
+        """Run the accept loop and every client session as coroutines on one event loop."""
+        self._admission = asyncio.Semaphore(self.max_concurrent_clients)
+        server = await asyncio.start_server(self._handle_client_async, self.host, self.port,
+                                            reuse_address=True, reuse_port=self._worker_slot is not None,
+                                            backlog=1024)
+        self.logger.log_info(f"{self.name} listening on {self.host}:{self.port}")
+        async with server:
+            while self.running:
+                await asyncio.sleep(1.0)
 
-                    if message.startswith("RATING:"):
-                        try:
-                            rating = int(message.split(":")[1])
-                            with self.lock:
-                                self.total_rating += rating
-                                self.rating_count += 1
+    async def _handle_client_async(self, reader, writer):
+        addr = writer.get_extra_info("peername")
+        self.logger.log_info(f"Client approached: {addr}")
+        self._count(total_clients_approached=1)
 
-                            self.logger.log_info(f"{client_name} rated {rating}")
-                            with archive_lock:
-                                log_session(self.name, client_name, rating)
-                            session_log.append("\u2B50" * rating)
+        # Same admission rule as queue_handler: wait for a free slot, give up after MAX_WAIT_SECONDS.
+        self._count(waiting_clients=1)
+        try:
+            await asyncio.wait_for(self._admission.acquire(), timeout=MAX_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            self.logger.log_warning(f"Client {addr} waited too long. Marked as lost.")
+            self._client_lost(addr)
+            writer.close()
+            return
+        finally:
+            self._count(waiting_clients=-1)
 
-                        except:
-                            self.logger.log_warning(f"Invalid rating from {client_name}")
-                        break
-                    else:
-                        self.logger.log_info(f"{client_name} says: {message}")
-                        session_log.append(f"{client_name}: {message}")
-                        sock.sendall(f"ECHO: {message}".encode())
+        self._count(active_clients=1)
+        try:
+            client_name = self._begin_session(addr)
+            session_log = []
+            decoder = FrameDecoder()
+
+            while self.running:
+                data = await reader.read(RECV_SIZE)
+                if not data:
+                    break
+
+                replies, done = self._process_frames(client_name, decoder.feed(data), session_log, addr)
+                if replies:
+                    writer.write(replies)
+                    await writer.drain()
+                if done:
+                    break
 
         except (ConnectionResetError, BrokenPipeError):
             self.logger.log_error(f"Connection lost with {addr}")
-            with self.lock:
-                self.total_lost_clients += 1
+            self._client_lost(addr)
         except Exception as e:
             self.logger.log_error(f"Error with client {addr}: {e}")
         finally:
-            with self.lock:
-                self.active_clients -= 1
+            self._count(active_clients=-1)
+            self._admission.release()
+            writer.close()
+            if self.rate_limiter is not None:
+                self.rate_limiter.forget(addr)
             self.logger.log_info(f"Client disconnected: {addr}")
 
     def shutdown(self):
         self.logger.log_info("Shutting down server")
         self.running = False
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    def _aggregate_worker_counters(self):
+        """Sum every pre-forked worker's published counters."""
+        totals = dict.fromkeys(SHARED_COUNTERS, 0)
+        width = len(SHARED_COUNTERS)
+        for slot in range(self.processes):
+            for offset, field in enumerate(SHARED_COUNTERS):
+                totals[field] += self._shared_counters[slot * width + offset]
+        return totals
+
+    def _aggregate_worker_archive_stats(self):
+        """Sum every pre-forked worker's archive stats (the largest max_queue_depth)."""
+        totals = dict.fromkeys(SHARED_ARCHIVE_STATS, 0)
+        width = len(SHARED_ARCHIVE_STATS)
+        for slot in range(self.processes):
+            for offset, field in enumerate(SHARED_ARCHIVE_STATS):
+                value = self._shared_archive_stats[slot * width + offset]
+                totals[field] = max(totals[field], value) if field == "max_queue_depth" else totals[field] + value
+        return totals
 
     def get_metrics(self):
+        """Counters and pool gauges; in pre-fork mode the parent reports all workers combined.
+
+        Pre-fork totals have the same keys as a single process: pool_size counts every
+        worker's threads and worker_busy_time lists them worker by worker.
+        """
+        if self._shared_counters is not None and self._worker_slot is None:
+            totals = self._aggregate_worker_counters()
+            metrics = {
+                "server": self.name,
+                "engine": self.engine,
+                "processes": self.processes,
+                "active_clients": totals["active_clients"],
+                "total_clients_today": totals["total_clients_today"],
+                "total_clients_month": totals["total_clients_month"],
+                "total_clients_approached": totals["total_clients_approached"],
+                "lost_clients": totals["total_lost_clients"],
+                "shed_messages": totals["shed_messages"],
+                "average_rating": (totals["total_rating"] / totals["rating_count"]) if totals["rating_count"] > 0 else 0,
+                "queue_depth": totals["waiting_clients"]
+            }
+            if self.engine != ENGINE_ASYNCIO:
+                pool_size = self.pool_size * self.processes
+                metrics.update({
+                    "pool_size": pool_size,
+                    "busy_workers": totals["busy_workers"],
+                    "pool_saturation": round(totals["busy_workers"] / pool_size, 2) if pool_size else 0,
+                    "worker_busy_time": [round(t, 3) for t in self._shared_busy_time]
+                })
+            metrics["archive"] = self._aggregate_worker_archive_stats()
+            return metrics
+
         with self.lock:
-            return {
+            metrics = {
                 "server": self.name,
+                "engine": self.engine,
+                "active_clients": self.active_clients,
                 "total_clients_today": self.total_clients_today,
                 "total_clients_month": self.total_clients_month,
                 "total_clients_approached": self.total_clients_approached,
                 "lost_clients": self.total_lost_clients,
+                "shed_messages": self.shed_messages,
                 "average_rating": (self.total_rating / self.rating_count) if self.rating_count > 0 else 0
-            }
\ No newline at end of file
+            }
+            metrics["queue_depth"] = self.waiting_clients
+            if self.engine != ENGINE_ASYNCIO:
+                metrics.update({
+                    "pool_size": self.pool_size,
+                    "busy_workers": self.busy_workers,
+                    "pool_saturation": round(self.busy_workers / self.pool_size, 2) if self.pool_size else 0,
+                    "worker_busy_time": [round(t, 3) for t in self.worker_busy_time]
+                })
+        metrics["archive"] = get_archive_stats()
+        return metrics
@@ -3,7 +3,7 @@ from queue import Queue
 from server import Server
 from config import Config
 from logger import log_info, log_error, log_server_status
-from database import DatabaseManager
+from database import get_database
 
 class ServerPool:
     def __init__(self, num_servers=None, server_names=None):
@@ -12,7 +12,10 @@ class ServerPool:
         self.servers = []
         self.client_queue = Queue()
         self.lock = threading.Lock()
-        self.db_manager = DatabaseManager()
+        # Status calls record metrics on every poll; with database.write_behind (the default)
+        # they are queued and committed in batches instead of inline. The servers record
+        # sessions through the same per-process manager, so rollup reads see them.
+        self.db_manager = get_database()
         self.running = False
         self.server_threads = []
         
@@ -54,7 +57,9 @@ class ServerPool:
             # Add poison pills to stop servers
             for _ in self.servers:
                 self.client_queue.put(None)
-        
+
+        # Commit queued metrics and sessions; the shared manager itself is closed at exit.
+        self.db_manager.flush()
         log_info("All servers stopped")
     
     def add_client(self, client):
@@ -95,10 +100,11 @@ class ServerPool:
     
     def get_pool_statistics(self):
         """Get overall pool statistics"""
-        total_clients = sum(server.total_clients for server in self.servers)
-        total_lost = sum(server.lost_clients for server in self.servers)
-        total_rating_sum = sum(server.rating_sum for server in self.servers)
-        total_rating_count = sum(server.rating_count for server in self.servers)
+        rollups = [self.db_manager.get_server_rollup(server.name, "all") for server in self.servers]
+        total_clients = sum(rollup["clients_served"] for rollup in rollups)
+        total_lost = sum(rollup["lost_clients"] for rollup in rollups)
+        total_rating_sum = sum(rollup["rating_sum"] for rollup in rollups)
+        total_rating_count = sum(rollup["rating_count"] for rollup in rollups)
         
         avg_rating = total_rating_sum / total_rating_count if total_rating_count > 0 else 0
         
@@ -112,17 +118,15 @@ class ServerPool:
         }
     
     def reset_daily_counts(self):
-        """Reset daily counts for all servers"""
+        """Start a new day: zero every server's total_clients_today"""
         for server in self.servers:
-            with server.lock:
-                server.daily_count = 0
+            server.reset_counters("total_clients_today")
         log_info("Daily counts reset for all servers")
     
     def reset_monthly_counts(self):
-        """Reset monthly counts for all servers"""
+        """Start a new month: zero every server's total_clients_month"""
         for server in self.servers:
-            with server.lock:
-                server.monthly_count = 0
+            server.reset_counters("total_clients_month")
         log_info("Monthly counts reset for all servers")
     
     def get_available_servers(self):
@@ -1,15 +1,23 @@
-import os, time, json, random, socket, argparse, psutil
-from datetime import datetime
-from multiprocessing import Process, Manager
-from server import Server
+import os, time, json, random, socket, argparse, itertools, threading, psutil
+from multiprocessing import Process, Queue
+from queue import Empty
+from server import Server, ENGINES, ENGINE_THREADING
 from logger import Logger, log_session
-from config import Config
+from config import Config, get_config
+from constants import FORK_PROCESS_LIMIT, RESULT_BATCH_SIZE
+from framing import encode_frame, FramedConnection
+from client import pipelined_chat
+from result_ring import ResultRing, ResultBatcher, STATUS_SERVED, STATUS_LOST
 
 LIVE_METRICS_FILE = "live_forking_metrics.json"
 
+DRIVER_PROCESS = "process"  # one forked process per simulated client
+DRIVER_POOL = "pool"        # a fixed pool of processes, each running many clients on threads
+DRIVERS = (DRIVER_PROCESS, DRIVER_POOL)
+
 MAX_WAIT_TIME = 300  # 5 minutes
 
-def simulate_client(client_id: int, duration: int, session_data_list):
+def simulate_client(client_id: int, duration: int, results: ResultRing, pipeline_depth: int = 0):
     start_time = time.time()
     server_port = 8000 + (client_id % 3)
     client_name = f"Client-{client_id}"
@@ -26,37 +34,35 @@ def simulate_client(client_id: int, duration: int, session_data_list):
             time.sleep(1)
 
     if not connected:
-        session_data_list.append({
-            "client_id": client_id,
-            "status": "lost",
-            "timestamp": datetime.now().isoformat(),
-        })
+        results.write(client_id, STATUS_LOST, client_id, duration=time.time() - start_time)
         return
 
     message_count = 0
+    round_trip_times = []
     try:
-        while time.time() - start_time < duration:
-            message = {
-                'type': 'chat',
-                'message': f'Message {message_count} from {client_name}'
-            }
-            client_socket.sendall(json.dumps(message).encode())
-            message_count += 1
-            time.sleep(random.uniform(0.05, 0.1))
+        if pipeline_depth > 0:
+            # Closed loop with no think time: keep pipeline_depth messages in flight until the deadline.
+            numbers = itertools.takewhile(lambda _: time.time() - start_time < duration, itertools.count())
+            messages = (json.dumps({'type': 'chat', 'message': f'Message {n} from {client_name}'}) for n in numbers)
+            # Shed messages are not served, so only processed messages count toward throughput.
+            round_trip_times, _ = pipelined_chat(FramedConnection(client_socket), messages, pipeline_depth)
+            message_count = len(round_trip_times)
+        else:
+            while time.time() - start_time < duration:
+                message = {
+                    'type': 'chat',
+                    'message': f'Message {message_count} from {client_name}'
+                }
+                client_socket.sendall(encode_frame(json.dumps(message)))
+                message_count += 1
+                time.sleep(random.uniform(0.05, 0.1))
 
         rating = random.randint(1, 5)
-        client_socket.sendall(f"RATING:{rating}".encode())
+        client_socket.sendall(encode_frame(f"RATING:{rating}"))
         time.sleep(0.2)
 
-        session_data_list.append({
-            "client_id": client_id,
-            "status": "served",
-            "server_port": server_port,
-            "messages_sent": message_count,
-            "duration": time.time() - start_time,
-            "timestamp": datetime.now().isoformat(),
-            "rating": rating
-        })
+        results.write(client_id, STATUS_SERVED, client_id, server_port, message_count,
+                      time.time() - start_time, rating, round_trip_times)
 
         log_session(f"Server-{server_port}", client_name, rating)
 
@@ -66,11 +72,38 @@ def simulate_client(client_id: int, duration: int, session_data_list):
         client_socket.close()
 
 
+def run_client_worker(client_ids, duration: int, result_queue, pipeline_depth: int = 0,
+                      batch_size: int = RESULT_BATCH_SIZE):
+    """Run every client in `client_ids` concurrently on threads, streaming results back in batches.
+
+    A None on `result_queue` marks this worker as finished.
+    """
+    results = ResultBatcher(result_queue, batch_size)
+    threads = [threading.Thread(target=simulate_client, args=(client_id, duration, results, pipeline_depth),
+                                daemon=True)
+               for client_id in client_ids]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        results.flush()
+        result_queue.put(None)
+
+
 class ForkingSimulation:
-    def __init__(self, num_clients=100, duration=30, num_servers=3):
+    def __init__(self, num_clients=100, duration=30, num_servers=3, engine=ENGINE_THREADING, server_workers=1,
+                 pipeline_depth=0, driver=DRIVER_PROCESS, client_processes=None):
         self.num_clients = num_clients
         self.duration = duration
         self.num_servers = num_servers
+        self.engine = engine
+        self.server_workers = server_workers
+        self.pipeline_depth = pipeline_depth
+        self.driver = driver
+        self.client_processes = max(1, min(
+            client_processes or get_config("threading", "fork_process_limit", FORK_PROCESS_LIMIT), num_clients))
         self.logger = Logger('ForkingSimulation')
         self.clients = []
 
@@ -79,41 +112,77 @@ class ForkingSimulation:
 
         os.system("fuser -k 8000/tcp 8001/tcp 8002/tcp > /dev/null 2>&1 || true")
         server_processes = []
-        manager = Manager()
-        session_data_list = manager.list()
+        results = ResultRing(self.num_clients)
 
         for i in range(self.num_servers):
             port = 8000 + i
-            proc = Process(target=self._start_server_process, args=(f"Server-{port}", port))
+            proc = Process(target=self._start_server_process, args=(f"Server-{port}", port, self.engine, self.server_workers))
             proc.start()
             server_processes.append(proc)
 
         time.sleep(2)
         start_time = time.time()
 
-        for i in range(self.num_clients):
-            p = Process(target=simulate_client, args=(i, self.duration, session_data_list))
-            p.start()
-            self.clients.append(p)
-            time.sleep(0.01)
+        if self.driver == DRIVER_POOL:
+            self._run_client_pool(results)
+        else:
+            for i in range(self.num_clients):
+                p = Process(target=simulate_client, args=(i, self.duration, results, self.pipeline_depth))
+                p.start()
+                self.clients.append(p)
+                time.sleep(0.01)
 
-        for c in self.clients:
-            c.join()
+            for c in self.clients:
+                c.join()
 
         execution_time = time.time() - start_time
         self.logger.logger.info("🎯 Simulation completed.")
-        self._write_results_to_file(list(session_data_list), execution_time)
+        self._write_results_to_file(results.records(), execution_time)
+        results.close()
 
         for proc in server_processes:
             if proc.is_alive():
                 proc.terminate()
                 proc.join()
 
+    def _run_client_pool(self, results):
+        """Spread the clients over `client_processes` workers and collect their result batches."""
+        result_queue = Queue()
+        batch_size = get_config("simulation", "result_batch_size", RESULT_BATCH_SIZE)
+        for worker_id in range(self.client_processes):
+            client_ids = range(worker_id, self.num_clients, self.client_processes)
+            p = Process(target=run_client_worker,
+                        args=(client_ids, self.duration, result_queue, self.pipeline_depth, batch_size))
+            p.start()
+            self.clients.append(p)
+
+        # Drain while the workers run: a worker blocked on a full queue pipe would never exit.
+        finished = 0
+        while finished < len(self.clients):
+            try:
+                batch = result_queue.get(timeout=1)
+            except Empty:
+                if not any(c.is_alive() for c in self.clients):
+                    self.logger.log_error("Client worker exited without finishing; results may be incomplete")
+                    break
+                continue
+            if batch is None:
+                finished += 1
+                continue
+            for slot, record in batch:
+                results.put(slot, record)
+
+        for c in self.clients:
+            c.join()
+
     def _write_results_to_file(self, session_data, execution_time):
         served = [d for d in session_data if d.get("status") == "served"]
         lost = [d for d in session_data if d.get("status") == "lost"]
-        ratings = [d["rating"] for d in served if "rating" in d]
+        ratings = [d["rating"] for d in served if d.get("rating")]
         avg_rating = round(sum(ratings) / len(ratings), 2) if ratings else 0
+        rtt_count = sum(d["rtt_count"] for d in served)
+        avg_rtt_ms = sum(d["rtt_sum_ms"] for d in served) / rtt_count if rtt_count else 0.0
+        max_rtt_ms = max((d["rtt_max_ms"] for d in served), default=0.0)
 
         result = {
             "metrics": {
@@ -121,10 +190,14 @@ class ForkingSimulation:
                 "total_lost_clients": len(lost),
                 "throughput": round(len(served) / execution_time, 2),
                 "average_rating": avg_rating,
-                "average_response_time": 0.0001,
+                "average_response_time": round(avg_rtt_ms / 1000, 6) if rtt_count else 0.0001,
+                "messages_acknowledged": rtt_count,
+                "message_throughput": round(rtt_count / execution_time, 2),
+                "max_rtt_ms": round(max_rtt_ms, 3),
                 "server_utilization": 0.5,
                 "simulation_time": round(execution_time, 2),
-                "approach": "forking"
+                "approach": "forking",
+                "client_driver": self.driver
             },
             "performance_metrics": {
                 "avg_cpu_usage": psutil.cpu_percent(interval=1),
@@ -147,12 +220,15 @@ class ForkingSimulation:
         print(f"❌ Lost Clients        : {len(lost)}")
         print(f"⭐ Avg Rating         : {avg_rating}/5")
         print(f"⚡ Throughput         : {result['metrics']['throughput']} req/sec")
+        if rtt_count:
+            print(f"📨 Message Throughput : {result['metrics']['message_throughput']} msg/sec")
+            print(f"⏱  Avg / Max RTT      : {avg_rtt_ms:.2f} / {result['metrics']['max_rtt_ms']:.2f} ms")
         print("="*50 + "\n")
 
     @staticmethod
-    def _start_server_process(name, port):
+    def _start_server_process(name, port, engine=ENGINE_THREADING, workers=1):
         try:
-            server = Server(name=name, port=port)
+            server = Server(name=name, port=port, engine=engine, processes=workers)
             server.start()
         except KeyboardInterrupt:
             server.shutdown()
@@ -164,12 +240,23 @@ def main():
     parser.add_argument('--duration', type=int, default=30)
     parser.add_argument('--servers', type=int, default=3)
     parser.add_argument('--mode', choices=['server', 'simulation'], default='simulation')
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE_THREADING)
+    parser.add_argument('--server-workers', type=int, default=1,
+                        help='pre-forked worker processes per server port (SO_REUSEPORT)')
+    parser.add_argument('--pipeline-depth', type=int, default=0,
+                        help='messages each client keeps in flight; 0 keeps the 50-100 ms think time')
+    parser.add_argument('--driver', choices=DRIVERS, default=DRIVER_PROCESS,
+                        help='fork one process per client, or run clients on threads in a fixed process pool')
+    parser.add_argument('--client-processes', type=int, default=None,
+                        help='pool size for --driver pool (default: threading.fork_process_limit)')
     args = parser.parse_args()
 
     if args.mode == 'server':
-        Server(name="Server-8000", port=8000).start()
+        Server(name="Server-8000", port=8000, engine=args.engine, processes=args.server_workers).start()
     else:
-        ForkingSimulation(args.clients, args.duration, args.servers).run_simulation()
+        ForkingSimulation(args.clients, args.duration, args.servers, args.engine,
+                          args.server_workers, args.pipeline_depth, args.driver,
+                          args.client_processes).run_simulation()
 
 
 if __name__ == '__main__':
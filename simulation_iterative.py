@@ -5,6 +5,8 @@ import threading
 from datetime import datetime
 import logging
 
+from framing import FramedConnection
+
 # Configuration
 NUM_CLIENTS = 100
 NUM_SERVERS = 3
@@ -85,9 +87,10 @@ class TestServer:
     def handle_client(self, client_socket):
         try:
             client_socket.settimeout(5)
-            data = client_socket.recv(1024)
+            conn = FramedConnection(client_socket)
+            data = conn.recv()
             if data:
-                message = json.loads(data.decode())
+                message = json.loads(data)
                 time.sleep(0.01)
                 response = {
                     "type": "response",
@@ -95,7 +98,7 @@ class TestServer:
                     "timestamp": datetime.now().isoformat(),
                     "server": self.name
                 }
-                client_socket.sendall(json.dumps(response).encode())
+                conn.send(json.dumps(response))
         except Exception as e:
             logger.warning(f"⚠️ Error handling client: {e}")
         finally:
@@ -138,9 +141,10 @@ def client_simulation(client_id, sim_start):
                 "message": f"Hello from client {client_id}",
                 "timestamp": datetime.now().isoformat()
             }
+            conn = FramedConnection(sock)
             msg_start = time.time()
-            sock.sendall(json.dumps(message).encode())
-            response_data = sock.recv(1024)
+            conn.send(json.dumps(message))
+            response_data = conn.recv()
             msg_end = time.time()
 
             if response_data:
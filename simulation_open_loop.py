@@ -0,0 +1,259 @@
+"""Open-loop load generation driven by the profiles in performance_profiles.csv.
+
+Clients arrive as a Poisson process at the profile's `arrival_rate`, on a
+schedule fixed before the run starts, so a slow server never slows the arrivals
+down. Each client sends its messages on a fixed schedule too. Every latency is
+measured from when the message was *due*, not from when it was actually sent,
+so time spent waiting behind a slow server is counted rather than omitted.
+"""
+
+import os, csv, time, json, random, asyncio, argparse, psutil
+from multiprocessing import Process
+from server import Server, ENGINES, ENGINE_THREADING, MAX_WAIT_SECONDS
+from logger import Logger, log_session
+from framing import encode_frame, FrameDecoder, FrameError
+from utils import LatencyHistogram
+
+PROFILES_FILE = "performance_profiles.csv"
+DEFAULT_PROFILE = "Normal_Load"
+RESULT_FILE = "open_loop_simulation_results.json"
+LIVE_METRICS_FILE = "live_open_loop_metrics.json"
+
+BASE_PORT = 8000  # server i listens on BASE_PORT + i
+MESSAGES_PER_CLIENT = 10
+MESSAGE_INTERVAL = 0.1  # seconds between one client's scheduled messages
+CONNECT_TIMEOUT = 10
+RECV_SIZE = 65536
+
+
+def load_profiles(path=PROFILES_FILE):
+    """Profiles keyed by name, with the numeric columns converted."""
+    with open(path, newline="") as f:
+        return {
+            row["profile_name"]: dict(
+                row,
+                client_count=int(row["client_count"]),
+                arrival_rate=float(row["arrival_rate"]),
+                session_duration=float(row["session_duration"]),
+                server_count=int(row["server_count"]),
+                expected_rating=float(row["expected_rating"])
+            )
+            for row in csv.DictReader(f)
+        }
+
+
+def poisson_arrivals(rate, limit, horizon, rng=random):
+    """Arrival offsets (seconds) of a Poisson process at `rate`/s: at most `limit`, all before `horizon`."""
+    arrivals = []
+    offset = 0.0
+    while len(arrivals) < limit:
+        offset += rng.expovariate(rate)
+        if offset >= horizon:
+            break
+        arrivals.append(offset)
+    return arrivals
+
+
+class OpenLoopSimulation:
+    def __init__(self, profile=DEFAULT_PROFILE, num_clients=None, duration=None, num_servers=None,
+                 engine=ENGINE_THREADING, messages_per_client=MESSAGES_PER_CLIENT,
+                 message_interval=MESSAGE_INTERVAL, seed=None, profiles_path=PROFILES_FILE, base_port=BASE_PORT):
+        self.profile = load_profiles(profiles_path)[profile]
+        self.num_clients = num_clients or self.profile["client_count"]
+        self.arrival_rate = self.profile["arrival_rate"]
+        self.duration = duration or self.profile["session_duration"]
+        self.num_servers = num_servers or self.profile["server_count"]
+        self.engine = engine
+        self.messages_per_client = messages_per_client
+        self.message_interval = message_interval
+        self.base_port = base_port
+        self.rng = random.Random(seed)
+        self.logger = Logger('OpenLoopSimulation')
+
+        self.response_times = LatencyHistogram()  # per message, from when it was due
+        self.session_times = LatencyHistogram()   # scheduled arrival to the server closing the session
+        self.dispatch_lag = LatencyHistogram()    # how late the generator itself started a client
+        self.dispatch_times = []                  # loop time each client was actually started
+        self.served = 0
+        self.lost = 0
+        self.ratings = []
+
+    async def _read_frame(self, reader, decoder, pending):
+        while not pending:
+            data = await reader.read(RECV_SIZE)
+            if not data:
+                return None
+            pending.extend(decoder.feed(data))
+        return pending.pop(0)
+
+    async def _client(self, client_id, arrival, port):
+        loop = asyncio.get_running_loop()
+        delay = arrival - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        dispatched = loop.time()
+        self.dispatch_times.append(dispatched)
+        self.dispatch_lag.record(max(dispatched - arrival, 0.0) * 1000)
+
+        client_name = f"Client-{client_id}"
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), CONNECT_TIMEOUT)
+            decoder, pending = FrameDecoder(), []
+            for n in range(self.messages_per_client):
+                due = arrival + n * self.message_interval
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                writer.write(encode_frame(json.dumps({'type': 'chat', 'message': f'Message {n} from {client_name}'})))
+                reply = await asyncio.wait_for(self._read_frame(reader, decoder, pending), MAX_WAIT_SECONDS)
+                if reply is None:
+                    raise ConnectionError("Server closed the connection mid-session")
+                self.response_times.record((loop.time() - due) * 1000)
+
+            rating = self.rng.randint(1, 5)
+            writer.write(encode_frame(f"RATING:{rating}"))
+            await writer.drain()
+            await asyncio.wait_for(reader.read(), MAX_WAIT_SECONDS)  # the server closes after a rating
+            self.session_times.record((loop.time() - arrival) * 1000)
+            self.served += 1
+            self.ratings.append(rating)
+            log_session(f"Server-{port}", client_name, rating)
+        except (OSError, ConnectionError, asyncio.TimeoutError, FrameError):
+            # A malformed reply only loses this client, not the run.
+            self.lost += 1
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def _generate_load(self, arrivals):
+        loop = asyncio.get_running_loop()
+        start = self.start = loop.time() + 0.1  # leave time to create every task before the first arrival
+        await asyncio.gather(*(
+            self._client(i, start + offset, self.base_port + i % self.num_servers)
+            for i, offset in enumerate(arrivals)
+        ))
+
+    def run_simulation(self):
+        arrivals = poisson_arrivals(self.arrival_rate, self.num_clients, self.duration, self.rng)
+        self.logger.logger.info(
+            f"🚀 Starting Open-Loop Simulation | {self.profile['profile_name']} | "
+            f"{len(arrivals)} arrivals at {self.arrival_rate}/s over {self.duration}s")
+
+        ports = [self.base_port + i for i in range(self.num_servers)]
+        os.system(f"fuser -k {' '.join(f'{port}/tcp' for port in ports)} > /dev/null 2>&1 || true")
+        server_processes = []
+        for port in ports:
+            proc = Process(target=self._start_server_process, args=(f"Server-{port}", port, self.engine))
+            proc.start()
+            server_processes.append(proc)
+
+        time.sleep(2)
+        start_time = time.time()
+        asyncio.run(self._generate_load(arrivals))
+        execution_time = time.time() - start_time
+
+        self.logger.logger.info("🎯 Simulation completed.")
+        self._write_results_to_file(arrivals, execution_time)
+
+        for proc in server_processes:
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+
+    def _achieved_arrival_rate(self):
+        """Clients per second actually started, measured from the schedule's origin to the last dispatch."""
+        if not self.dispatch_times:
+            return 0.0
+        span = max(self.dispatch_times) - self.start
+        return len(self.dispatch_times) / span if span > 0 else 0.0
+
+    def _write_results_to_file(self, arrivals, execution_time):
+        responses = self.response_times.summary()
+        sessions = self.session_times.summary()
+        lag = self.dispatch_lag.summary()
+        achieved_rate = self._achieved_arrival_rate()
+        avg_rating = round(sum(self.ratings) / len(self.ratings), 2) if self.ratings else 0
+
+        result = {
+            "metrics": {
+                "total_clients_served": self.served,
+                "total_lost_clients": self.lost,
+                "throughput": round(self.served / execution_time, 2),
+                "average_rating": avg_rating,
+                "expected_rating": self.profile["expected_rating"],
+                "average_response_time": round(responses["mean"] / 1000, 6),
+                "response_time_ms": responses,
+                "session_time_ms": sessions,
+                "max_dispatch_lag_ms": lag["max"],
+                "dispatch_lag_ms": lag,
+                "target_arrival_rate": self.arrival_rate,
+                "achieved_arrival_rate": round(achieved_rate, 2),
+                "scheduled_clients": len(arrivals),
+                "simulation_time": round(execution_time, 2),
+                "profile": self.profile["profile_name"],
+                "approach": "open_loop"
+            },
+            "performance_metrics": {
+                "avg_cpu_usage": psutil.cpu_percent(interval=1),
+                "avg_memory_usage": psutil.virtual_memory().percent,
+                "disk_io_read": 0.0,
+                "disk_io_write": 0.0
+            },
+            "status": "PASSED" if self.served else "FAILED"
+        }
+
+        with open(RESULT_FILE, 'w') as f:
+            json.dump(result, f, indent=2)
+        with open(LIVE_METRICS_FILE, 'w') as f:
+            json.dump(result["metrics"], f)
+
+        print("\n" + "="*50)
+        print(f"🎉 OPEN-LOOP SIMULATION SUMMARY ({self.profile['profile_name']})")
+        print("="*50)
+        print(f"👥 Clients Served     : {self.served}")
+        print(f"❌ Lost Clients        : {self.lost}")
+        print(f"⭐ Avg Rating         : {avg_rating}/5")
+        print(f"📈 Arrival Rate       : {result['metrics']['achieved_arrival_rate']} /s "
+              f"(target {self.arrival_rate} /s)")
+        print(f"⏱  Response p50/p99   : {responses['p50']:.2f} / {responses['p99']:.2f} ms "
+              f"(max {responses['max']:.2f} ms)")
+        print(f"🕒 Dispatch Lag p99   : {lag['p99']:.2f} ms (max {lag['max']:.2f} ms)")
+        print("="*50 + "\n")
+
+    @staticmethod
+    def _start_server_process(name, port, engine=ENGINE_THREADING):
+        try:
+            server = Server(name=name, port=port, engine=engine)
+            server.start()
+        except KeyboardInterrupt:
+            server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop (Poisson arrival) load simulation")
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, help=f'profile name from {PROFILES_FILE}')
+    parser.add_argument('--clients', type=int, default=None, help='cap on arrivals (default: profile client_count)')
+    parser.add_argument('--duration', type=float, default=None,
+                        help='arrival window in seconds (default: profile session_duration)')
+    parser.add_argument('--servers', type=int, default=None, help='default: profile server_count')
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE_THREADING)
+    parser.add_argument('--messages', type=int, default=MESSAGES_PER_CLIENT, help='messages per client session')
+    parser.add_argument('--message-interval', type=float, default=MESSAGE_INTERVAL,
+                        help='seconds between one client\'s scheduled messages')
+    parser.add_argument('--seed', type=int, default=None, help='seed the arrival schedule and ratings')
+    parser.add_argument('--list-profiles', action='store_true')
+    args = parser.parse_args()
+
+    if args.list_profiles:
+        for name, profile in load_profiles().items():
+            print(f"{name:15} {profile['arrival_rate']:>6}/s  {profile['client_count']:>5} clients  "
+                  f"{profile['session_duration']:>6}s  {profile['description']}")
+        return
+
+    OpenLoopSimulation(args.profile, args.clients, args.duration, args.servers, args.engine,
+                       args.messages, args.message_interval, args.seed).run_simulation()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,508 @@
+"""Replay the client traces written by generate_clients.py against a chat server.
+
+Clients arrive at their `arrival_offset` from clients.csv, divided by a
+time-compression factor (24 hours of arrivals can be replayed in 10 minutes
+with --compression 144). Clients with a scripted conversation in
+sample_chat_data.csv send its client-side messages at the scripted times;
+the rest send `message_count` messages paced by their `response_pattern`.
+
+Each client waits at most its `expected_wait_tolerance` for the server's
+first reply. The tolerance is not compressed, because server latency is real
+time however fast the arrivals are replayed. If the tolerance runs out, or
+the connection fails, the client gives up and retries up to `retry_attempts`
+times, after a jittered exponential backoff so an overloaded server is not
+met by a reconnect storm. Every client ends up with one outcome, streamed to
+a CSV report.
+
+Neither file is loaded whole. clients.csv is sorted by arrival with an
+external merge sort (sorted runs spilled to temporary files, merged with
+heapq.merge), and clients are started lazily as their arrival comes due. The
+chat file is indexed once by byte offset, so a client's script is read only
+when that client starts. Either file may instead be in the columnar format
+written by `generate_clients.py --format columnar`; it is memory-mapped and
+rows are read by index, with no parsing. A columnar clients file already in
+arrival order is streamed as stored; otherwise its rows go through the same
+external sort.
+"""
+
+import os, csv, json, time, heapq, random, asyncio, argparse, tempfile, psutil
+from multiprocessing import Process
+from server import Server, ENGINES, ENGINE_THREADING, MAX_WAIT_SECONDS
+from logger import Logger, log_session
+from framing import encode_frame, FrameDecoder
+from generate_clients import ClientDataGenerator
+from utils import LatencyHistogram
+from columnar import ColumnarReader, is_columnar
+
+CLIENTS_FILE = "clients.csv"
+CHAT_FILE = "sample_chat_data.csv"
+RESULT_FILE = "replay_simulation_results.json"
+OUTCOMES_FILE = "replay_outcomes.csv"
+LIVE_METRICS_FILE = "live_replay_metrics.json"
+
+SORT_CHUNK_ROWS = 100000
+SERVER_PORTS = {"Server_A": 8000, "Server_B": 8001, "Server_C": 8002}
+# Seconds between a client's messages when it has no script, by response_pattern (generate_clients.py ranges).
+PATTERN_GAPS = {"quick": (1, 10), "medium": (10, 30), "slow": (30, 120), "random": (1, 60)}
+RECV_SIZE = 65536
+# Delay before retry n is uniform in [0, min(CAP, BASE * 2 ** (n - 1))] seconds of real time ("full jitter").
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_CAP = 30.0
+
+OUTCOME_SERVED = "served"          # first reply within the client's wait tolerance, session completed
+OUTCOME_SERVED_LATE = "served_late"  # session completed, but only after a retry
+OUTCOME_ABANDONED = "abandoned"    # every attempt outran the wait tolerance
+OUTCOME_FAILED = "failed"          # every attempt ended in a connection error
+OUTCOME_FIELDS = ["client_id", "client_name", "server_port", "scheduled_at", "wait_seconds",
+                  "wait_tolerance", "attempts", "messages_sent", "rating", "outcome"]
+
+TRACE_FIELDS = ("arrival_offset", "client_id", "client_name", "preferred_server", "session_duration",
+                "message_count", "response_pattern", "rating_tendency", "expected_wait_tolerance",
+                "retry_attempts")
+TRACE_TYPES = (float, int, str, str, float, int, str, str, float, int)
+
+
+def _trace_row(values):
+    return tuple(cast(value) for cast, value in zip(TRACE_TYPES, values))
+
+
+def _spill(rows, directory):
+    rows.sort()
+    with tempfile.NamedTemporaryFile("w", newline="", dir=directory, suffix=".csv", delete=False) as f:
+        csv.writer(f).writerows(rows)
+        return f.name
+
+
+def _read_run(path):
+    with open(path, newline="") as f:
+        for values in csv.reader(f):
+            yield _trace_row(values)
+
+
+def _iter_csv_rows(path, limit=None):
+    with open(path, newline="", encoding="utf-8") as f:
+        for count, row in enumerate(csv.DictReader(f)):
+            if limit is not None and count >= limit:
+                break
+            yield _trace_row(row[name] for name in TRACE_FIELDS)
+
+
+def _iter_columnar_rows(path, limit=None):
+    """Trace rows in stored order, read by index from the memory-mapped columns."""
+    with ColumnarReader(path) as reader:
+        columns = [reader.column(name) for name in TRACE_FIELDS]
+        count = len(reader) if limit is None else min(limit, len(reader))
+        for index in range(count):
+            yield tuple(cast(column[index]) for cast, column in zip(TRACE_TYPES, columns))
+
+
+def _columnar_in_arrival_order(path, limit=None):
+    """One pass over the mapped arrival column: True if the stored order needs no sort."""
+    with ColumnarReader(path) as reader:
+        offsets = reader.column("arrival_offset")
+        count = len(reader) if limit is None else min(limit, len(reader))
+        return all(offsets[i - 1] <= offsets[i] for i in range(1, count))
+
+
+def _external_sort(rows, chunk_rows, directory):
+    runs, chunk = [], []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            runs.append(_spill(chunk, directory))
+            chunk = []
+
+    if not runs:
+        chunk.sort()
+        yield from chunk
+        return
+    if chunk:
+        runs.append(_spill(chunk, directory))
+    yield from heapq.merge(*(_read_run(run) for run in runs))
+
+
+def iter_clients_by_arrival(path=CLIENTS_FILE, chunk_rows=SORT_CHUNK_ROWS, limit=None):
+    """Yield trace rows (TRACE_FIELDS tuples) in arrival order, holding at most `chunk_rows` in memory."""
+    if is_columnar(path):
+        if _columnar_in_arrival_order(path, limit):
+            yield from _iter_columnar_rows(path, limit)
+            return
+        rows = _iter_columnar_rows(path, limit)
+    else:
+        rows = _iter_csv_rows(path, limit)
+    with tempfile.TemporaryDirectory(prefix="replay_sort_") as directory:
+        yield from _external_sort(rows, chunk_rows, directory)
+
+
+class ChatScriptIndex:
+    """Byte-offset index of sample_chat_data.csv: client_id -> spans of that client's rows.
+
+    For a columnar chat file the spans are row-number ranges instead, and the
+    file stays mapped until `close()` (or the end of a `with` block).
+    """
+
+    def __init__(self, path=CHAT_FILE):
+        self.path = path
+        self.spans = {}
+        self.reader = None
+        if not os.path.exists(path):
+            return
+        if is_columnar(path):
+            self.reader = ColumnarReader(path)
+            client_ids = self.reader.column("client_id")
+            for row in range(len(self.reader)):
+                spans = self.spans.setdefault(client_ids[row], [])
+                if spans and spans[-1][1] == row:
+                    spans[-1][1] = row + 1
+                else:
+                    spans.append([row, row + 1])
+            return
+        with open(path, "rb") as f:
+            header = next(csv.reader([f.readline().decode("utf-8")]))
+            self.fields = header
+            column = header.index("client_id")
+            offset = f.tell()
+            for line in iter(f.readline, b""):
+                client_id = int(next(csv.reader([line.decode("utf-8")]))[column])
+                spans = self.spans.setdefault(client_id, [])
+                if spans and spans[-1][1] == offset:
+                    spans[-1][1] = offset + len(line)  # contiguous with this client's previous row
+                else:
+                    spans.append([offset, offset + len(line)])
+                offset += len(line)
+
+    def __contains__(self, client_id):
+        return client_id in self.spans
+
+    def script(self, client_id):
+        """The client's rows, read from disk on demand."""
+        if self.reader is not None:
+            return [self.reader.row(row) for start, end in self.spans.get(client_id, ()) for row in range(start, end)]
+        rows = []
+        with open(self.path, "rb") as f:
+            for start, end in self.spans.get(client_id, ()):
+                f.seek(start)
+                lines = f.read(end - start).decode("utf-8").splitlines()
+                rows.extend(dict(zip(self.fields, values)) for values in csv.reader(lines))
+        return rows
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+            self.spans = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplaySimulation:
+    def __init__(self, clients_path=CLIENTS_FILE, chat_path=CHAT_FILE, compression=1.0, num_clients=None,
+                 num_servers=3, engine=ENGINE_THREADING, server_workers=1, start_servers=True,
+                 host='127.0.0.1', seed=None, outcomes_path=OUTCOMES_FILE, retry_backoff=RETRY_BACKOFF_BASE,
+                 retry_backoff_cap=RETRY_BACKOFF_CAP):
+        self.clients_path = clients_path
+        self.chat = ChatScriptIndex(chat_path)
+        self.compression = compression
+        self.num_clients = num_clients
+        self.num_servers = num_servers
+        self.engine = engine
+        self.server_workers = server_workers
+        self.start_servers = start_servers
+        self.host = host
+        self.rng = random.Random(seed)
+        self.ratings = ClientDataGenerator(seed)
+        self.outcomes_path = outcomes_path
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_cap = retry_backoff_cap
+        self.logger = Logger('ReplaySimulation')
+
+        self.outcomes = {OUTCOME_SERVED: 0, OUTCOME_SERVED_LATE: 0, OUTCOME_ABANDONED: 0, OUTCOME_FAILED: 0}
+        self.wait_times = LatencyHistogram()       # scheduled arrival to first reply, final attempt
+        self.response_times = LatencyHistogram()   # per message, from when it was due
+        self.rating_values = []
+        self.scheduled = 0
+        self.max_dispatch_lag = 0.0
+
+    def _port(self, client_id, preferred_server):
+        port = SERVER_PORTS.get(preferred_server)
+        if port is None or port - 8000 >= self.num_servers:
+            port = 8000 + client_id % self.num_servers
+        return port
+
+    def _messages(self, trace):
+        """[(offset_seconds, message)] in uncompressed trace time, ending with the RATING."""
+        client_id, session_duration = trace[1], trace[4]
+        if client_id in self.chat:
+            rows = [row for row in self.chat.script(client_id) if row["sender"] == "client"]
+            messages = []
+            for row in rows:
+                # Scripts from the old running-sum generator can run far past the session: clamp to its end.
+                offset = min(float(row["timestamp"]), session_duration)
+                if row["message_type"] == "rating":
+                    messages.append((offset, f"RATING:{row['message'].split(':')[-1].strip()}"))
+                else:
+                    messages.append((offset, json.dumps({'type': 'chat', 'message': row["message"]})))
+            if messages and messages[-1][1].startswith("RATING:"):
+                return messages
+
+        low, high = PATTERN_GAPS.get(trace[6], PATTERN_GAPS["random"])
+        offset, messages = 0.0, []
+        for n in range(trace[5]):
+            messages.append((min(offset, session_duration), json.dumps(
+                {'type': 'chat', 'message': f'Message {n} from {trace[2]}'})))
+            offset += self.rng.uniform(low, high)
+        rating = self.ratings._generate_rating(trace[7])
+        return messages + [(min(offset, session_duration), f"RATING:{rating}")]
+
+    async def _read_frame(self, reader, decoder, pending):
+        while not pending:
+            data = await reader.read(RECV_SIZE)
+            if not data:
+                return None
+            pending.extend(decoder.feed(data))
+        return pending.pop(0)
+
+    async def _attempt(self, port, messages, arrival, tolerance):
+        """One connection attempt; returns (outcome or None to retry, wait, messages_sent, rating).
+
+        `wait` runs from the client's scheduled `arrival` to the first reply, so
+        time lost to earlier attempts and to a lagging replay is included.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        writer = None
+        sent = 0
+        wait = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, port), tolerance)
+            decoder, pending = FrameDecoder(), []
+            for offset, message in messages:
+                due = started + offset / self.compression
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                writer.write(encode_frame(message))
+                sent += 1
+                if message.startswith("RATING:"):
+                    await writer.drain()
+                    await asyncio.wait_for(reader.read(), MAX_WAIT_SECONDS)  # the server closes after a rating
+                    return OUTCOME_SERVED, wait, sent, int(message.split(":", 1)[1])
+
+                # The wait tolerance covers the first reply; after that a session only has to stay alive.
+                timeout = tolerance - (loop.time() - started) if wait is None else MAX_WAIT_SECONDS
+                reply = await asyncio.wait_for(self._read_frame(reader, decoder, pending), timeout)
+                if reply is None:
+                    return None, wait, sent, None
+                now = loop.time()
+                if wait is None:
+                    wait = now - arrival
+                self.response_times.record((now - due) * 1000)
+            return None, wait, sent, None
+        except asyncio.TimeoutError:
+            if wait is None:
+                return OUTCOME_ABANDONED, loop.time() - arrival, sent, None
+            return None, wait, sent, None
+        except (OSError, ConnectionError):
+            return None, wait, sent, None
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _retry_delay(self, retry):
+        """Seconds to wait before retry number `retry` (1-based): full jitter under a capped exponential."""
+        return self.rng.uniform(0, min(self.retry_backoff_cap, self.retry_backoff * 2 ** (retry - 1)))
+
+    async def _client(self, trace, arrival, replay_offset, report):
+        client_id, client_name = trace[1], trace[2]
+        port = self._port(client_id, trace[3])
+        tolerance = trace[8]
+        messages = self._messages(trace)
+
+        outcome, wait, sent, rating, attempts = OUTCOME_FAILED, None, 0, None, 0
+        for attempts in range(1, trace[9] + 2):
+            if attempts > 1:
+                await asyncio.sleep(self._retry_delay(attempts - 1))
+            result, wait, sent, rating = await self._attempt(port, messages, arrival, tolerance)
+            if result == OUTCOME_SERVED:
+                outcome = OUTCOME_SERVED if attempts == 1 else OUTCOME_SERVED_LATE
+                break
+            outcome = result or OUTCOME_FAILED
+
+        self.outcomes[outcome] += 1
+        if wait is not None:
+            self.wait_times.record(wait * 1000)
+        if rating is not None:
+            self.rating_values.append(rating)
+            log_session(f"Server-{port}", client_name, rating)
+        report.writerow([client_id, client_name, port, round(replay_offset, 3), round(wait, 4) if wait is not None else "",
+                         round(tolerance, 4), attempts, sent, rating or "", outcome])
+
+    async def _replay(self, report):
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        start = None
+        for trace in iter_clients_by_arrival(self.clients_path, limit=self.num_clients):
+            if start is None:
+                start = loop.time() - trace[0] / self.compression  # the first arrival starts the replay
+            arrival = start + trace[0] / self.compression
+            delay = arrival - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.max_dispatch_lag = max(self.max_dispatch_lag, loop.time() - arrival)
+            self.scheduled += 1
+            task = asyncio.create_task(self._client(trace, arrival, arrival - start, report))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    def run_simulation(self):
+        self.logger.logger.info(f"🚀 Starting Trace Replay | {self.clients_path} | compression {self.compression}x")
+
+        server_processes = []
+        if self.start_servers:
+            os.system("fuser -k 8000/tcp 8001/tcp 8002/tcp > /dev/null 2>&1 || true")
+            for i in range(self.num_servers):
+                port = 8000 + i
+                proc = Process(target=self._start_server_process,
+                               args=(f"Server-{port}", port, self.engine, self.server_workers))
+                proc.start()
+                server_processes.append(proc)
+            time.sleep(2)
+
+        start_time = time.time()
+        try:
+            with open(self.outcomes_path, "w", newline="") as f:
+                report = csv.writer(f)
+                report.writerow(OUTCOME_FIELDS)
+                asyncio.run(self._replay(report))
+        finally:
+            self.chat.close()
+        execution_time = time.time() - start_time
+
+        self.logger.logger.info("🎯 Replay completed.")
+        self._write_results_to_file(execution_time)
+
+        for proc in server_processes:
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+
+    def _write_results_to_file(self, execution_time):
+        served = self.outcomes[OUTCOME_SERVED] + self.outcomes[OUTCOME_SERVED_LATE]
+        lost = self.outcomes[OUTCOME_ABANDONED] + self.outcomes[OUTCOME_FAILED]
+        waits = self.wait_times.summary()
+        responses = self.response_times.summary()
+        avg_rating = round(sum(self.rating_values) / len(self.rating_values), 2) if self.rating_values else 0
+
+        result = {
+            "metrics": {
+                "total_clients_served": served,
+                "total_lost_clients": lost,
+                "outcomes": dict(self.outcomes),
+                "within_tolerance_percent": round(100.0 * self.outcomes[OUTCOME_SERVED] / self.scheduled, 2)
+                if self.scheduled else 0.0,
+                "throughput": round(served / execution_time, 2),
+                "average_rating": avg_rating,
+                "average_response_time": round(responses["mean"] / 1000, 6),
+                "wait_time_ms": waits,
+                "response_time_ms": responses,
+                "max_dispatch_lag_ms": round(self.max_dispatch_lag * 1000, 3),
+                "time_compression": self.compression,
+                "simulation_time": round(execution_time, 2),
+                "approach": "replay"
+            },
+            "performance_metrics": {
+                "avg_cpu_usage": psutil.cpu_percent(interval=1),
+                "avg_memory_usage": psutil.virtual_memory().percent,
+                "disk_io_read": 0.0,
+                "disk_io_write": 0.0
+            },
+            "outcomes_file": self.outcomes_path,
+            "status": "PASSED" if served else "FAILED"
+        }
+
+        with open(RESULT_FILE, 'w') as f:
+            json.dump(result, f, indent=2)
+        with open(LIVE_METRICS_FILE, 'w') as f:
+            json.dump(result["metrics"], f)
+
+        print("\n" + "="*50)
+        print("🎉 TRACE REPLAY SUMMARY")
+        print("="*50)
+        print(f"👥 Clients Replayed   : {self.scheduled} ({self.compression}x compression)")
+        for outcome, count in self.outcomes.items():
+            print(f"   {outcome:<12}       : {count}")
+        print(f"✅ Within Tolerance   : {result['metrics']['within_tolerance_percent']}%")
+        print(f"⏱  Wait p50/p99       : {waits['p50']:.2f} / {waits['p99']:.2f} ms")
+        print(f"⭐ Avg Rating         : {avg_rating}/5")
+        print(f"📄 Per-client report  : {self.outcomes_path}")
+        print("="*50 + "\n")
+
+    @staticmethod
+    def _start_server_process(name, port, engine=ENGINE_THREADING, workers=1):
+        try:
+            server = Server(name=name, port=port, engine=engine, processes=workers)
+            server.start()
+        except KeyboardInterrupt:
+            server.shutdown()
+
+
+def arrival_span(path=CLIENTS_FILE, limit=None):
+    """Seconds between the first and last arrival, in one streaming pass."""
+    if is_columnar(path):
+        with ColumnarReader(path) as reader:
+            offsets = reader.column("arrival_offset")
+            count = len(reader) if limit is None else min(limit, len(reader))
+            if not count:
+                return 0.0
+            return float(max(offsets[i] for i in range(count)) - min(offsets[i] for i in range(count)))
+    first, last = None, None
+    with open(path, newline="", encoding="utf-8") as f:
+        for count, row in enumerate(csv.DictReader(f)):
+            if limit is not None and count >= limit:
+                break
+            offset = float(row["arrival_offset"])
+            first = offset if first is None else min(first, offset)
+            last = offset if last is None else max(last, offset)
+    return (last - first) if first is not None else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay generated client traces against a chat server")
+    parser.add_argument('--clients-file', default=CLIENTS_FILE, help='CSV or columnar (.ccol) client traces')
+    parser.add_argument('--chat-file', default=CHAT_FILE, help='CSV or columnar (.ccol) chat scripts')
+    parser.add_argument('--clients', type=int, default=None, help='replay only the first N clients of the file')
+    parser.add_argument('--compression', type=float, default=None,
+                        help='time-compression factor, e.g. 144 replays 24h of arrivals in 10 minutes')
+    parser.add_argument('--duration', type=float, default=None,
+                        help='replay the arrivals over this many seconds (sets --compression)')
+    parser.add_argument('--servers', type=int, default=3)
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE_THREADING)
+    parser.add_argument('--server-workers', type=int, default=1)
+    parser.add_argument('--no-servers', action='store_true', help='replay against servers that are already running')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--outcomes', default=OUTCOMES_FILE, help='per-client outcome CSV')
+    parser.add_argument('--retry-backoff', type=float, default=RETRY_BACKOFF_BASE,
+                        help='base of the jittered exponential delay between a client\'s attempts (seconds)')
+    parser.add_argument('--retry-backoff-cap', type=float, default=RETRY_BACKOFF_CAP,
+                        help='longest delay between a client\'s attempts (seconds)')
+    args = parser.parse_args()
+
+    compression = args.compression
+    if compression is None:
+        span = arrival_span(args.clients_file, args.clients)
+        compression = max(span / args.duration, 1.0) if args.duration and span else 1.0
+
+    ReplaySimulation(args.clients_file, args.chat_file, compression, args.clients, args.servers, args.engine,
+                     args.server_workers, not args.no_servers, args.host, args.seed,
+                     args.outcomes, args.retry_backoff, args.retry_backoff_cap).run_simulation()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,16 +11,17 @@ from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from logger import Logger, log_session
-from threaded_server import ThreadedServer
+from threaded_server import ThreadedServer, SERVER_MODES, MODE_THREAD
 from threaded_client import ThreadedClient
 
 LIVE_FILE = "live_threading_metrics.json"
 
 class ThreadedSimulation:
-    def __init__(self, num_clients=1000, num_servers=3, duration=300):
+    def __init__(self, num_clients=1000, num_servers=3, duration=300, server_mode=MODE_THREAD):
         self.num_clients = num_clients
         self.num_servers = num_servers
         self.duration = duration
+        self.server_mode = server_mode
         self.servers = []
         self.clients = []
         self.logger = Logger("ThreadedSimulation")
@@ -34,7 +35,8 @@ class ThreadedSimulation:
             'throughput': 0,
             'max_concurrent_clients': 0,
             'simulation_time': 0,
-            'approach': 'threading'
+            'approach': 'threading',
+            'server_mode': server_mode
         }
         self.RESULT_FILE = 'threading_simulation_results.json'
         self.live_writer_running = True
@@ -43,9 +45,9 @@ class ThreadedSimulation:
         base_port = 8000
         for i in range(self.num_servers):
             server_name = f"Server_{chr(65 + i)}"
-            server = ThreadedServer(server_name, base_port + i, self.num_clients)
+            server = ThreadedServer(server_name, base_port + i, self.num_clients, mode=self.server_mode)
             self.servers.append(server)
-        self.logger.log_info(f"Created {self.num_servers} threaded servers")
+        self.logger.log_info(f"Created {self.num_servers} threaded servers ({self.server_mode} mode)")
 
     def create_clients(self):
         for i in range(self.num_clients):
@@ -154,9 +156,11 @@ def main():
     parser.add_argument('--clients', type=int, default=1000)
     parser.add_argument('--servers', type=int, default=3)
     parser.add_argument('--duration', type=int, default=300)
+    parser.add_argument('--server-mode', choices=SERVER_MODES, default=MODE_THREAD,
+                        help='thread-per-connection or single-threaded selectors reactor')
 
     args = parser.parse_args()
-    sim = ThreadedSimulation(args.clients, args.servers, args.duration)
+    sim = ThreadedSimulation(args.clients, args.servers, args.duration, args.server_mode)
 
     try:
         sim.run_simulation()
@@ -165,7 +169,7 @@ def main():
         print("\n" + "="*50)
         print("THREADED SIMULATION RESULTS")
         print("="*50)
-        print(f"Approach: {results['approach']}")
+        print(f"Approach: {results['approach']} ({results['metrics']['server_mode']} servers)")
         print(f"Total clients served: {results['metrics']['total_clients_served']}")
         print(f"Total lost clients: {results['metrics']['total_lost_clients']}")
         print(f"Avg response time: {results['metrics']['average_response_time']:.2f}s")
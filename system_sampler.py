@@ -0,0 +1,218 @@
+# system_sampler.py
+"""Non-blocking system resource sampling.
+
+Each `sample()` reads the kernel's cumulative counters once (on Linux straight
+from /proc) and derives CPU utilisation and network/disk byte rates from the
+difference to the previous sample, so nothing ever sleeps to measure. Samples
+are kept in a fixed-size ring buffer.
+"""
+
+import os
+import shutil
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, Optional
+
+try:
+    import psutil  # only needed where /proc is unavailable
+except ImportError:
+    psutil = None
+
+SECTOR_SIZE = 512
+
+
+def _read_cpu_times():
+    """(busy, total) jiffies across all CPUs."""
+    with open("/proc/stat") as f:
+        fields = [int(value) for value in f.readline().split()[1:]]
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+    total = sum(fields[:8])  # guest time is already included in user/nice
+    return total - idle, total
+
+
+def _read_memory():
+    values = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, rest = line.split(":", 1)
+            if key in ("MemTotal", "MemAvailable"):
+                values[key] = int(rest.split()[0]) * 1024
+                if len(values) == 2:
+                    break
+    total = values.get("MemTotal", 0)
+    used = total - values.get("MemAvailable", 0)
+    return total, used
+
+
+def _read_network():
+    """(bytes_sent, bytes_recv) summed over every interface except loopback."""
+    sent = recv = 0
+    with open("/proc/net/dev") as f:
+        for line in f.readlines()[2:]:
+            name, data = line.split(":", 1)
+            if name.strip() == "lo":
+                continue
+            fields = data.split()
+            recv += int(fields[0])
+            sent += int(fields[8])
+    return sent, recv
+
+
+# Block devices layered on other disks (LVM/dm-crypt, software RAID) or backed by memory
+# or files; their I/O is already counted on the physical disks underneath.
+VIRTUAL_DISK_PREFIXES = ("dm-", "md", "loop", "ram", "zram")
+
+
+def _whole_disks(sys_block="/sys/block"):
+    """Physical disks: /sys/block entries backed by a device, or not virtual by name."""
+    try:
+        names = os.listdir(sys_block)
+    except FileNotFoundError:
+        return None
+    physical = {name for name in names if os.path.exists(os.path.join(sys_block, name, "device"))}
+    return physical or {name for name in names if not name.startswith(VIRTUAL_DISK_PREFIXES)}
+
+
+def _read_disk_io(disks):
+    """(bytes_read, bytes_written) over physical disks, so partitions and dm devices are not counted twice."""
+    read = written = 0
+    with open("/proc/diskstats") as f:
+        for line in f:
+            fields = line.split()
+            if disks is not None and fields[2] not in disks:
+                continue
+            read += int(fields[5]) * SECTOR_SIZE
+            written += int(fields[9]) * SECTOR_SIZE
+    return read, written
+
+
+class SystemSampler:
+    """Sample CPU, memory, disk and network counters without blocking.
+
+    Call `sample()` at whatever cadence suits the caller, or `start()` a
+    background thread that samples every `interval` seconds. Rates
+    (`*_rate`, bytes per second) and `cpu_percent` describe the time since
+    the previous sample; the first sample reports averages since boot for CPU
+    and zero rates.
+    """
+
+    def __init__(self, interval: float = 1.0, history_size: int = 100, disk_path: str = "/"):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.history = deque(maxlen=history_size)
+        self.lock = Lock()
+        self.use_proc = os.path.exists("/proc/stat")
+        self.disks = _whole_disks() if self.use_proc else None
+        self.cpu_count = os.cpu_count()
+        self._previous = None
+        self._stop_event = Event()
+        self._thread = None
+
+    def _read_counters(self) -> Dict[str, Any]:
+        if self.use_proc:
+            cpu_busy, cpu_total = _read_cpu_times()
+            memory_total, memory_used = _read_memory()
+            net_sent, net_recv = _read_network()
+            disk_read, disk_written = _read_disk_io(self.disks)
+        elif psutil is not None:
+            times = psutil.cpu_times()
+            cpu_total = sum(times)
+            cpu_busy = cpu_total - times.idle
+            memory = psutil.virtual_memory()
+            memory_total, memory_used = memory.total, memory.total - memory.available
+            net = psutil.net_io_counters()
+            net_sent, net_recv = net.bytes_sent, net.bytes_recv
+            disk = psutil.disk_io_counters()
+            disk_read, disk_written = (disk.read_bytes, disk.write_bytes) if disk else (0, 0)
+        else:
+            raise RuntimeError("System sampling needs /proc or the psutil package")
+
+        return {
+            "time": time.monotonic(),
+            "cpu_busy": cpu_busy,
+            "cpu_total": cpu_total,
+            "memory_total": memory_total,
+            "memory_used": memory_used,
+            "network_bytes_sent": net_sent,
+            "network_bytes_recv": net_recv,
+            "disk_read_bytes": disk_read,
+            "disk_write_bytes": disk_written
+        }
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample, append it to the history and return it."""
+        counters = self._read_counters()
+        disk = shutil.disk_usage(self.disk_path)
+
+        with self.lock:
+            previous = self._previous or dict(counters, cpu_busy=0, cpu_total=0)
+            elapsed = counters["time"] - previous["time"]
+
+            def rate(key):
+                return max(counters[key] - previous[key], 0) / elapsed if elapsed > 0 else 0.0
+
+            cpu_delta = counters["cpu_total"] - previous["cpu_total"]
+            memory_total = counters["memory_total"]
+            sample = {
+                "timestamp": time.time(),
+                "cpu_percent": round(100.0 * (counters["cpu_busy"] - previous["cpu_busy"]) / cpu_delta, 1)
+                if cpu_delta > 0 else 0.0,
+                "cpu_count": self.cpu_count,
+                "memory_total": memory_total,
+                "memory_used": counters["memory_used"],
+                "memory_percent": round(100.0 * counters["memory_used"] / memory_total, 1) if memory_total else 0.0,
+                "disk_total": disk.total,
+                "disk_used": disk.used,
+                "disk_percent": round(100.0 * disk.used / disk.total, 1) if disk.total else 0.0,
+                "network_bytes_sent": counters["network_bytes_sent"],
+                "network_bytes_recv": counters["network_bytes_recv"],
+                "network_send_rate": rate("network_bytes_sent"),
+                "network_recv_rate": rate("network_bytes_recv"),
+                "disk_read_bytes": counters["disk_read_bytes"],
+                "disk_write_bytes": counters["disk_write_bytes"],
+                "disk_read_rate": rate("disk_read_bytes"),
+                "disk_write_rate": rate("disk_write_bytes")
+            }
+            self._previous = counters
+            self.history.append(sample)
+        return sample
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            return self.history[-1] if self.history else None
+
+    def get_history(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return list(self.history)
+
+    def start(self):
+        """Sample every `interval` seconds on a daemon thread."""
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = Thread(target=self._run, name="system-sampler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self.sample()
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_system_sampler = None
+_system_sampler_lock = Lock()
+
+def get_system_sampler() -> SystemSampler:
+    """Process-wide sampler shared by quick one-off readers such as utils.get_system_info."""
+    global _system_sampler
+    with _system_sampler_lock:
+        if _system_sampler is None:
+            _system_sampler = SystemSampler()
+        return _system_sampler
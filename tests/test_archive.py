@@ -0,0 +1,240 @@
+import unittest
+import json
+import asyncio
+import os
+import sys
+import gzip
+import subprocess
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logger import ArchiveWriter
+from archive_store import SegmentedArchive, parse_timestamp
+
+def compress_pending(path, segment_dir):
+    """Open the archive in a fresh process, which re-queues uncompressed segments, and wait."""
+    SegmentedArchive(path, segment_dir=segment_dir, rotation_size_mb=1).wait_for_compression()
+
+class TestArchiveWriter(unittest.TestCase):
+    """Test cases for the batched archive writer."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "archive.txt")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_close_flushes_pending_entries(self):
+        """Test that entries below the batch size are written on close."""
+        writer = ArchiveWriter(self.path, buffer_size=100, flush_interval=60)
+        for i in range(5):
+            self.assertTrue(writer.write(f"line {i}\n"))
+        writer.close()
+
+        with open(self.path) as f:
+            self.assertEqual(f.read().splitlines(), [f"line {i}" for i in range(5)])
+        self.assertEqual(writer.get_stats()["written"], 5)
+
+    def test_json_records_written_alongside(self):
+        """Test that records are appended to the JSON-lines archive next to the text one."""
+        writer = ArchiveWriter(self.path, flush_interval=60)
+        writer.write("plain line\n")
+        writer.write("rated line\n", {"server_name": "Server_A", "rating": 5})
+        writer.close()
+
+        with open(os.path.join(self.tmpdir.name, "archive.jsonl")) as f:
+            self.assertEqual([json.loads(line) for line in f], [{"server_name": "Server_A", "rating": 5}])
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_concurrent_writers(self):
+        """Test that concurrent producers lose no entries."""
+        writer = ArchiveWriter(self.path, buffer_size=50, flush_interval=0.1, max_queue_size=20, put_timeout=5)
+
+        def produce(worker):
+            for i in range(200):
+                writer.write(f"{worker}:{i}\n")
+
+        threads = [threading.Thread(target=produce, args=(w,)) for w in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        stats = writer.get_stats()
+        self.assertEqual(stats["enqueued"], 800)
+        self.assertEqual(stats["written"], 800)
+        self.assertEqual(stats["dropped"], 0)
+        self.assertLessEqual(stats["max_queue_depth"], 20)
+
+    def _stalled_writer(self, **kwargs):
+        """A writer stuck flushing one entry, with a second one filling its queue."""
+        writer = ArchiveWriter(self.path, buffer_size=1, flush_interval=60, max_queue_size=1, **kwargs)
+        flushing, release = threading.Event(), threading.Event()
+
+        def stalled_append(lines):
+            flushing.set()
+            release.wait()
+
+        writer.store.append = stalled_append
+        self.addCleanup(writer.close)
+        self.addCleanup(release.set)
+        writer.write("flushing\n")
+        flushing.wait(5)
+        self.assertTrue(writer.write("queued\n"))
+        return writer
+
+    def test_write_after_close_is_dropped(self):
+        """Test that entries written after close are rejected and counted as dropped."""
+        writer = ArchiveWriter(self.path, flush_interval=60)
+        writer.write("before\n")
+        writer.close()
+        self.assertFalse(writer.write("after\n"))
+
+        stats = writer.get_stats()
+        self.assertEqual(stats["written"], 1)
+        self.assertEqual(stats["dropped"], 1)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "before\n")
+
+    def test_drop_policy_never_blocks(self):
+        """Test that the drop policy rejects an entry at once when the queue is full."""
+        writer = self._stalled_writer(overflow_policy="drop", put_timeout=5)
+        started = time.monotonic()
+        self.assertFalse(writer.write("overflow\n"))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(writer.get_stats()["blocked_puts"], 0)
+        self.assertEqual(writer.get_stats()["dropped"], 1)
+
+    def test_event_loop_producers_never_block(self):
+        """Test that a write from a running event loop drops instead of waiting for room."""
+        writer = self._stalled_writer(put_timeout=5)
+
+        async def produce():
+            return writer.write("overflow\n")
+
+        started = time.monotonic()
+        self.assertFalse(asyncio.run(produce()))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(writer.get_stats()["dropped"], 1)
+
+    def test_unknown_overflow_policy(self):
+        """Test that an unknown overflow policy is rejected."""
+        with self.assertRaises(ValueError):
+            ArchiveWriter(self.path, overflow_policy="spill")
+
+class TestSegmentedArchive(unittest.TestCase):
+    """Test cases for rotating, compressed archive segments."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "archive.txt")
+        # ~1 KB segments so a few hundred lines rotate several times
+        self.store = SegmentedArchive(self.path, rotation_size_mb=1 / 1024)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write_day(self, day, count=40):
+        self.store.append([
+            f"[2025-07-{day:02d} 10:{i:02d}:00] Server: Server_A, Client: Client-{i}, Rating: 4\n"
+            for i in range(count)
+        ])
+
+    def test_parse_timestamp(self):
+        """Test timestamp extraction from text and JSON archive lines."""
+        self.assertEqual(parse_timestamp("[2025-07-16 12:42:49] Server: A"), "2025-07-16 12:42:49")
+        self.assertEqual(parse_timestamp('{"timestamp": "2025-07-16T12:42:49"}'), "2025-07-16 12:42:49")
+        self.assertIsNone(parse_timestamp("=== CHAT SERVER ARCHIVE ==="))
+
+    def test_rotation_and_compression(self):
+        """Test that full segments are rotated, indexed and gzip-compressed."""
+        for day in range(1, 4):
+            self._write_day(day)
+        self.store.wait_for_compression()
+
+        segments = self.store.read_index()["segments"]
+        self.assertEqual(len(segments), 3)
+        self.assertTrue(all(segment["compressed"] for segment in segments))
+        self.assertTrue(all(segment["file"].endswith(".gz") for segment in segments))
+        self.assertEqual(segments[1]["start"], "2025-07-02 10:00:00")
+        self.assertEqual(segments[1]["end"], "2025-07-02 10:39:00")
+
+    def test_query_opens_only_matching_segments(self):
+        """Test that a range query selects overlapping segments and filters lines."""
+        for day in range(1, 4):
+            self._write_day(day)
+        self.store.wait_for_compression()
+
+        paths = self.store.segments_for("2025-07-02 00:00:00", "2025-07-02 23:59:59")
+        self.assertEqual(len(paths), 1)
+
+        lines = list(self.store.query("2025-07-02 10:10:00", "2025-07-02 10:19:00"))
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(len(list(self.store.query())), 120)
+    def _leave_uncompressed(self, count, compressing=None, lines=50):
+        """Write segments into the index as a process that rotated them and died would."""
+        segments = []
+        for sequence in range(1, count + 1):
+            name = f"segment-{sequence:06d}.txt"
+            with open(os.path.join(self.store.segment_dir, name), "w") as f:
+                f.writelines(f"[2025-08-{sequence:02d} 09:00:{i:02d}] line {i}\n" for i in range(lines))
+            segment = {"sequence": sequence, "file": name, "start": None, "end": None, "compressed": False}
+            if compressing:
+                segment["compressing"] = compressing
+            segments.append(segment)
+        self.store._write_index({"segments": segments})
+
+    def test_processes_compress_each_segment_once(self):
+        """Test that processes racing to compress leftover segments each publish one valid .gz."""
+        self._leave_uncompressed(6, lines=20000)
+        ctx = get_context("fork")
+        workers = [ctx.Process(target=compress_pending, args=(self.path, self.store.segment_dir)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            self.assertEqual(worker.exitcode, 0)
+
+        segments = SegmentedArchive(self.path, rotation_size_mb=1).read_index()["segments"]
+        self.assertTrue(all(s["compressed"] and "compressing" not in s for s in segments))
+        self.assertEqual(sorted(os.listdir(self.store.segment_dir)),
+                         sorted([".lock", "index.json"] + [s["file"] for s in segments]))
+        for segment in segments:
+            with gzip.open(os.path.join(self.store.segment_dir, segment["file"]), "rt") as f:
+                self.assertEqual(len(f.readlines()), 20000)
+
+    def test_live_claim_is_respected(self):
+        """Test that a segment another live process is compressing is left alone."""
+        owner = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        self.addCleanup(owner.wait)
+        self.addCleanup(owner.kill)
+        self._leave_uncompressed(1, compressing=owner.pid)
+
+        store = SegmentedArchive(self.path, rotation_size_mb=1)
+        store.wait_for_compression()
+        segment = store.read_index()["segments"][0]
+        self.assertFalse(segment["compressed"])
+        self.assertEqual(segment["compressing"], owner.pid)
+        self.assertEqual(sorted(os.listdir(store.segment_dir)), [".lock", "index.json", "segment-000001.txt"])
+
+    def test_stale_claim_is_taken_over(self):
+        """Test that a segment claimed by a process that died is compressed by the next one."""
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        self._leave_uncompressed(2, compressing=dead.pid)
+
+        store = SegmentedArchive(self.path, rotation_size_mb=1)
+        store.wait_for_compression()
+        self.assertTrue(all(s["compressed"] for s in store.read_index()["segments"]))
+        self.assertEqual(len(list(store.query())), 100)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,101 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar import ColumnarWriter, ColumnarReader, is_columnar, MAGIC, HEADER_LENGTH
+
+SCHEMA = [('id', 'int32'), ('total', 'int64'), ('score', 'float64'), ('priority', 'category'),
+          ('name', 'string'), ('bucket', 'category')]
+
+def make_row(i):
+    return (i, i * 10 ** 10, i / 4, ['low', 'medium', 'high'][i % 3], f'Zoë_{i}', f'bucket-{i % 400}')
+
+class TestColumnarFormat(unittest.TestCase):
+    """Test cases for the columnar binary format."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'data.ccol')
+
+    def test_round_trip_in_chunks(self):
+        """Test that rows written over several chunks read back exactly, in any order."""
+        with ColumnarWriter(self.path, SCHEMA) as writer:
+            for start in range(0, 2500, 1000):
+                writer.write_rows(make_row(i) for i in range(start, min(start + 1000, 2500)))
+
+        self.assertTrue(is_columnar(self.path))
+        with ColumnarReader(self.path) as reader:
+            self.assertEqual(len(reader), 2500)
+            self.assertEqual(reader.names, [name for name, _ in SCHEMA])
+            for i in (2499, 0, 1234):
+                self.assertEqual(tuple(reader.row(i).values()), make_row(i))
+            self.assertEqual([tuple(row.values()) for row in reader], [make_row(i) for i in range(2500)])
+            self.assertEqual(reader.column('total')[7], 7 * 10 ** 10)
+            # Three priorities fit one-byte codes; 400 buckets need two.
+            self.assertEqual(reader.column('priority').codes.itemsize, 1)
+            self.assertEqual(reader.column('bucket').codes.itemsize, 2)
+            with self.assertRaises(IndexError):
+                reader.row(2500)
+
+    def test_empty_and_invalid_files(self):
+        """Test that an empty dataset opens and a CSV is rejected."""
+        with ColumnarWriter(self.path, SCHEMA):
+            pass
+        with ColumnarReader(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader), [])
+
+        csv_path = os.path.join(self.tmpdir.name, 'data.csv')
+        with open(csv_path, 'w') as f:
+            f.write('id,name\n1,a\n')
+        self.assertFalse(is_columnar(csv_path))
+        with self.assertRaises(ValueError):
+            ColumnarReader(csv_path)
+
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ['data.ccol', 'data.csv'])
+
+    def test_interrupted_write_keeps_previous_file(self):
+        """Test that an exception inside the writer leaves the previous file and no temporaries."""
+        with ColumnarWriter(self.path, SCHEMA) as writer:
+            writer.write_rows(make_row(i) for i in range(10))
+
+        with self.assertRaises(KeyboardInterrupt):
+            with ColumnarWriter(self.path, SCHEMA) as writer:
+                writer.write_rows(make_row(i) for i in range(100))
+                raise KeyboardInterrupt
+
+        with ColumnarReader(self.path) as reader:
+            self.assertEqual(len(reader), 10)
+        self.assertEqual(os.listdir(self.tmpdir.name), ['data.ccol'])
+
+    def test_negative_indices(self):
+        """Test that negative indices count from the end in every column kind."""
+        with ColumnarWriter(self.path, SCHEMA) as writer:
+            writer.write_rows(make_row(i) for i in range(5))
+        with ColumnarReader(self.path) as reader:
+            self.assertEqual(tuple(reader.column(name)[-1] for name in reader.names), make_row(4))
+            self.assertEqual(reader.column('name')[-5], make_row(0)[4])
+            with self.assertRaises(IndexError):
+                reader.column('name')[-6]
+            with self.assertRaises(IndexError):
+                reader.column('name')[5]
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'), 'needs /proc/self/fd')
+    def test_bad_header_closes_file(self):
+        """Test that a corrupt header raises without leaking the file handle or mapping."""
+        header = b'{"rows": 1, "columns": ['
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        open_fds = len(os.listdir('/proc/self/fd'))
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                ColumnarReader(self.path)
+        self.assertEqual(len(os.listdir('/proc/self/fd')), open_fds)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,269 @@
+import unittest
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager, SCHEMA_VERSION
+
+class TestDatabaseManager(unittest.TestCase):
+    """Test cases for the pooled SQLite database manager."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmpdir.name, "test.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_connection_reused_per_thread(self):
+        """Test that a thread keeps one connection and opens it in WAL mode."""
+        conn = self.db._get_connection()
+        self.assertIs(conn, self.db._get_connection())
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.db._get_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(conn, other[0])
+
+    def test_relative_path_survives_chdir(self):
+        """Test that a thread connecting after a chdir still opens the database __init__ created."""
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        try:
+            db = DatabaseManager("relative.db", write_behind=False)
+        finally:
+            os.chdir(cwd)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(db._get_connection().execute(
+            "PRAGMA user_version").fetchone()[0]))
+        thread.start()
+        thread.join()
+        db.close()
+        self.assertEqual(db.db_path, os.path.join(os.path.realpath(self.tmpdir.name), "relative.db"))
+        self.assertEqual(other, [SCHEMA_VERSION])
+        self.assertFalse(os.path.exists("relative.db"))
+
+    def test_connection_closed_when_thread_exits(self):
+        """Test that a finished thread's connection is closed and leaves the pool."""
+        self.db._get_connection()
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.db._get_connection()))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(len(self.db._connections), 1)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            other[0].execute("SELECT 1")
+
+    def test_concurrent_session_inserts(self):
+        """Test that sessions inserted from several threads are all stored."""
+        now = datetime.now().isoformat()
+
+        def insert(worker):
+            for i in range(50):
+                session_id = self.db.insert_session(f"Client-{worker}-{i}", "Server_A", now)
+                self.db.update_session(session_id, now, 5)
+
+        threads = [threading.Thread(target=insert, args=(w,)) for w in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        sessions = self.db.get_all_sessions()
+        self.assertEqual(len(sessions), 200)
+        self.assertTrue(all(row[6] == "COMPLETED" for row in sessions))
+
+class TestWriteBehind(unittest.TestCase):
+    """Test cases for write-behind batching."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "test.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _count(self, table):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_session_ids_and_queued_updates(self):
+        """Test that session rows get SQLite ids immediately and their updates are batched."""
+        db = DatabaseManager(self.path, write_behind=True, batch_size=1000, flush_interval_ms=60000)
+        now = datetime.now().isoformat()
+        ids = [db.insert_session(f"Client-{i}", "Server_A", now) for i in range(10)]
+        for session_id in ids:
+            db.update_session(session_id, now, 4)
+        self.assertEqual(ids, list(range(1, 11)))
+        self.assertEqual(self._count("sessions"), 10)
+
+        sessions = db.get_all_sessions()
+        self.assertEqual([row[0] for row in sessions], ids)
+        self.assertTrue(all(row[5] == 4 and row[6] == "COMPLETED" for row in sessions))
+        self.assertEqual(db.get_write_stats()["batches"], 1)
+        db.close()
+
+    def test_managers_sharing_a_database_get_distinct_ids(self):
+        """Test that two write-behind managers on one database never hand out the same session id."""
+        first = DatabaseManager(self.path, write_behind=True, flush_interval_ms=60000)
+        second = DatabaseManager(self.path, write_behind=True, flush_interval_ms=60000)
+        now = datetime.now().isoformat()
+        ids = []
+        for i in range(5):
+            ids.append(first.insert_session(f"First-{i}", "Server_A", now))
+            ids.append(second.insert_session(f"Second-{i}", "Server_B", now))
+        for db in (first, second):
+            for session_id in ids:
+                db.update_session(session_id, now, 5)
+            db.close()
+        self.assertEqual(len(set(ids)), 10)
+        self.assertEqual(self._count("sessions"), 10)
+
+    def test_batch_size_triggers_commit(self):
+        """Test that a full batch is committed without waiting for the interval."""
+        db = DatabaseManager(self.path, write_behind=True, batch_size=10, flush_interval_ms=60000)
+        for i in range(25):
+            db.insert_server_metrics("Server_A", i, i, i, 0, 0, 0, None)
+        deadline = time.monotonic() + 5
+        while db.get_write_stats()["written"] < 20 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(db.get_write_stats()["batches"], 2)
+        self.assertEqual(self._count("server_metrics"), 20)
+        db.close()
+
+    def test_flush_interval_triggers_commit(self):
+        """Test that a partial batch is committed once the interval elapses."""
+        db = DatabaseManager(self.path, write_behind=True, batch_size=1000, flush_interval_ms=50)
+        db.insert_performance_metrics("threading", 10, 9, 1, 12.5, 80.0, 0)
+        deadline = time.monotonic() + 5
+        while self._count("performance_metrics") == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self._count("performance_metrics"), 1)
+        db.close()
+
+    def test_close_flushes_pending_writes(self):
+        """Test that queued writes survive close() and a later manager continues the id sequence."""
+        db = DatabaseManager(self.path, write_behind=True, flush_interval_ms=60000)
+        for i in range(25):
+            db.insert_server_metrics("Server_A", i, i, i, 0, 0, 0, None)
+        db.insert_session("Client-1", "Server_A", datetime.now().isoformat())
+        db.close()
+        self.assertEqual(self._count("server_metrics"), 25)
+
+        reopened = DatabaseManager(self.path, write_behind=True)
+        self.assertEqual(reopened.insert_session("Client-2", "Server_A", datetime.now().isoformat()), 2)
+        reopened.close()
+        self.assertEqual(self._count("sessions"), 2)
+
+    def test_bad_row_does_not_drop_batch(self):
+        """Test that one failing row is dropped on its own instead of losing the batch."""
+        db = DatabaseManager(self.path, write_behind=True, flush_interval_ms=60000)
+        db.insert_server_metrics("Server_A", 1, 1, 1, 0, 0, 0, None)
+        db.insert_server_metrics(None, 2, 2, 2, 0, 0, 0, None)  # violates NOT NULL
+        db.insert_server_metrics("Server_A", 3, 3, 3, 0, 0, 0, None)
+        self.assertTrue(db.flush())
+        self.assertEqual(self._count("server_metrics"), 2)
+        self.assertEqual(db.get_write_stats()["failed_rows"], 1)
+        db.close()
+
+    def test_bad_session_raises(self):
+        """Test that a session row that cannot be inserted fails the call instead of vanishing."""
+        db = DatabaseManager(self.path, write_behind=True, flush_interval_ms=60000)
+        with self.assertRaises(sqlite3.IntegrityError):
+            db.insert_session(None, "Server_A", datetime.now().isoformat())
+        db.close()
+
+    def test_durability_modes(self):
+        """Test that each durability mode sets the matching PRAGMA synchronous level."""
+        for mode, level in (("off", 0), ("normal", 1), ("full", 2)):
+            db = DatabaseManager(self.path, write_behind=False, durability=mode)
+            self.assertEqual(db._get_connection().execute("PRAGMA synchronous").fetchone()[0], level)
+            db.close()
+        with self.assertRaises(ValueError):
+            DatabaseManager(self.path, durability="eventually")
+
+class TestSchemaRollups(unittest.TestCase):
+    """Test cases for schema migrations, indexes and session rollups."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmpdir.name, "test.db"), write_behind=False)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_migration_sets_version_and_indexes(self):
+        """Test that the schema is versioned and range queries use an index."""
+        conn = self.db._get_connection()
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM sessions WHERE server_name = ? AND start_time >= ?",
+            ("Server_A", "2025-07-01")
+        ).fetchall()
+        self.assertIn("idx_sessions_server_start", " ".join(str(row) for row in plan))
+        # Re-opening an up-to-date database is a no-op
+        DatabaseManager(self.db.db_path, write_behind=False).close()
+
+    def test_rollups_follow_session_updates(self):
+        """Test that final session statuses roll up into hourly, daily and monthly totals."""
+        when = datetime(2025, 7, 16, 12, 30)
+        stamp = when.isoformat()
+        for rating in (5, 3):
+            session_id = self.db.insert_session("Client", "Server_A", stamp)
+            self.db.update_session(session_id, stamp, rating)
+        self.db.insert_session("Lost", "Server_A", stamp, stamp, None, "LOST")
+        self.db.insert_session("Waiting", "Server_A", stamp)
+        self.db.insert_session("Other", "Server_B", stamp, stamp, 1, "COMPLETED")
+
+        for period in ("hour", "day", "month"):
+            rollup = self.db.get_server_rollup("Server_A", period, when)
+            self.assertEqual(rollup["clients_served"], 2)
+            self.assertEqual(rollup["lost_clients"], 1)
+            self.assertEqual(rollup["rating_count"], 2)
+            self.assertEqual(rollup["average_rating"], 4.0)
+        self.assertEqual(self.db.get_server_rollup("Server_A", "day", datetime(2025, 7, 17))["clients_served"], 0)
+
+        # Retention cleanup removes raw sessions but keeps the historical totals
+        self.db.cleanup_old_data(days=1)
+        self.assertEqual(self.db.get_all_sessions(), [])
+        self.assertEqual(self.db.get_server_rollup("Server_A", "month", when)["clients_served"], 2)
+
+    def test_recorded_sessions_feed_server_summary(self):
+        """Test that queued finished sessions reach the day, month and all-time figures ServerUI shows."""
+        db = DatabaseManager(self.db.db_path, write_behind=True, flush_interval_ms=60000)
+        now = datetime(2025, 7, 16, 12, 30)
+        earlier = datetime(2025, 6, 2, 9, 0)
+        db.record_session("Client-1", "Server_A", "COMPLETED", 5, end_time=now.isoformat())
+        db.record_session("Client-2", "Server_A", "COMPLETED", 2, end_time=now.isoformat())
+        db.record_session("Client-3", "Server_A", "LOST", end_time=now.isoformat())
+        db.record_session("Client-4", "Server_A", "COMPLETED", 5, end_time=earlier.isoformat())
+        db.record_session("Client-5", "Server_B", "LOST", end_time=earlier.isoformat())
+
+        self.assertEqual(db.get_server_summary("Server_A", now), {
+            "daily_clients": 3,
+            "monthly_clients": 3,
+            "avg_rating": 4.0,
+            "total_clients": 4,
+            "lost_clients": 1
+        })
+        self.assertEqual(db.get_server_rollup("Server_B", "all")["lost_clients"], 1)
+        self.assertEqual(db.get_server_names(), ["Server_A", "Server_B"])
+        self.assertEqual(db.get_server_summary("Server_C", now)["total_clients"], 0)
+        with self.assertRaises(ValueError):
+            db.get_server_rollup("Server_A", "week")
+        db.close()
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,60 @@
+import unittest
+import socket
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framing import (FrameDecoder, FrameError, FramedConnection, encode_frame,
+                     encode_frames, HEADER)
+
+class TestFrameCodec(unittest.TestCase):
+    """Test cases for the length-prefixed framing codec."""
+
+    def test_round_trip(self):
+        """Test that an encoded frame decodes back to its payload."""
+        decoder = FrameDecoder()
+        self.assertEqual(decoder.feed(encode_frame("hello")), [b"hello"])
+        self.assertEqual(decoder.pending_bytes, 0)
+
+    def test_coalesced_frames(self):
+        """Test that several frames in one read are all returned in order."""
+        decoder = FrameDecoder()
+        data = encode_frames(["chat line", "RATING:5", ""])
+        self.assertEqual(decoder.feed(data), [b"chat line", b"RATING:5", b""])
+
+    def test_split_frames(self):
+        """Test that a frame split across reads is reassembled."""
+        decoder = FrameDecoder()
+        data = encode_frames(["first message", "RATING:4"])
+        frames = []
+        for i in range(len(data)):
+            frames.extend(decoder.feed(data[i:i + 1]))
+        self.assertEqual(frames, [b"first message", b"RATING:4"])
+
+    def test_oversized_frame_rejected(self):
+        """Test that a declared length above the limit raises FrameError."""
+        decoder = FrameDecoder(max_frame_size=16)
+        with self.assertRaises(FrameError):
+            decoder.feed(HEADER.pack(17) + b"x" * 17)
+
+    def test_framed_connection(self):
+        """Test message exchange over a real socket pair."""
+        left, right = socket.socketpair()
+        try:
+            sender = FramedConnection(left)
+            receiver = FramedConnection(right)
+            sender.send_many(["one", "two"])
+            sender.send("three")
+            self.assertEqual(receiver.recv(), "one")
+            self.assertEqual(receiver.recv(), "two")
+            self.assertEqual(receiver.recv_batch(), ["three"])
+            left.close()
+            self.assertIsNone(receiver.recv())
+        finally:
+            left.close()
+            right.close()
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
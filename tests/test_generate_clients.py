@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+import csv
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_clients import ClientDataGenerator, CLIENT_FIELDS
+from columnar import ColumnarReader
+
+class TestClientDataGenerator(unittest.TestCase):
+    """Test cases for chunked, seedable client generation."""
+
+    def test_seed_reproduces_dataset(self):
+        """Test that the same seed gives the same clients and chat data."""
+        first = ClientDataGenerator(seed=11)
+        second = ClientDataGenerator(seed=11)
+        self.assertEqual(first.generate_client_data(200), second.generate_client_data(200))
+        client = first.generate_client_data(1)[0]
+        self.assertEqual(client, second.generate_client_data(1)[0])
+        self.assertEqual(first.generate_chat_simulation_data(client), second.generate_chat_simulation_data(client))
+        self.assertNotEqual(ClientDataGenerator(seed=12).generate_client_data(5), second.generate_client_data(5))
+
+    def test_chunks_are_bounded_and_valid(self):
+        """Test that chunks respect chunk_size, number clients consecutively and stay in range."""
+        chunks = list(ClientDataGenerator(seed=1).generate_client_chunks(250, chunk_size=100))
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 50])
+        rows = [dict(zip(CLIENT_FIELDS, row)) for chunk in chunks for row in chunk]
+        self.assertEqual([r['client_id'] for r in rows], list(range(1, 251)))
+        for row in rows:
+            self.assertEqual(row['client_name'], f"{row['first_name']}_{row['last_name']}_{row['client_id']:04d}")
+            self.assertTrue(60 <= row['session_duration'] <= 1800)
+            self.assertTrue(0 <= row['arrival_offset'] <= 86400)
+            self.assertTrue(1 <= row['retry_attempts'] <= 3)
+
+    def test_stream_to_csv(self):
+        """Test that streamed CSV matches the generated rows for the same seed and chunk size."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'clients.csv')
+            ClientDataGenerator(seed=4).stream_clients_to_csv(120, path, chunk_size=50)
+            with open(path, newline='') as f:
+                written = list(csv.DictReader(f))
+        expected = [dict(zip(CLIENT_FIELDS, row))
+                    for chunk in ClientDataGenerator(seed=4).generate_client_chunks(120, chunk_size=50)
+                    for row in chunk]
+        self.assertEqual(len(written), 120)
+        self.assertEqual(list(written[0].keys()), CLIENT_FIELDS)
+        self.assertEqual([r['email'] for r in written], [r['email'] for r in expected])
+
+    def test_columnar_matches_csv(self):
+        """Test that writing both formats in one pass gives the same clients in each."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = os.path.join(tmpdir, 'clients.csv')
+            columnar_path = os.path.join(tmpdir, 'clients.ccol')
+            ClientDataGenerator(seed=8).stream_clients(300, csv_path, columnar_path, chunk_size=64)
+            with open(csv_path, newline='') as f:
+                written = list(csv.DictReader(f))
+            with ColumnarReader(columnar_path) as reader:
+                self.assertEqual(len(reader), 300)
+                self.assertEqual(reader.names, CLIENT_FIELDS)
+                for i in (0, 150, 299):
+                    self.assertEqual({k: str(v) for k, v in reader.row(i).items()}, written[i])
+
+    def test_chat_timestamps_accumulate(self):
+        """Test that chat timestamps grow by one response time per message, not by a running sum."""
+        generator = ClientDataGenerator(seed=2)
+        client = dict(generator.generate_client_data(1)[0], message_count=50, response_pattern='slow')
+        timestamps = [entry['timestamp'] for entry in generator.generate_chat_simulation_data(client)]
+        self.assertEqual(len(timestamps), 51)
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertLessEqual(timestamps[-1], 49 * 120 + 30)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,105 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+import threading
+from queue import Queue, Empty
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_tailer import LogTailer
+
+class TestLogTailer(unittest.TestCase):
+    """Test cases for the inotify/polling log tailer."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "archive.jsonl")
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"n": -1}) + "\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _append(self, *entries, path=None):
+        with open(path or self.path, "a") as f:
+            for entry in entries:
+                f.write(entry if isinstance(entry, str) else json.dumps(entry) + "\n")
+
+    def test_starts_at_end_and_skips_bad_lines(self):
+        """Test that existing lines, partial lines and non-JSON lines are not delivered."""
+        tailer = LogTailer(self.path)
+        self._append({"n": 1}, "not json\n", '{"n": 2')
+        self.assertEqual(tailer.read_batch(), [{"n": 1}])
+        self._append("}\n")
+        self.assertEqual(tailer.read_batch(), [{"n": 2}])
+        tailer.close()
+
+    def test_follows_rotation(self):
+        """Test that lines written before and after a rotation are both delivered."""
+        tailer = LogTailer(self.path)
+        self._append({"n": 1})
+        os.replace(self.path, self.path + ".1")
+        self._append({"n": 2}, path=self.path + ".1")  # late write to the rotated file
+        self._append({"n": 3})
+        self.assertEqual(tailer.read_batch(), [{"n": 1}, {"n": 2}, {"n": 3}])
+        tailer.close()
+
+    def test_rotation_within_one_poll(self):
+        """Test that lines written between a poll's read and the rename, and an unterminated last line, survive."""
+        tailer = LogTailer(self.path)
+        self._append({"n": 1})
+        rotated = tailer._rotated
+
+        def rotate_mid_poll():
+            # Runs after the poll's first read of the old file, as a writer racing the rename would.
+            if not os.path.exists(self.path + ".1"):
+                self._append({"n": 2}, '{"n": 3}')
+                os.replace(self.path, self.path + ".1")
+                self._append({"n": 4})
+            return rotated()
+
+        tailer._rotated = rotate_mid_poll
+        self.assertEqual(tailer.read_batch(), [{"n": 1}, {"n": 2}, {"n": 3}, {"n": 4}])
+        self._append({"n": 5})
+        self.assertEqual(tailer.read_batch(), [{"n": 5}])
+        tailer.close()
+
+    def _check_iteration(self, use_inotify):
+        tailer = LogTailer(self.path, use_inotify=use_inotify)
+        batches = Queue()
+
+        def consume():
+            for batch in tailer:
+                batches.put(batch)
+
+        thread = threading.Thread(target=consume, daemon=True)
+        thread.start()
+        self._append({"n": 1}, {"n": 2})
+        received = []
+        try:
+            while len(received) < 2:
+                received.extend(batches.get(timeout=5))
+        except Empty:
+            pass
+        mode = tailer.mode
+        tailer.stop()
+        thread.join(timeout=5)
+        tailer.close()
+        self.assertEqual(received, [{"n": 1}, {"n": 2}])
+        return mode
+
+    def test_iteration_with_inotify(self):
+        """Test that appended entries are delivered in batches when woken by inotify."""
+        mode = self._check_iteration(use_inotify=True)
+        if sys.platform.startswith("linux"):
+            self.assertEqual(mode, "inotify")
+
+    def test_iteration_with_polling(self):
+        """Test the polling fallback delivers the same entries."""
+        self._check_iteration(use_inotify=False)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
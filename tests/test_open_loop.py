@@ -0,0 +1,107 @@
+import unittest
+import asyncio
+import os
+import socket
+import sys
+import random
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framing import FrameDecoder, encode_frame
+from simulation_open_loop import OpenLoopSimulation, load_profiles, poisson_arrivals
+
+PROFILES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'performance_profiles.csv')
+
+class TestOpenLoopSchedule(unittest.TestCase):
+    """Test cases for the open-loop arrival schedule."""
+
+    def test_load_profiles(self):
+        """Test that every profile is loaded with numeric columns."""
+        profiles = load_profiles(PROFILES_CSV)
+        self.assertIn('Spike_Test', profiles)
+        spike = profiles['Spike_Test']
+        self.assertEqual(spike['client_count'], 300)
+        self.assertEqual(spike['arrival_rate'], 50.0)
+        self.assertEqual(spike['session_duration'], 120.0)
+
+    def test_poisson_arrivals_match_rate(self):
+        """Test that arrivals are increasing, bounded and average the requested rate."""
+        arrivals = poisson_arrivals(20.0, 100000, 500.0, random.Random(7))
+        self.assertEqual(arrivals, sorted(arrivals))
+        self.assertLess(arrivals[-1], 500.0)
+        self.assertAlmostEqual(len(arrivals) / 500.0, 20.0, delta=0.5)
+
+        gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+        mean_gap = sum(gaps) / len(gaps)
+        variance = sum((g - mean_gap) ** 2 for g in gaps) / len(gaps)
+        # Exponential inter-arrival times: standard deviation equals the mean.
+        self.assertAlmostEqual(variance ** 0.5 / mean_gap, 1.0, delta=0.05)
+
+    def test_poisson_arrivals_limits(self):
+        """Test that the client limit and horizon both cap the schedule, and seeds reproduce it."""
+        self.assertEqual(len(poisson_arrivals(100.0, 10, 60.0, random.Random(1))), 10)
+        self.assertEqual(poisson_arrivals(5.0, 50, 2.0, random.Random(3)),
+                         poisson_arrivals(5.0, 50, 2.0, random.Random(3)))
+        self.assertTrue(all(t < 2.0 for t in poisson_arrivals(5.0, 50, 2.0, random.Random(3))))
+
+class TestOpenLoopRun(unittest.TestCase):
+    """Test cases for driving clients against a stand-in server."""
+
+    async def _serve(self, reader, writer):
+        """Echo server that answers Client-3 with a frame header the decoder rejects."""
+        decoder = FrameDecoder()
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            for frame in decoder.feed(data):
+                if b"from Client-3" in frame:
+                    writer.write(b"\xff\xff\xff\xff")
+                elif frame.startswith(b"RATING:"):
+                    writer.close()
+                    return
+                else:
+                    writer.write(encode_frame(b"ECHO"))
+            await writer.drain()
+        writer.close()
+
+    def test_bad_frame_loses_one_client_and_rate_is_measured(self):
+        """Test that one client's FrameError counts it as lost and the arrival rate comes from dispatches."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        sim = OpenLoopSimulation('Spike_Test', num_clients=8, num_servers=1, messages_per_client=2,
+                                 message_interval=0.01, seed=5, profiles_path=PROFILES_CSV, base_port=port)
+        arrivals = [i * 0.02 for i in range(1, 9)]
+
+        async def run():
+            server = await asyncio.start_server(self._serve, "127.0.0.1", port)
+            async with server:
+                await sim._generate_load(arrivals)
+
+        with patch('simulation_open_loop.log_session'):  # keep sessions out of the archive
+            asyncio.run(run())
+        self.assertEqual((sim.served, sim.lost), (7, 1))
+        self.assertEqual(len(sim.dispatch_times), 8)
+        self.assertEqual(sim.dispatch_lag.summary()['count'], 8)
+        # 8 dispatches over about 0.16 s, never faster than the schedule allows.
+        self.assertLessEqual(sim._achieved_arrival_rate(), 8 / 0.16 + 0.01)
+        self.assertGreater(sim._achieved_arrival_rate(), 8 / 0.16 / 2)
+
+    def test_servers_follow_base_port_and_count(self):
+        """Test that the stale-server cleanup and the started servers cover every port clients use."""
+        sim = OpenLoopSimulation('Spike_Test', num_clients=4, num_servers=4, seed=5, profiles_path=PROFILES_CSV,
+                                 base_port=9100)
+        with patch('simulation_open_loop.os.system') as system, \
+                patch('simulation_open_loop.Process') as process, \
+                patch('simulation_open_loop.time.sleep'), \
+                patch.object(sim, '_generate_load', lambda arrivals: asyncio.sleep(0)), \
+                patch.object(sim, '_write_results_to_file'):
+            sim.run_simulation()
+        self.assertIn("9100/tcp 9101/tcp 9102/tcp 9103/tcp ", system.call_args[0][0])
+        self.assertEqual([call.kwargs['args'][1] for call in process.call_args_list], [9100, 9101, 9102, 9103])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,67 @@
+import unittest
+import os
+import subprocess
+import sys
+import textwrap
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_accounting import ProcessTreeMonitor
+
+CHILD_SCRIPT = textwrap.dedent("""
+    import subprocess, sys, threading, time
+
+    def spin(seconds):
+        end = time.time() + seconds
+        while time.time() < end:
+            pass
+
+    child = subprocess.Popen([sys.executable, "-c", "import time\\nend = time.time() + 0.4\\nwhile time.time() < end: pass"])
+    threads = [threading.Thread(target=spin, args=(0.3,)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    child.wait()
+    time.sleep(0.3)
+""")
+
+class TestProcessTreeMonitor(unittest.TestCase):
+    """Test cases for process-tree resource accounting."""
+
+    def test_accounts_for_children_and_threads(self):
+        """Test that a child that exits before the parent is still in the totals."""
+        process = subprocess.Popen([sys.executable, "-c", CHILD_SCRIPT])
+        monitor = ProcessTreeMonitor(process.pid, interval=0.05)
+        monitor.start()
+        process.wait(timeout=30)
+        report = monitor.stop()
+
+        self.assertEqual(report['root_pid'], process.pid)
+        self.assertGreater(report['samples'], 3)
+        self.assertGreaterEqual(report['totals']['processes'], 2)
+        self.assertGreater(report['totals']['cpu_time'], 0.2)
+        self.assertGreater(report['totals']['ctx_voluntary'] + report['totals']['ctx_involuntary'], 0)
+        self.assertGreaterEqual(report['peaks']['processes'], 2)
+        self.assertGreaterEqual(report['peaks']['num_threads'], 3)
+        self.assertGreater(report['peaks']['rss'], 0)
+        self.assertGreater(report['peaks']['num_fds'], 0)
+
+        by_pid = {p['pid']: p for p in report['processes']}
+        self.assertTrue(by_pid[process.pid]['exited'])
+        children = [p for p in report['processes'] if p['ppid'] == process.pid]
+        self.assertEqual(len(children), 1)
+        self.assertGreater(children[0]['cpu_user'] + children[0]['cpu_system'], 0.1)
+        self.assertTrue(any(t['cpu_user'] > 0 for t in by_pid[process.pid]['threads']))
+
+    def test_missing_process(self):
+        """Test that monitoring a PID that is already gone yields an empty report."""
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        report = ProcessTreeMonitor(process.pid).stop()
+        self.assertEqual(report['totals']['processes'], 0)
+        self.assertEqual(report['processes'], [])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
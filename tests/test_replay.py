@@ -0,0 +1,124 @@
+import unittest
+import os
+import sys
+import csv
+import random
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation_replay import iter_clients_by_arrival, ChatScriptIndex, ReplaySimulation, TRACE_FIELDS
+from generate_clients import ClientDataGenerator, CHAT_SCHEMA, CLIENT_SCHEMA
+from columnar import ColumnarWriter, ColumnarReader
+
+CLIENT_FIELDS = list(TRACE_FIELDS) + ['email']
+
+class TestTraceReplayInput(unittest.TestCase):
+    """Test cases for streaming the replay traces."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write_csv(self, name, fields, rows):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def test_external_sort_by_arrival(self):
+        """Test that clients come back in arrival order across several spilled runs."""
+        rng = random.Random(5)
+        rows = [{
+            'arrival_offset': rng.randint(0, 86400), 'client_id': i + 1, 'client_name': f'Client_{i + 1}',
+            'preferred_server': 'Any', 'session_duration': 600, 'message_count': 5,
+            'response_pattern': 'quick', 'rating_tendency': 'random', 'expected_wait_tolerance': 60,
+            'retry_attempts': 1, 'email': f'c{i}@test.net, inc'
+        } for i in range(250)]
+        path = self._write_csv('clients.csv', CLIENT_FIELDS, rows)
+
+        traces = list(iter_clients_by_arrival(path, chunk_rows=40))
+        self.assertEqual(len(traces), 250)
+        self.assertEqual([t[0] for t in traces], sorted(float(r['arrival_offset']) for r in rows))
+        self.assertEqual(sorted(t[1] for t in traces), list(range(1, 251)))
+        self.assertIsInstance(traces[0][5], int)
+
+        self.assertEqual(len(list(iter_clients_by_arrival(path, chunk_rows=40, limit=30))), 30)
+
+    def test_columnar_clients_replay_in_same_order(self):
+        """Test that a columnar clients file yields the same arrival-ordered traces as its CSV."""
+        csv_path = os.path.join(self.tmpdir.name, 'clients.csv')
+        columnar_path = os.path.join(self.tmpdir.name, 'clients.ccol')
+        ClientDataGenerator(seed=6).stream_clients(400, csv_path, columnar_path)
+        self.assertEqual(list(iter_clients_by_arrival(csv_path, chunk_rows=90, limit=350)),
+                         list(iter_clients_by_arrival(columnar_path, chunk_rows=90, limit=350)))
+
+    def test_presorted_columnar_clients_stream_in_stored_order(self):
+        """Test that a columnar file already in arrival order is yielded as stored, ties included."""
+        unsorted_path = os.path.join(self.tmpdir.name, 'unsorted.ccol')
+        sorted_path = os.path.join(self.tmpdir.name, 'sorted.ccol')
+        ClientDataGenerator(seed=7).stream_clients(200, columnar_filename=unsorted_path)
+        arrival = [name for name, _ in CLIENT_SCHEMA].index('arrival_offset')
+        with ColumnarReader(unsorted_path) as reader:
+            rows = [tuple(row[name] for name, _ in CLIENT_SCHEMA) for row in reader]
+        # Hourly arrivals, ties stored by descending id, which a re-sort of the whole row would reverse
+        rows = [values[:arrival] + (values[arrival] // 3600 * 3600,) + values[arrival + 1:] for values in rows]
+        rows.sort(key=lambda values: (values[arrival], -values[0]))
+        self.assertLess(len({values[arrival] for values in rows}), len(rows))
+        with ColumnarWriter(sorted_path, CLIENT_SCHEMA) as writer:
+            writer.write_rows(rows)
+
+        traces = list(iter_clients_by_arrival(sorted_path, chunk_rows=30))
+        self.assertEqual([t[1] for t in traces], [values[0] for values in rows])
+
+    def test_chat_index_reads_one_client(self):
+        """Test that a client's script is read by offset, including rows that are not contiguous."""
+        fields = ['timestamp', 'sender', 'message', 'message_type', 'client_id', 'client_name']
+        rows = [
+            {'timestamp': 0, 'sender': 'client', 'message': 'Hi, there', 'message_type': 'initial', 'client_id': 1},
+            {'timestamp': 5, 'sender': 'server', 'message': 'Hello', 'message_type': 'response', 'client_id': 1},
+            {'timestamp': 0, 'sender': 'client', 'message': 'Help', 'message_type': 'initial', 'client_id': 2},
+            {'timestamp': 9, 'sender': 'client', 'message': 'Rating: 4', 'message_type': 'rating', 'client_id': 1},
+        ]
+        path = self._write_csv('chat.csv', fields, [dict(r, client_name=f"C{r['client_id']}") for r in rows])
+
+        index = ChatScriptIndex(path)
+        self.assertIn(1, index)
+        self.assertNotIn(3, index)
+        script = index.script(1)
+        self.assertEqual([r['message'] for r in script], ['Hi, there', 'Hello', 'Rating: 4'])
+        self.assertEqual(index.script(2)[0]['message_type'], 'initial')
+        self.assertEqual(index.script(3), [])
+
+    def test_chat_index_closes_columnar_file(self):
+        """Test that a columnar chat index releases its mapping when used as a context manager."""
+        path = os.path.join(self.tmpdir.name, 'chat.ccol')
+        rows = [(0, 'client', 'Hi', 'initial', 1, 'C1'), (4, 'server', 'Hello', 'response', 1, 'C1'),
+                (0, 'client', 'Help', 'initial', 2, 'C2')]
+        with ColumnarWriter(path, CHAT_SCHEMA) as writer:
+            writer.write_rows(rows)
+
+        with ChatScriptIndex(path) as index:
+            self.assertEqual([r['message'] for r in index.script(1)], ['Hi', 'Hello'])
+            reader = index.reader
+        self.assertIsNone(index.reader)
+        self.assertTrue(reader._file.closed)
+        self.assertNotIn(1, index)
+
+class TestReplayRetries(unittest.TestCase):
+    """Test cases for the delay between a client's attempts."""
+
+    def test_retry_backoff_is_jittered_and_capped(self):
+        """Test that retry delays stay under a doubling bound, vary, and never exceed the cap."""
+        simulation = ReplaySimulation(chat_path='missing.csv', seed=3, retry_backoff=0.5, retry_backoff_cap=4.0)
+        for retry, bound in ((1, 0.5), (2, 1.0), (3, 2.0), (4, 4.0), (10, 4.0)):
+            delays = [simulation._retry_delay(retry) for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= bound for delay in delays))
+            self.assertGreater(len(set(delays)), 1)
+            self.assertGreater(max(delays), bound / 2)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,83 @@
+import unittest
+import os
+import sys
+import queue
+from multiprocessing import get_context
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_ring import ResultRing, ResultBatcher, STATUS_SERVED, STATUS_LOST
+
+def write_result(results, client_id):
+    if client_id % 4 == 3:
+        results.write(client_id, STATUS_LOST, client_id, duration=0.5)
+    else:
+        results.write(client_id, STATUS_SERVED, client_id, 8000 + client_id % 3, client_id + 1,
+                      1.5, client_id % 5 + 1, [float(n) for n in range(1, client_id + 2)])
+
+class TestResultRing(unittest.TestCase):
+    """Test cases for the shared-memory result records."""
+
+    def test_children_write_their_own_slots(self):
+        """Test that forked writers' records reach the parent and unwritten slots are skipped."""
+        ctx = get_context("fork")
+        with ResultRing(10) as results:
+            writers = [ctx.Process(target=write_result, args=(results, i)) for i in range(8)]
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+                self.assertEqual(writer.exitcode, 0)
+
+            records = results.records()
+            self.assertEqual([r['client_id'] for r in records], list(range(8)))
+            self.assertIsNone(results.read(9))
+
+            served = records[5]
+            self.assertEqual(served['status'], 'served')
+            self.assertEqual(served['server_port'], 8002)
+            self.assertEqual(served['messages_sent'], 6)
+            self.assertEqual(served['rating'], 1)
+            self.assertEqual(served['rtt_count'], 6)
+            self.assertEqual(served['rtt_sum_ms'], 21.0)
+            self.assertEqual(served['rtt_max_ms'], 6.0)
+
+            lost = records[3]
+            self.assertEqual(lost['status'], 'lost')
+            self.assertIsNone(lost['rating'])
+            self.assertEqual(lost['rtt_count'], 0)
+
+    def test_attach_by_name(self):
+        """Test that a second mapping of the same block sees the owner's writes."""
+        with ResultRing(2) as results:
+            other = ResultRing(2, name=results.name)
+            other.write(1, STATUS_SERVED, 42, messages_sent=3)
+            other.close()
+            self.assertEqual(results.read(1)['client_id'], 42)
+
+    def test_batcher_streams_records_into_ring(self):
+        """Test that batched records are sent every batch_size writes and on flush."""
+        batches = queue.Queue()
+        batcher = ResultBatcher(batches, batch_size=3)
+        for client_id in range(7):
+            batcher.write(client_id, STATUS_SERVED, client_id, round_trip_times_ms=[1.0, 3.0])
+        self.assertEqual(batches.qsize(), 2)
+        batcher.flush()
+        batcher.flush()
+        self.assertEqual(batches.qsize(), 3)
+
+        with ResultRing(7) as results:
+            sizes = []
+            while not batches.empty():
+                batch = batches.get()
+                sizes.append(len(batch))
+                for slot, record in batch:
+                    results.put(slot, record)
+            self.assertEqual(sizes, [3, 3, 1])
+            records = results.records()
+            self.assertEqual([r['client_id'] for r in records], list(range(7)))
+            self.assertEqual(records[6]['rtt_sum_ms'], 4.0)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
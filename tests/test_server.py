@@ -0,0 +1,173 @@
+import unittest
+import os
+import sys
+import socket
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from client import pipelined_chat
+from constants import RATE_LIMITED_REPLY
+from framing import FramedConnection
+from database import DatabaseManager
+from server import Server, ENGINE_THREADING, ENGINE_ASYNCIO
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def connect(port, timeout=10):
+    """Connect to a server that may still be starting up."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+            return FramedConnection(sock)
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+def chat_session(port, messages, rating=5):
+    """Send each message and collect its reply, then rate; returns the replies."""
+    conn = connect(port)
+    try:
+        replies = []
+        for message in messages:
+            conn.send(message)
+            replies.append(conn.recv())
+        conn.send(f"RATING:{rating}")
+        conn.recv()  # None once the server closes the rated session
+        return replies
+    finally:
+        conn.close()
+
+def wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+class ServerTestCase(unittest.TestCase):
+    """Runs each test in a scratch directory with its own database, so nothing lands in the tree."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        self.db = DatabaseManager(os.path.join(self.tmpdir.name, "test.db"))
+        self.previous_database, database._database = database._database, self.db
+
+    def tearDown(self):
+        database._database = self.previous_database
+        self.db.close()
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def start_server(self, **kwargs):
+        server = Server(name="TestServer", port=free_port(), **kwargs)
+        thread = threading.Thread(target=server.start, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 10)
+        self.addCleanup(server.shutdown)
+        return server
+
+class TestPreforkServer(ServerTestCase):
+    """Test cases for pre-fork mode's combined metrics."""
+
+    def test_metrics_sum_workers_with_single_process_keys(self):
+        """Test that the parent reports every worker's sessions under the same keys as one process."""
+        server = self.start_server(engine=ENGINE_THREADING, processes=2, max_concurrent_clients=2, pool_size=2)
+        for i in range(6):
+            self.assertEqual(chat_session(server.port, [f"hello {i}"]), [f"ECHO: hello {i}"])
+
+        self.assertTrue(wait_for(lambda: server.get_metrics()["total_clients_today"] == 6
+                                 and server.get_metrics()["archive"]["enqueued"] == 6))
+        metrics = server.get_metrics()
+        self.assertEqual(metrics["processes"], 2)
+        self.assertEqual(metrics["average_rating"], 5)
+        self.assertEqual(metrics["pool_size"], 4)
+        self.assertEqual(len(metrics["worker_busy_time"]), 4)
+        self.assertGreater(sum(metrics["worker_busy_time"]), 0)
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertEqual(metrics["busy_workers"], 0)
+        self.assertEqual(metrics["pool_saturation"], 0)
+
+        single = Server(name="Single", port=free_port(), engine=ENGINE_THREADING)
+        self.assertEqual(set(metrics) - {"processes"}, set(single.get_metrics()))
+        self.assertEqual(set(metrics["archive"]), set(single.get_metrics()["archive"]))
+
+class TestSessionRecording(ServerTestCase):
+    """Test cases for writing finished sessions to the database."""
+
+    def test_asyncio_engine_records_off_the_event_loop(self):
+        """Test that rated sessions reach the rollups and the asyncio engine commits them in its executor."""
+        threads = []
+        record_session = self.db.record_session
+
+        def record(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return record_session(*args, **kwargs)
+
+        self.db.record_session = record
+        server = self.start_server(engine=ENGINE_ASYNCIO)
+        for i in range(3):
+            chat_session(server.port, [f"hello {i}"], rating=4)
+
+        self.assertTrue(wait_for(lambda: self.db.get_server_rollup("TestServer", "all")["clients_served"] == 3))
+        self.assertEqual(self.db.get_server_summary("TestServer")["avg_rating"], 4.0)
+        self.assertEqual(len(threads), 3)
+        self.assertTrue(all(thread.name.startswith("asyncio") for thread in threads))
+
+    def test_day_and_month_counters_reset(self):
+        """Test that resetting the daily count leaves the monthly count running, and vice versa."""
+        server = self.start_server(engine=ENGINE_THREADING)
+        chat_session(server.port, ["hello"])
+        self.assertTrue(wait_for(lambda: server.get_metrics()["total_clients_today"] == 1))
+        server.reset_counters("total_clients_today")
+        chat_session(server.port, ["hello again"])
+        self.assertTrue(wait_for(lambda: server.get_metrics()["total_clients_month"] == 2))
+        self.assertEqual(server.get_metrics()["total_clients_today"], 1)
+        server.reset_counters("total_clients_month")
+        self.assertEqual(server.get_metrics()["total_clients_month"], 0)
+
+class TestMessageRateLimit(ServerTestCase):
+    """Test cases for per-connection message shedding."""
+
+    def test_disabled_by_default(self):
+        """Test that a server without a configured rate never sheds."""
+        server = self.start_server(engine=ENGINE_THREADING)
+        self.assertIsNone(server.rate_limiter)
+        conn = connect(server.port)
+        try:
+            round_trip_times, shed = pipelined_chat(conn, (f"hello {i}" for i in range(50)), 50)
+        finally:
+            conn.close()
+        self.assertEqual((len(round_trip_times), shed), (50, 0))
+
+    def test_messages_over_the_burst_are_shed(self):
+        """Test that both engines shed messages past the burst and pipelined_chat counts them as shed."""
+        for engine in (ENGINE_THREADING, ENGINE_ASYNCIO):
+            server = self.start_server(engine=engine, message_rate_limit=1, message_burst=3)
+            conn = connect(server.port)
+            try:
+                round_trip_times, shed = pipelined_chat(conn, (f"hello {i}" for i in range(10)), 10)
+                conn.send("flood")
+                self.assertEqual(conn.recv(), RATE_LIMITED_REPLY)
+                conn.send("RATING:4")  # ratings are never shed
+                self.assertIsNone(conn.recv())
+            finally:
+                conn.close()
+            self.assertEqual((len(round_trip_times), shed), (3, 7))
+            self.assertTrue(wait_for(lambda: server.get_metrics()["shed_messages"] == 8))
+            self.assertEqual(server.get_metrics()["average_rating"], 4)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
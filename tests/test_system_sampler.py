@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from system_sampler import SystemSampler, _whole_disks
+
+class TestSystemSampler(unittest.TestCase):
+    """Test cases for the non-blocking system sampler."""
+
+    def test_samples_are_non_blocking_and_bounded(self):
+        """Test that sampling never sleeps and history is a fixed-size ring."""
+        sampler = SystemSampler(history_size=5)
+        start_time = time.monotonic()
+        for _ in range(20):
+            sample = sampler.sample()
+        self.assertLess(time.monotonic() - start_time, 1.0)
+        self.assertEqual(len(sampler.get_history()), 5)
+        self.assertIs(sampler.latest(), sample)
+
+        self.assertGreaterEqual(sample['cpu_percent'], 0.0)
+        self.assertLessEqual(sample['cpu_percent'], 100.0)
+        self.assertGreater(sample['memory_total'], 0)
+        self.assertGreaterEqual(sample['network_recv_rate'], 0.0)
+        self.assertGreaterEqual(sample['disk_write_rate'], 0.0)
+
+    def test_background_sampling(self):
+        """Test that start()/stop() sample at the configured cadence."""
+        sampler = SystemSampler(interval=0.05, history_size=100)
+        sampler.start()
+        time.sleep(0.3)
+        sampler.stop()
+        self.assertGreaterEqual(len(sampler.get_history()), 3)
+
+    def test_stacked_and_virtual_disks_excluded(self):
+        """Test that dm, loop and ram devices are not counted on top of their backing disks."""
+        with tempfile.TemporaryDirectory() as sys_block:
+            for name in ("sda", "nvme0n1", "dm-0", "md0", "loop0", "ram0"):
+                os.mkdir(os.path.join(sys_block, name))
+            self.assertEqual(_whole_disks(sys_block), {"sda", "nvme0n1"})
+
+            # Only devices with a backing device link are physical when the links exist.
+            for name in ("sda", "nvme0n1"):
+                os.mkdir(os.path.join(sys_block, name, "device"))
+            os.mkdir(os.path.join(sys_block, "sdb"))
+            self.assertEqual(_whole_disks(sys_block), {"sda", "nvme0n1"})
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
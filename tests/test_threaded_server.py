@@ -0,0 +1,118 @@
+import unittest
+import errno
+import os
+import sys
+import socket
+import struct
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framing import FramedConnection, encode_frame
+from threaded_server import ThreadedServer, MODE_THREAD, MODE_REACTOR
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+class ObservedServer(ThreadedServer):
+    """Counts closed connections, and fails its first accept() calls with the given errnos."""
+
+    def __init__(self, *args, errnos=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.errnos = list(errnos)
+        self.closed_connections = 0
+
+    def _accept(self):
+        if self.errnos:
+            code = self.errnos.pop(0)
+            raise OSError(code, os.strerror(code))
+        return super()._accept()
+
+    def _client_closed(self, start, served=False, lost=False):
+        super()._client_closed(start, served, lost)
+        self.closed_connections += 1
+
+class TestThreadedServerModes(unittest.TestCase):
+    """Test cases comparing the thread-per-client and reactor modes."""
+
+    def start(self, mode, **kwargs):
+        server = ObservedServer("TestServer", free_port(), 10, mode=mode, **kwargs)
+        thread = threading.Thread(target=server.start_server, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(server.stop_server)
+        self.assertTrue(wait_for(lambda: server.running and hasattr(server, "server_socket")))
+        return server
+
+    def connect(self, server):
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                return socket.create_connection(("127.0.0.1", server.port), timeout=5)
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.02)
+
+    def run_clients(self, server):
+        """Two concurrent clients, one sending its frame in two parts and one hanging up early."""
+        first, second = self.connect(server), self.connect(server)
+        self.assertTrue(wait_for(lambda: server.active_clients == 2))
+        for sock in (first, second):
+            with sock:
+                conn = FramedConnection(sock)
+                conn.send("hello")
+                self.assertEqual(conn.recv(), "Hello from TestServer")
+
+        with self.connect(server) as sock:
+            frame = encode_frame("split message")
+            sock.sendall(frame[:3])
+            time.sleep(0.1)
+            sock.sendall(frame[3:])
+            self.assertEqual(FramedConnection(sock).recv(), "Hello from TestServer")
+
+        with self.connect(server) as sock:
+            sock.sendall(encode_frame("never finished")[:5])
+
+        with self.connect(server) as sock:
+            # Reset instead of a clean close: the server counts this client as lost.
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            sock.sendall(encode_frame("hello")[:5])
+        self.assertTrue(wait_for(lambda: server.closed_connections == 5))
+
+        return {
+            "clients_served": server.clients_served,
+            "lost_clients": server.lost_clients,
+            "max_concurrent_clients": server.stats["max_concurrent_clients"]
+        }
+
+    def test_modes_account_for_clients_alike(self):
+        """Test that both modes count served, lost and concurrent clients the same way."""
+        results = {mode: self.run_clients(self.start(mode)) for mode in (MODE_THREAD, MODE_REACTOR)}
+        self.assertEqual(results[MODE_THREAD], {"clients_served": 3, "lost_clients": 1, "max_concurrent_clients": 2})
+        self.assertEqual(results[MODE_REACTOR], results[MODE_THREAD])
+
+    def test_accept_errors_are_counted_and_survived(self):
+        """Test that failed accepts are counted and the server keeps accepting in both modes."""
+        for mode in (MODE_THREAD, MODE_REACTOR):
+            server = self.start(mode, errnos=[errno.ECONNABORTED, errno.EMFILE])
+            with self.connect(server) as sock:
+                conn = FramedConnection(sock)
+                conn.send("hello")
+                self.assertEqual(conn.recv(), "Hello from TestServer")
+            self.assertEqual(server.get_stats()["accept_errors"], 2)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
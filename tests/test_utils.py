@@ -0,0 +1,167 @@
+import unittest
+import os
+import sys
+import random
+import threading
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import (LatencyHistogram, ShardedCounter, EventCounters, TokenBucketLimiter,
+                   SlidingWindowLimiter)
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test cases for the log-bucketed latency histogram."""
+
+    def test_percentiles_within_precision(self):
+        """Test that percentiles stay within the histogram's relative error."""
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(3, 1.2) for _ in range(20000))
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        for percent in (50, 90, 99, 99.9):
+            expected = values[int(len(values) * percent / 100) - 1]
+            self.assertAlmostEqual(histogram.percentile(percent), expected, delta=expected * 0.02)
+        self.assertEqual(histogram.percentile(100), values[-1])
+        self.assertAlmostEqual(histogram.mean(), sum(values) / len(values))
+
+    def test_small_values_are_exact(self):
+        """Test that sub-precision values (in microseconds) keep their own buckets."""
+        histogram = LatencyHistogram()
+        for value in (0.001, 0.002, 0.003, 0.004):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 0.002)
+        self.assertEqual(histogram.summary()["max"], 0.004)
+
+    def test_merge_and_round_trip(self):
+        """Test that merged and deserialized histograms match one recording everything."""
+        combined, parts = LatencyHistogram(), [LatencyHistogram() for _ in range(4)]
+
+        def record(part, seed):
+            rng = random.Random(seed)
+            for _ in range(1000):
+                value = rng.expovariate(1 / 50)
+                part.record(value)
+                with lock:
+                    combined.record(value)
+
+        lock = threading.Lock()
+        threads = [threading.Thread(target=record, args=(part, i)) for i, part in enumerate(parts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        merged = LatencyHistogram()
+        for part in parts:
+            merged.merge(LatencyHistogram.from_dict(part.to_dict()))
+        self.assertEqual(merged.count, 4000)
+        for percent in (50, 99, 99.9):
+            self.assertEqual(merged.percentile(percent), combined.percentile(percent))
+
+        with self.assertRaises(ValueError):
+            merged.merge(LatencyHistogram(precision_bits=5))
+
+    def test_empty_and_reset(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(99), 0.0)
+        histogram.record(12.5)
+        histogram.reset()
+        self.assertEqual(histogram.summary()["count"], 0)
+
+class TestShardedCounters(unittest.TestCase):
+    """Test cases for per-thread sharded counters."""
+
+    def _run_threads(self, target, count=8):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_increments(self):
+        """Test that no increments are lost and exited threads' shards are folded."""
+        counter = ShardedCounter(5)
+
+        def work():
+            for _ in range(1000):
+                counter.increment()
+            counter.decrement(10)
+
+        self._run_threads(work)
+        self.assertEqual(counter.get_value(), 5 + 8 * 990)
+        self.assertEqual(counter._rows, [])  # every worker has exited
+        counter.reset()
+        self.assertEqual(counter.get_value(), 0)
+
+    def test_event_counters(self):
+        """Test that one record() call updates several counters and views stay in sync."""
+        events = EventCounters('connections', 'messages', 'requests')
+
+        def work():
+            for _ in range(500):
+                events.record(messages=1, requests=1)
+            events['connections'].increment()
+
+        self._run_threads(work)
+        self.assertEqual(events.snapshot(), {'connections': 8, 'messages': 4000, 'requests': 4000})
+        events['messages'].reset()
+        self.assertEqual(events.snapshot(), {'connections': 8, 'messages': 0, 'requests': 4000})
+
+class TestRateLimiters(unittest.TestCase):
+    """Test cases for the O(1) token-bucket and sliding-window limiters."""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = patch("utils.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_bucket_burst_and_refill(self):
+        """Test that a burst is allowed up to capacity and then refills at the rate."""
+        limiter = TokenBucketLimiter(rate=10, capacity=5)
+        self.assertEqual([limiter.allow_request("a") for _ in range(6)], [True] * 5 + [False])
+        self.assertTrue(limiter.allow_request("b"))
+        self.now += 0.25  # 2.5 tokens
+        self.assertEqual([limiter.allow_request("a") for _ in range(3)], [True, True, False])
+
+    def test_sliding_window_weights_previous_window(self):
+        """Test that the previous window's count decays as the window slides."""
+        limiter = SlidingWindowLimiter(max_requests=4, time_window=10)
+        for _ in range(4):
+            self.assertTrue(limiter.allow_request("a"))
+        self.assertFalse(limiter.allow_request("a"))
+        self.now += 12.5  # previous window still overlaps by 75%: 4 * 0.75 = 3
+        self.assertTrue(limiter.allow_request("a"))
+        self.assertFalse(limiter.allow_request("a"))
+        self.now += 20  # two windows later nothing carries over
+        self.assertTrue(limiter.allow_request("a"))
+
+    def test_idle_and_excess_clients_evicted(self):
+        """Test that per-client state stays bounded by max_clients and the idle TTL."""
+        limiter = TokenBucketLimiter(rate=1, stripes=1, max_clients=100, idle_ttl=60)
+        for client in range(500):
+            limiter.allow_request(client)
+        self.assertEqual(limiter.tracked_clients(), 100)
+
+        self.now += 120
+        for client in range(1000, 1050):
+            limiter.allow_request(client)
+        self.assertEqual(limiter.tracked_clients(), 50)
+
+    def test_idle_clients_evicted_without_new_clients(self):
+        """Test that lookups of already-tracked clients also evict idle ones."""
+        for limiter in (TokenBucketLimiter(rate=1, stripes=1, idle_ttl=60),
+                        SlidingWindowLimiter(max_requests=5, time_window=10, stripes=1, idle_ttl=60)):
+            for client in range(10):
+                limiter.allow_request(client)
+            self.now += 120
+            for _ in range(5):
+                limiter.allow_request(0)
+            self.assertEqual(limiter.tracked_clients(), 1)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
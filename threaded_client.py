@@ -3,6 +3,8 @@
 import socket
 import time
 
+from framing import FramedConnection
+
 class ThreadedClient:
     def __init__(self, client_id, server_port):
         self.client_id = client_id
@@ -12,6 +14,7 @@ class ThreadedClient:
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
             self.sock.connect(("127.0.0.1", self.server_port))
+            self.conn = FramedConnection(self.sock)
             return True
         except Exception as e:
             return False
@@ -19,9 +22,8 @@ class ThreadedClient:
     def chat_with_server(self):
         try:
             message = f"Hello from {self.client_id}"
-            self.sock.sendall(message.encode())
-            data = self.sock.recv(1024)
-            return data
+            self.conn.send(message)
+            return self.conn.recv()
         except:
             return None
 
@@ -1,21 +1,55 @@
 # threaded_server.py
 
+import errno
+import logging
+import selectors
 import socket
 import threading
 import time
 
+from framing import FrameDecoder, FramedConnection, encode_frame, RECV_SIZE
+
+MODE_THREAD = "thread"
+MODE_REACTOR = "reactor"
+SERVER_MODES = (MODE_THREAD, MODE_REACTOR)
+
+# accept() errors that mean the process is out of descriptors or memory: back off instead of
+# spinning on a listening socket that stays readable. Others (e.g. ECONNABORTED) skip one client.
+RESOURCE_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM}
+ACCEPT_BACKOFF_SECONDS = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+class _ReactorConnection:
+    """Per-socket state for the reactor loop."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.start = time.time()
+        self.decoder = FrameDecoder()
+        self.outbuf = b""
+
+
 class ThreadedServer:
-    def __init__(self, name, port, max_clients):
+    def __init__(self, name, port, max_clients, mode=MODE_THREAD):
+        if mode not in SERVER_MODES:
+            raise ValueError(f"Unknown server mode '{mode}', expected one of {SERVER_MODES}")
+
         self.name = name
         self.port = port
         self.max_clients = max_clients
+        self.mode = mode
         self.running = False
         self.clients_served = 0
         self.lost_clients = 0
+        self.active_clients = 0
         self.stats = {
             "total_processing_time": 0,
-            "max_concurrent_clients": 0
+            "max_concurrent_clients": 0,
+            "accept_errors": 0
         }
+        self.lock = threading.Lock()
 
     def start_server(self):
         self.running = True
@@ -24,35 +58,142 @@ class ThreadedServer:
         self.server_socket.bind(("127.0.0.1", self.port))
         self.server_socket.listen(100)
 
-        print(f"{self.name} started on port {self.port}")
+        print(f"{self.name} started on port {self.port} ({self.mode} mode)")
+        if self.mode == MODE_REACTOR:
+            self._run_reactor()
+            return
+
+        self.server_socket.settimeout(1.0)
         while self.running:
             try:
-                self.server_socket.settimeout(1.0)
-                client_sock, addr = self.server_socket.accept()
-                thread = threading.Thread(target=self.handle_client, args=(client_sock,))
-                thread.daemon = True
-                thread.start()
+                client_sock, addr = self._accept()
             except socket.timeout:
                 continue
-            except Exception:
-                break
+            except OSError as e:
+                if not self.running:
+                    break  # stop_server closed the listening socket
+                if self._accept_failed(e):
+                    time.sleep(ACCEPT_BACKOFF_SECONDS)
+                continue
+            thread = threading.Thread(target=self.handle_client, args=(client_sock,))
+            thread.daemon = True
+            thread.start()
+
+    def _accept(self):
+        return self.server_socket.accept()
+
+    def _accept_failed(self, error):
+        """Log and count a failed accept(); returns True if accepting should back off."""
+        with self.lock:
+            self.stats["accept_errors"] += 1
+        logger.warning("%s failed to accept a connection: %s", self.name, error)
+        return error.errno in RESOURCE_ERRNOS
+
+    def _client_opened(self):
+        with self.lock:
+            self.active_clients += 1
+            self.stats["max_concurrent_clients"] = max(self.stats["max_concurrent_clients"], self.active_clients)
+
+    def _client_closed(self, start, served=False, lost=False):
+        with self.lock:
+            self.active_clients -= 1
+            if served:
+                self.clients_served += 1
+            if lost:
+                self.lost_clients += 1
+            self.stats["total_processing_time"] += (time.time() - start)
 
     def handle_client(self, client_sock):
         start = time.time()
+        served = lost = False
+        self._client_opened()
         try:
-            data = client_sock.recv(1024)
-            if data:
-                msg = data.decode()
-                client_sock.sendall(f"Hello from {self.name}".encode())
-                self.clients_served += 1
+            conn = FramedConnection(client_sock)
+            msg = conn.recv()
+            if msg is not None:
+                conn.send(f"Hello from {self.name}")
+                served = True
         except:
-            self.lost_clients += 1
+            lost = True
         finally:
             client_sock.close()
-            self.stats["total_processing_time"] += (time.time() - start)
+            self._client_closed(start, served, lost)
+
+    def _run_reactor(self):
+        """Multiplex the listening socket and every client on this thread with non-blocking I/O."""
+        selector = selectors.DefaultSelector()
+        self.server_socket.setblocking(False)
+        selector.register(self.server_socket, selectors.EVENT_READ, data=None)
+
+        resume_accept_at = None
+        try:
+            while self.running:
+                if resume_accept_at is not None and time.monotonic() >= resume_accept_at:
+                    selector.register(self.server_socket, selectors.EVENT_READ, data=None)
+                    resume_accept_at = None
+                timeout = 1.0 if resume_accept_at is None else max(resume_accept_at - time.monotonic(), 0)
+                for key, mask in selector.select(timeout=timeout):
+                    if key.data is not None:
+                        self._reactor_service(selector, key.data, mask)
+                    elif not self._reactor_accept(selector):
+                        # Out of descriptors: stop watching the listener for a moment so
+                        # open connections can finish and free some.
+                        selector.unregister(self.server_socket)
+                        resume_accept_at = time.monotonic() + ACCEPT_BACKOFF_SECONDS
+        finally:
+            for key in list(selector.get_map().values()):
+                if key.data is not None:
+                    self._reactor_close(selector, key.data, lost=True)
+            selector.close()
+            self.server_socket.close()
+
+    def _reactor_accept(self, selector):
+        """Drain the accept backlog in one wakeup; returns False if accepting should back off."""
+        while True:
+            try:
+                client_sock, addr = self._accept()
+            except (BlockingIOError, InterruptedError):
+                return True
+            except OSError as e:
+                if self._accept_failed(e):
+                    return False
+                continue
+            client_sock.setblocking(False)
+            self._client_opened()
+            selector.register(client_sock, selectors.EVENT_READ, data=_ReactorConnection(client_sock))
+
+    def _reactor_service(self, selector, conn, mask):
+        try:
+            if mask & selectors.EVENT_READ:
+                data = conn.sock.recv(RECV_SIZE)
+                if not data:
+                    self._reactor_close(selector, conn)
+                    return
+                if not conn.decoder.feed(data):
+                    return  # wait for the rest of the frame
+                conn.outbuf = encode_frame(f"Hello from {self.name}")
+                selector.modify(conn.sock, selectors.EVENT_WRITE, data=conn)
+                mask = selectors.EVENT_WRITE
+
+            if mask & selectors.EVENT_WRITE and conn.outbuf:
+                sent = conn.sock.send(conn.outbuf)
+                conn.outbuf = conn.outbuf[sent:]
+                if not conn.outbuf:
+                    self._reactor_close(selector, conn, served=True)
+        except (BlockingIOError, InterruptedError):
+            pass
+        except (OSError, ValueError):
+            self._reactor_close(selector, conn, lost=True)
+
+    def _reactor_close(self, selector, conn, served=False, lost=False):
+        selector.unregister(conn.sock)
+        conn.sock.close()
+        self._client_closed(conn.start, served, lost)
 
     def stop_server(self):
         self.running = False
+        if self.mode == MODE_REACTOR:
+            return  # the reactor loop closes its own sockets on its next wakeup
         try:
             self.server_socket.close()
         except:
@@ -61,6 +202,9 @@ class ThreadedServer:
     def get_stats(self):
         return {
             "server_name": self.name,
+            "mode": self.mode,
             "clients_served": self.clients_served,
+            "lost_clients": self.lost_clients,
+            "accept_errors": self.stats["accept_errors"],
             "average_rating": 3.5  # stubbed
-        }
\ No newline at end of file
+        }
@@ -9,6 +9,7 @@ from typing import Optional, Dict, Any
 
 from config import Config
 from constants import *
+from framing import FramedConnection
 
 class ClientUI:
     def __init__(self, client_name: str):
@@ -18,6 +19,7 @@ class ClientUI:
         self.root.geometry("600x500")
 
         self.socket = None
+        self.conn = None
         self.connected = False
         self.server_name = "Not Connected"
         self.session_id = None
@@ -102,6 +104,7 @@ class ClientUI:
             port = int(self.port_var.get())
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect(('localhost', port))
+            self.conn = FramedConnection(self.socket)
 
             self.connected = True
             self.status_var.set("Connected")
@@ -128,6 +131,7 @@ class ClientUI:
             except:
                 pass
             self.socket = None
+            self.conn = None
 
         self.connected = False
         self.status_var.set("Disconnected")
@@ -137,13 +141,13 @@ class ClientUI:
         self._add_chat_message("System", "Disconnected from server")
 
     def _receive_messages(self):
-        while self.connected and self.socket:
+        while self.connected and self.conn:
             try:
-                data = self.socket.recv(1024)
-                if not data:
+                batch = self.conn.recv_batch()
+                if not batch:
                     break
-                message = json.loads(data.decode())
-                self._handle_server_message(message)
+                for data in batch:
+                    self._handle_server_message(json.loads(data))
             except:
                 break
 
@@ -186,9 +190,9 @@ class ClientUI:
         self._add_chat_message("You", message)
 
     def _send_json(self, data: Dict[str, Any]):
-        if self.socket:
+        if self.conn:
             try:
-                self.socket.send(json.dumps(data).encode())
+                self.conn.send(json.dumps(data))
             except Exception as e:
                 print(f"Send error: {e}")
 
@@ -6,11 +6,13 @@ import json
 from datetime import datetime, timedelta
 from typing import Dict, Any
 import queue
+from collections import deque
 
 from config import Config
 from constants import *
-from database import MetricsDatabase
-from logger import ArchiveLogger
+from database import get_database
+from logger import Logger, json_archive_path
+from log_tailer import LogTailer
 
 class ServerUI:
     def __init__(self, server_name: str, port: int):
@@ -29,12 +31,17 @@ class ServerUI:
         self.current_client = "None"
         
         # Components
-        self.db = MetricsDatabase()
-        self.logger = ArchiveLogger()
+        self.db = get_database()
+        self.logger = Logger(f"ui_{server_name}")
         
         # Update queue for thread-safe UI updates
         self.update_queue = queue.Queue()
         
+        # Activity log: ring buffer of lines waiting for the next tick (a burst larger
+        # than the widget cap keeps only its newest lines) and the widget's line count
+        self.pending_log_lines = deque(maxlen=UI_LOG_MAX_LINES)
+        self.log_widget_lines = 0
+        
         # Create UI elements
         self._create_ui()
         
@@ -156,60 +163,24 @@ class ServerUI:
                 time.sleep(10)
     
     def _monitor_log_thread(self):
-        """Background thread to monitor log file"""
+        """Background thread to follow the JSON-lines archive"""
         try:
-            with open(Config.ARCHIVE_FILE, 'r') as f:
-                # Go to end of file
-                f.seek(0, 2)
-                
-                while True:
-                    line = f.readline()
-                    if line:
-                        # Parse log entry
-                        try:
-                            log_entry = json.loads(line.strip())
-                            if log_entry.get('server_name') == self.server_name:
-                                self.update_queue.put(('log', log_entry))
-                        except json.JSONDecodeError:
-                            pass
-                    else:
-                        time.sleep(0.1)
-                        
-        except FileNotFoundError:
-            pass
+            # Sleeps on inotify (or backs off polling) and survives archive rotation
+            self.log_tailer = LogTailer(json_archive_path())
+            for batch in self.log_tailer:
+                entries = [entry for entry in batch if entry.get('server_name') == self.server_name]
+                if entries:
+                    self.update_queue.put(('log_batch', entries))
+
         except Exception as e:
-            print(f"Error monitoring log: {e}")
+            self.logger.log_error(f"Error monitoring log: {e}")
     
     def _get_current_stats(self) -> Dict[str, Any]:
         """Get current server statistics"""
         try:
-            # Get stats from database
-            stats = self.db.get_server_stats(self.server_name)
-            
-            # Get today's date
-            today = datetime.now().date()
-            month_start = today.replace(day=1)
-            
-            # Calculate daily and monthly clients
-            daily_clients = len([s for s in stats if s['date'] == today.isoformat()])
-            monthly_clients = len([s for s in stats if s['date'] >= month_start.isoformat()])
-            
-            # Calculate average rating
-            ratings = [s['rating'] for s in stats if s['rating'] is not None]
-            avg_rating = sum(ratings) / len(ratings) if ratings else 0
-            
-            # Get total and lost clients
-            total_clients = len(stats)
-            lost_clients = len([s for s in stats if s['status'] == 'lost'])
-            
-            return {
-                'daily_clients': daily_clients,
-                'monthly_clients': monthly_clients,
-                'avg_rating': avg_rating,
-                'total_clients': total_clients,
-                'lost_clients': lost_clients
-            }
-            
+            # Day, month and all-time rollups the database keeps up to date; no history scan needed
+            return self.db.get_server_summary(self.server_name)
+
         except Exception as e:
             print(f"Error getting stats: {e}")
             return {
@@ -230,12 +201,18 @@ class ServerUI:
                     self._update_stats_display(data)
                 elif update_type == 'log':
                     self._update_log_display(data)
+                elif update_type == 'log_batch':
+                    for log_entry in data:
+                        self._update_log_display(log_entry)
                 elif update_type == 'current_client':
                     self.current_client_var.set(data)
                     
         except queue.Empty:
             pass
         
+        # Render every log line queued this tick with one insert
+        self._flush_log_display()
+        
         # Update date/time
         self.datetime_var.set(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         
@@ -251,24 +228,39 @@ class ServerUI:
         self.lost_clients_var.set(str(stats['lost_clients']))
     
     def _update_log_display(self, log_entry: Dict[str, Any]):
-        """Update log display with new entry"""
+        """Queue a log entry for display on the next update tick"""
         timestamp = log_entry.get('timestamp', datetime.now().isoformat())
         event_type = log_entry.get('event_type', 'UNKNOWN')
         message = log_entry.get('message', '')
         
-        log_line = f"[{timestamp}] {event_type}: {message}\n"
+        self._append_log_line(f"[{timestamp}] {event_type}: {message}\n")
+    
+    def _append_log_line(self, log_line: str):
+        self.pending_log_lines.append(log_line)
+    
+    def _flush_log_display(self):
+        """Insert pending lines in one batch and trim the widget to the newest lines"""
+        if not self.pending_log_lines:
+            return
         
-        self.log_text.insert(tk.END, log_line)
-        self.log_text.see(tk.END)
+        pending = list(self.pending_log_lines)
+        self.pending_log_lines.clear()
         
-        # Keep only last 1000 lines
-        lines = self.log_text.get("1.0", tk.END).split('\n')
-        if len(lines) > 1000:
-            self.log_text.delete("1.0", f"{len(lines) - 1000}.0")
+        self.log_text.insert(tk.END, "".join(pending))
+        self.log_widget_lines += len(pending)
+        
+        # Trim by line index instead of reading the widget text back
+        excess = self.log_widget_lines - UI_LOG_MAX_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_widget_lines -= excess
+        self.log_text.see(tk.END)
     
     def _clear_log(self):
         """Clear the log display"""
         self.log_text.delete("1.0", tk.END)
+        self.pending_log_lines.clear()
+        self.log_widget_lines = 0
     
     def _export_stats(self):
         """Export current statistics to file"""
@@ -280,12 +272,12 @@ class ServerUI:
                 json.dump(stats, f, indent=2)
             
             # Show status message
-            self.log_text.insert(tk.END, f"[{datetime.now().isoformat()}] EXPORT: Stats exported to {filename}\n")
-            self.log_text.see(tk.END)
+            self._append_log_line(f"[{datetime.now().isoformat()}] EXPORT: Stats exported to {filename}\n")
+            self._flush_log_display()
             
         except Exception as e:
-            self.log_text.insert(tk.END, f"[{datetime.now().isoformat()}] ERROR: Failed to export stats - {e}\n")
-            self.log_text.see(tk.END)
+            self._append_log_line(f"[{datetime.now().isoformat()}] ERROR: Failed to export stats - {e}\n")
+            self._flush_log_display()
     
     def _refresh_data(self):
         """Manually refresh all data"""
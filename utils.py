@@ -6,6 +6,8 @@ import json
 import hashlib
 import threading
 import logging
+import weakref
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 
@@ -74,14 +76,15 @@ def format_bytes(bytes_value: int) -> str:
         bytes_value /= 1024.0
     return f"{bytes_value:.2f} TB"
 
-# System resource usage snapshot
+# System resource usage snapshot (non-blocking; CPU is measured since the previous call)
 def get_system_info() -> Dict[str, Any]:
-    import psutil
+    from system_sampler import get_system_sampler
+    sample = get_system_sampler().sample()
     return {
-        'cpu_percent': psutil.cpu_percent(interval=1),
-        'memory_percent': psutil.virtual_memory().percent,
-        'disk_percent': psutil.disk_usage('/').percent,
-        'timestamp': time.time()
+        'cpu_percent': sample['cpu_percent'],
+        'memory_percent': sample['memory_percent'],
+        'disk_percent': sample['disk_percent'],
+        'timestamp': sample['timestamp']
     }
 
 # Thread-safe counter
@@ -108,30 +111,361 @@ class ThreadSafeCounter:
         with self._lock:
             self._value = 0
 
-# Basic rate limiter
-class RateLimiter:
-    def __init__(self, max_requests: int, time_window: int):
+# Per-thread counter cells, summed on read
+class _ShardedCells:
+    """A row of counters per thread; only the owning thread writes its row.
+
+    Writers never take a lock: each thread bumps ints in its own list. Readers
+    sum every row under a lock, folding rows of exited threads into a base row
+    so short-lived threads do not accumulate.
+    """
+
+    def __init__(self, width: int):
+        self._width = width
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._rows = []
+        self._base = [0] * width
+
+    def _row(self) -> List[int]:
+        try:
+            return self._local.row
+        except AttributeError:
+            row = [0] * self._width
+            self._local.row = row
+            with self._lock:
+                self._rows.append((weakref.ref(threading.current_thread()), row))
+            return row
+
+    def _totals_locked(self) -> List[int]:
+        live = []
+        for thread_ref, row in self._rows:
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                for index, value in enumerate(row):
+                    self._base[index] += value
+            else:
+                live.append((thread_ref, row))
+        self._rows = live
+
+        totals = list(self._base)
+        for _, row in live:
+            for index, value in enumerate(row):
+                totals[index] += value
+        return totals
+
+    def _totals(self) -> List[int]:
+        with self._lock:
+            return self._totals_locked()
+
+    def _reset(self, index: int = None) -> None:
+        """Zero the totals (one column or all); increments racing with a reset may land either side."""
+        with self._lock:
+            totals = self._totals_locked()
+            for column in (range(self._width) if index is None else (index,)):
+                self._base[column] -= totals[column]
+
+# Sharded counter for hot paths
+class ShardedCounter(_ShardedCells):
+    """Drop-in for ThreadSafeCounter without a lock on increment.
+
+    increment()/decrement() return None, since computing the new total would
+    mean reading every shard; call get_value() when the total is needed.
+    """
+
+    def __init__(self, initial_value: int = 0):
+        super().__init__(1)
+        self._base[0] = initial_value
+
+    def increment(self, amount: int = 1) -> None:
+        self._row()[0] += amount
+
+    def decrement(self, amount: int = 1) -> None:
+        self._row()[0] -= amount
+
+    def get_value(self) -> int:
+        return self._totals()[0]
+
+    def reset(self) -> None:
+        self._reset()
+
+# Several sharded counters updated together
+class EventCounters(_ShardedCells):
+    """Named sharded counters that one record() call updates together.
+
+    `counters[name]` returns a view with the ThreadSafeCounter interface.
+    """
+
+    def __init__(self, *names: str):
+        super().__init__(len(names))
+        self._index = {name: index for index, name in enumerate(names)}
+
+    def record(self, **deltas: int) -> None:
+        row = self._row()
+        for name, delta in deltas.items():
+            row[self._index[name]] += delta
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(zip(self._index, self._totals()))
+
+    def reset(self) -> None:
+        self._reset()
+
+    def __getitem__(self, name: str) -> '_EventCounterView':
+        return _EventCounterView(self, name)
+
+class _EventCounterView:
+    def __init__(self, counters: EventCounters, name: str):
+        self._counters = counters
+        self._name = name
+        self._column = counters._index[name]
+
+    def increment(self, amount: int = 1) -> None:
+        self._counters._row()[self._column] += amount
+
+    def decrement(self, amount: int = 1) -> None:
+        self._counters._row()[self._column] -= amount
+
+    def get_value(self) -> int:
+        return self._counters._totals()[self._column]
+
+    def reset(self) -> None:
+        self._counters._reset(self._column)
+
+# Fixed-memory latency histogram (HDR-style log-linear buckets)
+class LatencyHistogram:
+    """Record latencies in O(1) into log-linear buckets with bounded relative error.
+
+    Values are kept as integer microseconds. Below 2**precision_bits each value
+    has its own bucket; above that every power of two is split into
+    2**(precision_bits - 1) buckets, so a reported percentile is within
+    2**(1 - precision_bits) (about 1.6% at the default 7 bits) of the true value.
+    Count, sum, min and max are exact. Histograms with the same settings merge
+    by adding bucket counts, and to_dict()/from_dict() carry them across processes.
+    """
+
+    def __init__(self, max_value_ms: float = 3_600_000, precision_bits: int = 7):
+        self.precision_bits = precision_bits
+        self.max_value_ms = max_value_ms
+        self._half = 1 << (precision_bits - 1)
+        self._max_value = int(max_value_ms * 1000)
+        self._counts = [0] * (self._index(self._max_value) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self.precision_bits
+        if shift <= 0:
+            return value
+        return shift * self._half + (value >> shift)
+
+    def _bucket_value_ms(self, index: int) -> float:
+        """Midpoint of bucket `index` in milliseconds."""
+        if index < 2 * self._half:
+            return index / 1000
+        shift = index // self._half - 1
+        mantissa = index - shift * self._half
+        return ((mantissa << shift) + (1 << (shift - 1))) / 1000
+
+    def record(self, value_ms: float):
+        value = min(max(int(value_ms * 1000), 0), self._max_value)
+        index = self._index(value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_ms += value_ms
+            if self.min_ms is None or value_ms < self.min_ms:
+                self.min_ms = value_ms
+            if self.max_ms is None or value_ms > self.max_ms:
+                self.max_ms = value_ms
+
+    def mean(self) -> float:
+        with self._lock:
+            return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Value at `percent` (0-100), clamped to the exact min and max."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, -(-self.count * percent // 100))
+            seen = 0
+            for index, bucket_count in enumerate(self._counts):
+                seen += bucket_count
+                if seen >= target:
+                    return min(max(self._bucket_value_ms(index), self.min_ms), self.max_ms)
+            return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': round(self.mean(), 3),
+            'p50': round(self.percentile(50), 3),
+            'p90': round(self.percentile(90), 3),
+            'p99': round(self.percentile(99), 3),
+            'p99_9': round(self.percentile(99.9), 3),
+            'max': round(self.max_ms or 0.0, 3)
+        }
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        if (other.precision_bits, other.max_value_ms) != (self.precision_bits, self.max_value_ms):
+            raise ValueError("Cannot merge histograms with different precision or range")
+        with other._lock:
+            counts = list(other._counts)
+            count, total, low, high = other.count, other.total_ms, other.min_ms, other.max_ms
+        with self._lock:
+            for index, bucket_count in enumerate(counts):
+                if bucket_count:
+                    self._counts[index] += bucket_count
+            self.count += count
+            self.total_ms += total
+            if low is not None:
+                self.min_ms = low if self.min_ms is None else min(self.min_ms, low)
+                self.max_ms = high if self.max_ms is None else max(self.max_ms, high)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self.count = 0
+            self.total_ms = 0.0
+            self.min_ms = None
+            self.max_ms = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly form; only non-empty buckets are stored."""
+        with self._lock:
+            return {
+                'precision_bits': self.precision_bits,
+                'max_value_ms': self.max_value_ms,
+                'count': self.count,
+                'total_ms': self.total_ms,
+                'min_ms': self.min_ms,
+                'max_ms': self.max_ms,
+                'buckets': {str(i): n for i, n in enumerate(self._counts) if n}
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        histogram = cls(data['max_value_ms'], data['precision_bits'])
+        for index, bucket_count in data['buckets'].items():
+            histogram._counts[int(index)] = bucket_count
+        histogram.count = data['count']
+        histogram.total_ms = data['total_ms']
+        histogram.min_ms = data['min_ms']
+        histogram.max_ms = data['max_ms']
+        return histogram
+
+# Per-client limiter state, striped by client id with LRU/TTL eviction
+class _StripedClientState:
+    """Client states spread over `stripes` locks, each stripe an LRU of bounded size.
+
+    A lookup touches only its stripe. Entries idle longer than `idle_ttl`
+    seconds, or beyond `max_clients` in total, are evicted from the LRU end a
+    few at a time on each access (after the accessed entry is refreshed), so
+    memory stays bounded without a sweeper.
+    """
+
+    def __init__(self, stripes: int = 16, max_clients: int = 10000, idle_ttl: float = 300.0):
+        self._stripes = [(threading.Lock(), OrderedDict()) for _ in range(stripes)]
+        self._per_stripe = max(1, max_clients // stripes)
+        self.idle_ttl = idle_ttl
+
+    def _stripe(self, client_id):
+        return self._stripes[hash(client_id) % len(self._stripes)]
+
+    def _evict(self, clients: OrderedDict, now: float) -> None:
+        while len(clients) > self._per_stripe:
+            clients.popitem(last=False)
+        for _ in range(2):
+            if not clients:
+                break
+            oldest = next(iter(clients.values()))
+            if now - oldest[-1] <= self.idle_ttl:
+                break
+            clients.popitem(last=False)
+
+    def forget(self, client_id) -> None:
+        lock, clients = self._stripe(client_id)
+        with lock:
+            clients.pop(client_id, None)
+
+    def tracked_clients(self) -> int:
+        return sum(len(clients) for _, clients in self._stripes)
+
+# Token bucket rate limiter
+class TokenBucketLimiter(_StripedClientState):
+    """Allow `rate` requests per second per client with bursts of up to `capacity`; O(1) per check."""
+
+    def __init__(self, rate: float, capacity: float = None, stripes: int = 16, max_clients: int = 10000,
+                 idle_ttl: float = 300.0):
+        super().__init__(stripes, max_clients, idle_ttl)
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+
+    def allow_request(self, client_id, cost: float = 1.0) -> bool:
+        now = time.monotonic()
+        lock, clients = self._stripe(client_id)
+        with lock:
+            state = clients.get(client_id)
+            if state is None:
+                # [tokens, last refill time]
+                state = clients[client_id] = [self.capacity, now]
+            else:
+                clients.move_to_end(client_id)
+                state[0] = min(self.capacity, state[0] + (now - state[1]) * self.rate)
+                state[1] = now
+            self._evict(clients, now)
+            if state[0] >= cost:
+                state[0] -= cost
+                return True
+            return False
+
+# Sliding-window counter rate limiter
+class SlidingWindowLimiter(_StripedClientState):
+    """Allow `max_requests` per `time_window` seconds per client; O(1) per check.
+
+    Instead of a timestamp log, each client keeps the counts for the current
+    and previous fixed windows and weights the previous one by how much of it
+    still overlaps the sliding window.
+    """
+
+    def __init__(self, max_requests: int, time_window: float, stripes: int = 16, max_clients: int = 10000,
+                 idle_ttl: float = None):
+        super().__init__(stripes, max_clients, idle_ttl if idle_ttl is not None else 2 * time_window)
         self.max_requests = max_requests
         self.time_window = time_window
-        self.requests = {}
-        self.lock = threading.Lock()
-
-    def allow_request(self, client_id: str) -> bool:
-        current_time = time.time()
-        with self.lock:
-            if client_id not in self.requests:
-                self.requests[client_id] = []
-
-            self.requests[client_id] = [
-                req_time for req_time in self.requests[client_id]
-                if current_time - req_time < self.time_window
-            ]
-
-            if len(self.requests[client_id]) < self.max_requests:
-                self.requests[client_id].append(current_time)
+
+    def allow_request(self, client_id) -> bool:
+        now = time.monotonic()
+        window = int(now // self.time_window)
+        lock, clients = self._stripe(client_id)
+        with lock:
+            state = clients.get(client_id)
+            if state is None:
+                # [window index, current count, previous count, last seen]
+                state = clients[client_id] = [window, 0, 0, now]
+            else:
+                clients.move_to_end(client_id)
+                if window != state[0]:
+                    state[2] = state[1] if window == state[0] + 1 else 0
+                    state[0], state[1] = window, 0
+                state[3] = now
+            self._evict(clients, now)
+
+            overlap = 1.0 - (now % self.time_window) / self.time_window
+            if state[2] * overlap + state[1] < self.max_requests:
+                state[1] += 1
                 return True
             return False
 
+# Basic rate limiter (kept for existing callers; O(1) sliding-window counter underneath)
+class RateLimiter(SlidingWindowLimiter):
+    def __init__(self, max_requests: int, time_window: int):
+        super().__init__(max_requests, time_window)
+
 # Retry wrapper
 def retry_operation(func, max_retries: int = 3, delay: float = 1.0):
     for attempt in range(max_retries):